@@ -0,0 +1,205 @@
+import argparse
+import math
+import os
+import random
+import time
+from board import *
+
+# Number of cores used by default, each worker process playing its own games.
+DEFAULT_NBR_WORKERS = os.cpu_count()
+# Every game has its own boards and transposition tables, so they are smaller than the one of a single game.
+DEFAULT_ARENA_TRANSPOSITION_TABLE_SIZE_MB = 4
+# Percentiles of the time taken by the engines to choose their moves shown in the report.
+LATENCY_PERCENTILES = (50, 90, 99, 100)
+
+
+def play_alpha_beta_move(board, current_player, depth, generator):
+    return board.ai_move(None, current_player, depth=depth, print_move=False)
+
+
+def play_minimax_move(board, current_player, depth, generator):
+    # findMinimax always searches the same number of plies.
+    return board.play_move(findMinimax(board, None, current_player))
+
+
+def play_random_move(board, current_player, depth, generator):
+    moves = board.generate_valid_recycling_moves() if board.isInRecyclingPhase() \
+        else board.generate_valid_regular_moves()
+    return board.play_move(generator.choice(moves))
+
+
+# The engines the players can use, each playing a move for the current player on the board and returning the positions
+# of the tiles it placed. A depth of None is the default depth of the engine.
+ENGINES = {
+    'alphabeta': play_alpha_beta_move,
+    'minimax': play_minimax_move,
+    'random': play_random_move,
+}
+
+
+class GameSettings:
+    """ Everything a worker process needs to play a game: the engine and search depth of each player, the number of
+        random moves played at the beginning of the game, whether the dot player moves first, the seed of
+        the random moves, and the opening book of the alphabeta engine (None for none, so that the engines are compared
+        on their searches).
+    """
+    def __init__(self, dots_engine, dots_depth, colors_engine, colors_depth, nbr_random_moves, dots_first, seed,
+                 transposition_table_size_mb=DEFAULT_ARENA_TRANSPOSITION_TABLE_SIZE_MB, opening_book_path=None):
+        self.dots_engine = dots_engine
+        self.dots_depth = dots_depth
+        self.colors_engine = colors_engine
+        self.colors_depth = colors_depth
+        self.nbr_random_moves = nbr_random_moves
+        self.dots_first = dots_first
+        self.seed = seed
+        self.transposition_table_size_mb = transposition_table_size_mb
+        self.opening_book_path = opening_book_path
+
+
+class GameResult:
+    def __init__(self, winner, nbr_moves, duration, move_latencies):
+        # Class of the player who won (DotPlayer or ColorPlayer), None for a draw.
+        self.winner = winner
+        self.nbr_moves = nbr_moves
+        self.duration = duration
+        # Seconds taken by each player's engine to play each of its moves, by player class (random openings excluded).
+        self.move_latencies = move_latencies
+
+
+def play_game(settings):
+    """ Play a whole game between 2 engines, following the rules of game_loop, without reading or printing anything.
+        Return its GameResult.
+    """
+    start = time.perf_counter()
+    generator = random.Random(settings.seed)
+    board = Board(NBR_CARDS, settings.transposition_table_size_mb, settings.opening_book_path)
+    dot_player = DotPlayer()
+    color_player = ColorPlayer()
+    engines = {dot_player: (ENGINES[settings.dots_engine], settings.dots_depth),
+               color_player: (ENGINES[settings.colors_engine], settings.colors_depth)}
+    current_player, other_player = (dot_player, color_player) if settings.dots_first else (color_player, dot_player)
+    move_latencies = {DotPlayer: [], ColorPlayer: []}
+    winner = None
+    nbr_moves = 0
+    # The worker processes and the opening book the board may have used are released at the end of the game.
+    try:
+        while nbr_moves < MAX_NBR_MOVES:
+            if nbr_moves < settings.nbr_random_moves:
+                inserted_tiles_pos = play_random_move(board, current_player, None, generator)
+            else:
+                engine, depth = engines[current_player]
+                move_start = time.perf_counter()
+                inserted_tiles_pos = engine(board, current_player, depth, generator)
+                move_latencies[type(current_player)].append(time.perf_counter() - move_start)
+            nbr_moves += 1
+            if board.nbr_cards >= 4:
+                # The current player wins even if the move also completes a line of the other player.
+                if board.check_win_conditions(inserted_tiles_pos, current_player.typeItem) is not None:
+                    winner = type(current_player)
+                    break
+                if board.check_win_conditions(inserted_tiles_pos, other_player.typeItem) is not None:
+                    winner = type(other_player)
+                    break
+            current_player, other_player = other_player, current_player
+    finally:
+        board.close()
+    return GameResult(winner, nbr_moves, time.perf_counter() - start, move_latencies)
+
+
+def get_percentile(sorted_values, percentile):
+    """ Return the value under which percentile % of the sorted values are (nearest rank), None if there are none. """
+    if not sorted_values:
+        return None
+    rank = max(int(math.ceil(percentile / 100 * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+class ArenaReport:
+    """ Results of the games of an arena: how fast they were played and how often each player won. """
+    def __init__(self, game_results, duration):
+        self.game_results = game_results
+        self.duration = duration
+        self.nbr_games = len(game_results)
+        self.nbr_wins = {DotPlayer: 0, ColorPlayer: 0}
+        self.move_latencies = {DotPlayer: [], ColorPlayer: []}
+        self.nbr_draws = 0
+        for game_result in game_results:
+            if game_result.winner is None:
+                self.nbr_draws += 1
+            else:
+                self.nbr_wins[game_result.winner] += 1
+            for player_class, latencies in game_result.move_latencies.items():
+                self.move_latencies[player_class].extend(latencies)
+        for latencies in self.move_latencies.values():
+            latencies.sort()
+
+    def get_games_per_second(self):
+        return self.nbr_games / self.duration if self.duration > 0 else 0.0
+
+    def get_win_rate(self, player_class):
+        return self.nbr_wins[player_class] / self.nbr_games if self.nbr_games > 0 else 0.0
+
+    def get_draw_rate(self):
+        return self.nbr_draws / self.nbr_games if self.nbr_games > 0 else 0.0
+
+    def get_latency_percentiles(self, player_class=None):
+        """ Return the LATENCY_PERCENTILES of the move latencies (in seconds) of the player, or of both players. """
+        if player_class is None:
+            latencies = sorted(self.move_latencies[DotPlayer] + self.move_latencies[ColorPlayer])
+        else:
+            latencies = self.move_latencies[player_class]
+        return [get_percentile(latencies, percentile) for percentile in LATENCY_PERCENTILES]
+
+    def __str__(self):
+        lines = ["%d games in %.2f s: %.2f games/s, %.1f moves per game" %
+                 (self.nbr_games, self.duration, self.get_games_per_second(),
+                  sum(game_result.nbr_moves for game_result in self.game_results) / max(self.nbr_games, 1)),
+                 "%-11s  %4s  %6s  %s" % ("player", "wins", "rate", " ".join("%7s" % ("p%d ms" % percentile)
+                                                                              for percentile in LATENCY_PERCENTILES))]
+        for name, player_class in (("DotPlayer", DotPlayer), ("ColorPlayer", ColorPlayer)):
+            latencies = ["%7.1f" % (latency * 1000) if latency is not None else "      -"
+                         for latency in self.get_latency_percentiles(player_class)]
+            lines.append("%-11s  %4d  %5.1f%%  %s" % (name, self.nbr_wins[player_class],
+                                                    100 * self.get_win_rate(player_class), " ".join(latencies)))
+        lines.append("%-11s  %4d  %5.1f%%" % ("draws", self.nbr_draws, 100 * self.get_draw_rate()))
+        return "\n".join(lines)
+
+
+def run_arena(nbr_games, dots_engine='alphabeta', dots_depth=None, colors_engine='alphabeta', colors_depth=None,
+              nbr_random_moves=2, nbr_workers=DEFAULT_NBR_WORKERS, seed=0,
+              transposition_table_size_mb=DEFAULT_ARENA_TRANSPOSITION_TABLE_SIZE_MB, opening_book_path=None):
+    """ Play nbr_games games between the engines (see ENGINES) in nbr_workers worker processes and return
+        their ArenaReport. The players take turns moving first, and the first nbr_random_moves moves of every game are
+        random (seeded with the seed and the index of the game), so that the games are different but reproducible.
+        The opening book at opening_book_path, if given, is used by the alphabeta engine.
+    """
+    games_settings = [GameSettings(dots_engine, dots_depth, colors_engine, colors_depth, nbr_random_moves,
+                                   game_index % 2 == 0, "%d-%d" % (seed, game_index), transposition_table_size_mb,
+                                   opening_book_path)
+                      for game_index in range(nbr_games)]
+    start = time.perf_counter()
+    with create_process_pool(nbr_workers) as process_pool:
+        game_results = list(process_pool.map(play_game, games_settings))
+    return ArenaReport(game_results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play AI against AI games without any input or output and report "
+                                                 "the speed of the engines and the results of the games.")
+    parser.add_argument("--games", type=int, default=20, help="number of games played")
+    parser.add_argument("--dots-engine", choices=sorted(ENGINES), default='alphabeta', help="engine of the dot player")
+    parser.add_argument("--dots-depth", type=int, default=None, help="number of plies searched by the dot player")
+    parser.add_argument("--colors-engine", choices=sorted(ENGINES), default='alphabeta',
+                        help="engine of the color player")
+    parser.add_argument("--colors-depth", type=int, default=None, help="number of plies searched by the color player")
+    parser.add_argument("--random-moves", type=int, default=2, help="number of random moves opening every game")
+    parser.add_argument("--workers", type=int, default=DEFAULT_NBR_WORKERS, help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random moves")
+    parser.add_argument("--tt-mb", type=float, default=DEFAULT_ARENA_TRANSPOSITION_TABLE_SIZE_MB,
+                        help="size of the transposition table of each game in MB (0 to disable it)")
+    parser.add_argument("--opening-book", default=None,
+                        help="opening book used by the alphabeta engine (none by default, see opening_book.py)")
+    arguments = parser.parse_args()
+    print(run_arena(arguments.games, arguments.dots_engine, arguments.dots_depth, arguments.colors_engine,
+                    arguments.colors_depth, arguments.random_moves, arguments.workers, arguments.seed,
+                    arguments.tt_mb, arguments.opening_book))
@@ -0,0 +1,181 @@
+from windows import *
+
+# NumPy is only needed to evaluate the leaves of the search in batches, the AI works without it.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_batch_evaluation_available():
+    return numpy is not None
+
+
+class BatchEvaluator:
+    """ Scores many positions at once with NumPy, giving the same scores as IncrementalEvaluator.heuristic
+        (and thus Board.heuristic_regular_moves).
+        The positions are given as stacked planes of shape (N, height, width): whether each cell is occupied, holds
+        a red tile and holds a tile with a filled dot, along with the number of red, white, filled and empty tiles in
+        every window of 4 cells of each position. The scores of the inserted tiles of all the positions are then read
+        from these counts at the same time.
+        This is meant for the sibling leaves of the search (see AlphaBetaSearch), which all have the same number of
+        inserted tiles: the ones of their parent and the ones of their own move. Their window counts are the ones the
+        IncrementalEvaluator of the board keeps for their parent, plus the windows of the tiles of their move.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.nbr_cells = width * height
+        windows = get_window_table(width, height)
+        self.nbr_windows = windows.nbr_windows
+        # Windows of each cell in each direction, padded with an extra window past the real ones. That window always
+        # holds a tile of each type, so that it never counts as a line.
+        max_nbr_direction_windows = max(len(direction_windows) for cell_direction_windows in
+                                        windows.cell_direction_windows for direction_windows in cell_direction_windows)
+        self.cell_direction_windows = numpy.full((self.nbr_cells, len(WindowTable.DIRECTIONS), max_nbr_direction_windows),
+                                                 self.nbr_windows, dtype=numpy.intp)
+        for cell_index, cell_direction_windows in enumerate(windows.cell_direction_windows):
+            for direction_index, direction_windows in enumerate(cell_direction_windows):
+                self.cell_direction_windows[cell_index, direction_index, :len(direction_windows)] = direction_windows
+        # Row i tells which windows the cell i is in, so that adding a tile to the counts is adding its row.
+        # The counts are at most 4, small integers make the sums faster.
+        self.cell_windows = numpy.zeros((self.nbr_cells, self.nbr_windows + 1), dtype=numpy.int16)
+        for window_index, window_cells in enumerate(windows.window_cells):
+            self.cell_windows[list(window_cells), window_index] = 1
+        # Score of an inserted tile in each direction, given the largest number of tiles of its value in a window of
+        # that direction that can still be a line, and given the largest number of tiles it blocks in such a window.
+        self.line_scores = numpy.array([0, 0, 1, 10, 100000], dtype=numpy.int64)
+        self.blocking_scores = numpy.array([0, 1, 10, 10000, 0], dtype=numpy.int64)
+
+    def get_window_counts(self, occupied, red, filled):
+        """ Return the number of red, white, filled and empty tiles in each window of each position, as an array of
+            shape (4, N, nbr_windows + 1) (the last window being the padding one), from the planes of the positions.
+        """
+        nbr_positions = len(occupied)
+        occupied = occupied.reshape(nbr_positions, self.nbr_cells)
+        red = red.reshape(nbr_positions, self.nbr_cells) & occupied
+        filled = filled.reshape(nbr_positions, self.nbr_cells) & occupied
+        planes = numpy.stack((red, occupied & ~red, filled, occupied & ~filled)).astype(numpy.int16)
+        counts = planes @ self.cell_windows
+        counts[:, :, self.nbr_windows] = 1
+        return counts
+
+    def evaluate(self, occupied, red, filled, inserted_cells, is_color_player, window_counts=None):
+        """ Return the scores of the N positions for the player playing colors if is_color_player or dots otherwise.
+            occupied, red and filled are boolean arrays of shape (N, height, width), and inserted_cells an integer array
+            of shape (N, T) holding the cell indexes (y * width + x) of the tiles inserted since the root of the search,
+            like the inserted_tiles_pos given to Board.heuristic_regular_moves. The window counts are computed from
+            the planes if they are not given (see get_window_counts).
+        """
+        nbr_positions = len(occupied)
+        occupied = occupied.reshape(nbr_positions, self.nbr_cells)
+        red = red.reshape(nbr_positions, self.nbr_cells) & occupied
+        filled = filled.reshape(nbr_positions, self.nbr_cells) & occupied
+        if window_counts is None:
+            window_counts = self.get_window_counts(occupied, red, filled)
+        position_indexes = numpy.arange(nbr_positions)[:, numpy.newaxis]
+        # The inserted tiles whose cell is now empty (because their card was recycled since) are not counted.
+        is_inserted_tile_on_board = occupied[position_indexes, inserted_cells]
+        is_red = red[position_indexes, inserted_cells]
+        is_filled = filled[position_indexes, inserted_cells]
+
+        # The blocking heuristic does not count the inserted tiles as blocked or blocking tiles. A cell inserted twice
+        # is only subtracted once.
+        is_first_insertion = ~numpy.tril(inserted_cells[:, :, numpy.newaxis] == inserted_cells[:, numpy.newaxis, :],
+                                         -1).any(axis=2)
+        is_subtracted = is_inserted_tile_on_board & is_first_insertion
+        blocking_window_counts = window_counts - self.get_tile_window_counts(inserted_cells, is_red, is_filled,
+                                                                             is_subtracted)
+        red_counts, white_counts, filled_counts, empty_counts = window_counts
+        red_blocking_counts, white_blocking_counts, filled_blocking_counts, empty_blocking_counts = \
+            blocking_window_counts
+
+        scores = {}
+        for is_color, values, value_1_counts, value_0_counts, value_1_blocking_counts, value_0_blocking_counts in (
+                (True, is_red, red_counts, white_counts, red_blocking_counts, white_blocking_counts),
+                (False, is_filled, filled_counts, empty_counts, filled_blocking_counts, empty_blocking_counts)):
+            # A single tile of the other type in the window prevents it from ever being a winning line.
+            line_maximums = self.get_direction_maximums(inserted_cells, values, is_inserted_tile_on_board,
+                                                        (value_0_counts, value_1_counts),
+                                                        (value_1_counts, value_0_counts))
+            # A tile blocks the tiles of the other value in a window, as long as no other tile has its value.
+            blocking_maximums = self.get_direction_maximums(inserted_cells, values, is_inserted_tile_on_board,
+                                                            (value_1_blocking_counts, value_0_blocking_counts),
+                                                            (value_0_blocking_counts, value_1_blocking_counts))
+            scores[is_color] = (self.line_scores[line_maximums].sum(axis=(1, 2)),
+                                self.blocking_scores[blocking_maximums].sum(axis=(1, 2)))
+        return scores[is_color_player][0].astype(numpy.float64) \
+            - 0.8 * scores[not is_color_player][0] \
+            + 10 * scores[not is_color_player][1] \
+            - 0.5 * scores[is_color_player][1]
+
+    def get_direction_maximums(self, inserted_cells, values, is_inserted_tile_on_board, counts, other_counts):
+        """ For every inserted tile of every position and every direction, return the largest count of the windows
+            of the tile in that direction in which the other count is 0 (0 if there is none, or if the tile is not on
+            the board anymore). counts and other_counts are pairs of window counts: the ones to use for the tiles
+            whose value is 0, and the ones to use for the tiles whose value is 1.
+        """
+        windows = self.cell_direction_windows[inserted_cells]
+        position_indexes = numpy.arange(len(inserted_cells))[:, numpy.newaxis, numpy.newaxis, numpy.newaxis]
+        tile_values = values[:, :, numpy.newaxis, numpy.newaxis]
+        tile_counts = numpy.where(tile_values, counts[1][position_indexes, windows],
+                                  counts[0][position_indexes, windows])
+        tile_other_counts = numpy.where(tile_values, other_counts[1][position_indexes, windows],
+                                        other_counts[0][position_indexes, windows])
+        maximums = numpy.where(tile_other_counts == 0, tile_counts, 0).max(axis=3)
+        return numpy.where(is_inserted_tile_on_board[:, :, numpy.newaxis], maximums, 0)
+
+    def get_tile_window_counts(self, cells, is_red, is_filled, is_counted=True):
+        """ Return the window counts (see get_window_counts) of the tiles of the given cells and faces, all of shape
+            (N, T), only counting the ones for which is_counted is True.
+        """
+        tile_planes = numpy.stack((is_red, ~is_red, is_filled, ~is_filled)) & is_counted
+        return numpy.einsum('knt,ntw->knw', tile_planes.astype(numpy.int16), self.cell_windows[cells])
+
+    def get_leaf_planes(self, board, moves, is_recycling):
+        """ Return the occupied, red and filled planes of the positions reached by playing each of the moves
+            on the board, their window counts and the cell indexes of the 2 tiles placed by each move (shape (N, 2)).
+        """
+        bitboard = board.bitboard
+        evaluator = board.evaluator
+        nbr_moves = len(moves)
+        nbr_bytes = (self.nbr_cells + 7) // 8
+        base_planes = [numpy.unpackbits(numpy.frombuffer(plane.to_bytes(nbr_bytes, 'little'), dtype=numpy.uint8),
+                                        count=self.nbr_cells, bitorder='little').astype(bool)
+                       for plane in (bitboard.occupied, bitboard.red, bitboard.filled)]
+        occupied, red, filled = [numpy.repeat(plane[numpy.newaxis, :], nbr_moves, axis=0) for plane in base_planes]
+        base_window_counts = numpy.array([counts + [1] for counts in (evaluator.red_counts, evaluator.white_counts,
+                                                                      evaluator.filled_counts, evaluator.empty_counts)],
+                                         dtype=numpy.int16)
+        window_counts = numpy.repeat(base_window_counts[:, numpy.newaxis, :], nbr_moves, axis=1)
+        move_indexes = numpy.arange(nbr_moves)[:, numpy.newaxis]
+        if is_recycling:
+            removed_cells = numpy.array([[bitboard.cell_index(*move.position_card_1st_tile),
+                                          bitboard.cell_index(*move.position_card_2nd_tile)] for move in moves],
+                                        dtype=numpy.intp)
+            window_counts -= self.get_tile_window_counts(removed_cells, red[move_indexes, removed_cells],
+                                                         filled[move_indexes, removed_cells])
+            occupied[move_indexes, removed_cells] = False
+        placed_cells = numpy.array([[bitboard.cell_index(*move.position_first_tile),
+                                     bitboard.cell_index(*move.position_second_tile)] for move in moves],
+                                   dtype=numpy.intp)
+        tile_faces = numpy.array([board.ROTATION_TILE_FACES[(move.new_rot_code if is_recycling
+                                                             else move.rotation_code) - 1] for move in moves],
+                                 dtype=bool)
+        window_counts += self.get_tile_window_counts(placed_cells, tile_faces[:, :, 0], tile_faces[:, :, 1])
+        occupied[move_indexes, placed_cells] = True
+        red[move_indexes, placed_cells] = tile_faces[:, :, 0]
+        filled[move_indexes, placed_cells] = tile_faces[:, :, 1]
+        shape = (nbr_moves, self.height, self.width)
+        return occupied.reshape(shape), red.reshape(shape), filled.reshape(shape), window_counts, placed_cells
+
+    def evaluate_moves(self, board, moves, inserted_tiles_pos, is_recycling, is_color_player):
+        """ Return the scores of the positions reached by playing each of the moves on the board, the tiles of
+            inserted_tiles_pos having been inserted before them. The board is not modified.
+        """
+        occupied, red, filled, window_counts, placed_cells = self.get_leaf_planes(board, moves, is_recycling)
+        parent_cells = numpy.array([board.bitboard.cell_index(tile_pos[0], tile_pos[1])
+                                    for tile_pos in inserted_tiles_pos], dtype=numpy.intp)
+        inserted_cells = numpy.concatenate((numpy.repeat(parent_cells[numpy.newaxis, :], len(moves), axis=0),
+                                            placed_cells), axis=1)
+        return self.evaluate(occupied, red, filled, inserted_cells, is_color_player, window_counts)
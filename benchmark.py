@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import sys
+import time
+from game_scripts import *
+
+# The move scripts of the project, whose positions are the reference positions of the benchmark.
+REFERENCE_SCRIPT_PATHS = [os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+                          for file_name in ("recycle.txt", "winning_cond.txt")]
+# Move generation is counted deeper in the regular phase, which has a lot less moves per position.
+DEFAULT_PERFT_DEPTH = 3
+DEFAULT_RECYCLING_PERFT_DEPTH = 2
+BENCHMARK_TRANSPOSITION_TABLE_SIZE_MB = 4
+# Fields of the records that do not depend on the speed of the machine, which have to be the same from one commit to the
+# next unless the move generation or the search changes.
+DETERMINISTIC_FIELDS = ("nodes", "leaves", "move", "score")
+
+
+def get_reference_positions(script_paths=REFERENCE_SCRIPT_PATHS):
+    """ Return (name, board) of the reference positions: the empty board and the position at the end of every script
+        of the files, named after the file and the index of the script in it.
+    """
+    positions = [("empty", Board(NBR_CARDS, 0, None))]
+    for path in script_paths:
+        positions.extend(load_script_positions(path))
+    return positions
+
+
+def get_player_to_move(board):
+    # The scripts do not tell who played first, so the dot player is assumed to have.
+    return DotPlayer() if board.nbr_moves % 2 == 0 else ColorPlayer()
+
+
+def perft(board, depth):
+    """ Return the number of sequences of depth moves that can be played from the position, following the rules of
+        the game except that the games do not end when a player wins: the counts only depend on the move generation.
+    """
+    is_recycling = board.isInRecyclingPhase()
+    if depth <= 1:
+        if depth < 1:
+            return 1
+        # The moves of the last ply only have to be counted, which their codes are enough for.
+        return len(board.generate_valid_recycling_move_codes() if is_recycling
+                   else board.generate_valid_regular_move_codes())
+    moves = board.generate_valid_recycling_moves() if is_recycling else board.generate_valid_regular_moves()
+    nbr_leaves = 0
+    for move in moves:
+        board.make(move)
+        nbr_leaves += perft(board, depth - 1)
+        board.unmake()
+    return nbr_leaves
+
+
+class TraceCounter:
+    """ Stands in for a TraceFile to get the number of leaves and the score of the move from findMinimax. """
+    def __init__(self):
+        self.nbr_leaves = 0
+        self.score = None
+        self.root_scores = []
+
+    def addLevel3(self, numOfNodes, level3):
+        self.nbr_leaves = numOfNodes
+        self.score = level3
+
+    def addLevel2(self, level2):
+        self.root_scores = level2
+
+
+def search_minimax(board, current_player, depth):
+    # findMinimax always searches the same number of plies.
+    trace_counter = TraceCounter()
+    move = findMinimax(board, trace_counter, current_player)
+    nbr_leaves = trace_counter.nbr_leaves if trace_counter.nbr_leaves > 0 else len(trace_counter.root_scores)
+    return move, trace_counter.score, 1 + len(trace_counter.root_scores) + trace_counter.nbr_leaves, nbr_leaves
+
+
+def search_alpha_beta(board, current_player, depth, batch_evaluation=False):
+    ai_search = AlphaBetaSearch(board, current_player,
+                                transposition_table=TranspositionTable(BENCHMARK_TRANSPOSITION_TABLE_SIZE_MB),
+                                move_orderer=MoveOrderer(board), batch_evaluation=batch_evaluation)
+    move, score = ai_search.search(depth)
+    return move, score, ai_search.nbr_nodes, ai_search.nbr_leaves
+
+
+def search_alpha_beta_batch(board, current_player, depth):
+    return search_alpha_beta(board, current_player, depth, True)
+
+
+# The searches measured, each returning the move it chose for the current player, its score, and the numbers of nodes
+# (including the leaves) and leaves it searched. A depth of None is the default depth of the search.
+SEARCHES = {
+    'minimax': search_minimax,
+    'alphabeta': search_alpha_beta,
+}
+if is_batch_evaluation_available():
+    SEARCHES['alphabeta-batch'] = search_alpha_beta_batch
+
+
+def run_perft(positions, max_depth=DEFAULT_PERFT_DEPTH, max_recycling_depth=DEFAULT_RECYCLING_PERFT_DEPTH):
+    """ Yield a record of the perft counts of every position, from depth 1 to the largest depth of its phase. """
+    for name, board in positions:
+        for depth in range(1, (max_recycling_depth if board.isInRecyclingPhase() else max_depth) + 1):
+            start = time.perf_counter()
+            nbr_leaves = perft(board, depth)
+            duration = time.perf_counter() - start
+            yield {"kind": "perft", "position": name, "depth": depth, "nodes": nbr_leaves, "seconds": duration,
+                   "nodes_per_second": nbr_leaves / duration if duration > 0 else 0.0}
+
+
+def run_searches(positions, search_names=None, depth=None):
+    """ Yield a record of the time every search takes to choose a move in every position in which the game can go on,
+        and of its speed in nodes per second.
+    """
+    for name, board in positions:
+        moves = board.generate_valid_recycling_moves() if board.isInRecyclingPhase() \
+            else board.generate_valid_regular_moves()
+        if not moves:
+            continue
+        search_depth = depth
+        if search_depth is None:
+            search_depth = DEFAULT_RECYCLING_SEARCH_DEPTH if board.isInRecyclingPhase() else DEFAULT_SEARCH_DEPTH
+        for search_name in (search_names or sorted(SEARCHES)):
+            start = time.perf_counter()
+            move, score, nbr_nodes, nbr_leaves = SEARCHES[search_name](board, get_player_to_move(board), search_depth)
+            duration = time.perf_counter() - start
+            yield {"kind": "search", "search": search_name, "position": name,
+                   "depth": None if search_name == 'minimax' else search_depth, "move": board.get_move_notation(move),
+                   "score": score, "nodes": nbr_nodes, "leaves": nbr_leaves, "seconds": duration,
+                   "nodes_per_second": nbr_nodes / duration if duration > 0 else 0.0}
+
+
+def get_record_key(record):
+    return record["kind"], record.get("search"), record["position"], record["depth"]
+
+
+def compare_records(records, reference_records):
+    """ Return the lines describing how the records differ from the reference ones (an earlier output of the
+        benchmark): the records whose deterministic fields changed, and the speed of each kind of record
+        compared to the reference. Also return whether the deterministic fields are all the same.
+    """
+    references = {get_record_key(record): record for record in reference_records}
+    lines = []
+    is_same = True
+    durations = dict()
+    for record in records:
+        reference = references.get(get_record_key(record))
+        if reference is None:
+            continue
+        for field in DETERMINISTIC_FIELDS:
+            if field in record and record[field] != reference.get(field):
+                is_same = False
+                lines.append("%s %s depth %s: %s %s instead of %s" % (record.get("search") or record["kind"],
+                                                                       record["position"], record["depth"], field,
+                                                                       record[field], reference.get(field)))
+        kind_durations = durations.setdefault((record["kind"], record.get("search")), [0.0, 0.0])
+        kind_durations[0] += record["seconds"]
+        kind_durations[1] += reference["seconds"]
+    for (kind, search_name), (duration, reference_duration) in sorted(durations.items(), key=str):
+        lines.append("%s%s: %.3f s instead of %.3f s (x%.2f)" % (kind, " " + search_name if search_name else "",
+                                                                 duration, reference_duration,
+                                                                 reference_duration / duration if duration > 0 else 0.0))
+    return lines, is_same
+
+
+def read_records(path):
+    with open(path) as records_file:
+        return [json.loads(line) for line in records_file if line.strip()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count the moves that can be played from the reference positions "
+                                                 "(perft) and measure the speed of the searches. Every result is "
+                                                 "written as a JSON line, so that the outputs of two commits can be "
+                                                 "compared.")
+    parser.add_argument("--output", default=None, help="file the results are written to (standard output by default)")
+    parser.add_argument("--compare", default=None,
+                        help="earlier output to compare the results with: the command fails if the move counts, "
+                             "nodes or moves chosen are different")
+    parser.add_argument("--perft-depth", type=int, default=DEFAULT_PERFT_DEPTH,
+                        help="largest perft depth in the regular phase")
+    parser.add_argument("--recycling-perft-depth", type=int, default=DEFAULT_RECYCLING_PERFT_DEPTH,
+                        help="largest perft depth in the recycling phase")
+    parser.add_argument("--searches", nargs="*", choices=sorted(SEARCHES), default=None,
+                        help="searches measured (all by default, none if given without any)")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="number of plies searched (default depth of each phase by default)")
+    arguments = parser.parse_args()
+
+    positions = get_reference_positions()
+    records = list(run_perft(positions, arguments.perft_depth, arguments.recycling_perft_depth))
+    if arguments.searches is None or arguments.searches:
+        records.extend(run_searches(positions, arguments.searches, arguments.depth))
+    output = open(arguments.output, 'w') if arguments.output is not None else sys.stdout
+    for record in records:
+        output.write(json.dumps(record, sort_keys=True) + "\n")
+    if output is not sys.stdout:
+        output.close()
+    if arguments.compare is not None:
+        lines, is_same = compare_records(records, read_records(arguments.compare))
+        print("\n".join(lines), file=sys.stderr)
+        sys.exit(0 if is_same else 1)
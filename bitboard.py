@@ -0,0 +1,62 @@
+class BitBoard:
+    """ Compact representation of the cells of the board, used by the AI to probe the board quickly.
+        Each plane is an integer in which bit (y * width + x) represents the cell (x, y) of the board:
+        - occupied: set when there is a tile on the cell
+        - red: set when the tile on the cell is red (unset means white, or no tile at all)
+        - filled: set when the dot of the tile on the cell is filled (unset means empty, or no tile at all)
+        Which tiles belong together is known by the board (see Board.cell_cards).
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.nbr_cells = width * height
+        self.full_mask = (1 << self.nbr_cells) - 1
+        self.occupied = 0
+        self.red = 0
+        self.filled = 0
+
+    def cell_index(self, x, y):
+        return y * self.width + x
+
+    def cell_position(self, index):
+        return index % self.width, index // self.width
+
+    def is_in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_occupied(self, x, y):
+        return (self.occupied >> (y * self.width + x)) & 1 == 1
+
+    def is_red(self, x, y):
+        return (self.red >> (y * self.width + x)) & 1 == 1
+
+    def is_filled(self, x, y):
+        return (self.filled >> (y * self.width + x)) & 1 == 1
+
+    def set_cell(self, x, y, is_red, is_filled):
+        index = y * self.width + x
+        bit = 1 << index
+        self.occupied |= bit
+        if is_red:
+            self.red |= bit
+        else:
+            self.red &= ~bit
+        if is_filled:
+            self.filled |= bit
+        else:
+            self.filled &= ~bit
+
+    def clear_cell(self, x, y):
+        index = y * self.width + x
+        not_bit = ~(1 << index)
+        self.occupied &= not_bit
+        self.red &= not_bit
+        self.filled &= not_bit
+
+    def get_matching_mask(self, plane, value_bit):
+        """ Return the mask of the occupied cells whose bit in the given plane (self.red or self.filled)
+            is equal to value_bit.
+        """
+        if value_bit:
+            return self.occupied & plane
+        return self.occupied & ~plane & self.full_mask
@@ -1,8 +1,24 @@
 from enum import Enum
 from exceptions import *
 from trace import *
-from printingDisabler import *
+from bitboard import *
+from search import *
+from move_ordering import *
+from parallel_search import *
+from lazy_smp import *
+from transposition import *
+from evaluation import *
+from windows import *
+from validation import *
+from batch_eval import *
+from opening_book import *
+from endgame import *
+from instrumentation import *
+from move_encoding import *
+from position_encoding import *
 import copy
+import os
+import time
 
 # The specifications tell us that there are 24 cards available to be placed on the board (shared between both players).
 NBR_CARDS = 24
@@ -30,6 +46,10 @@ def all_values_positive(col1, row1, col2 = 1, row2 = 1):
     return True
 
 class RecyclingMove:
+    # The search creates hundreds of moves per position in the recycling phase, which are lighter without a __dict__.
+    __slots__ = ('card_to_swap', 'old_rot_code', 'new_rot_code', 'position_card_1st_tile', 'position_card_2nd_tile',
+                 'position_first_tile', 'position_second_tile')
+
     def __init__(self, card_to_swap, old_rot_code, new_rot_code,
                  position_card_1st_tile, position_card_2nd_tile, position_first_tile, position_second_tile):
         self.card_to_swap = card_to_swap
@@ -41,6 +61,9 @@ class RecyclingMove:
         self.position_second_tile = position_second_tile
 
 class RegularMove:
+    __slots__ = ('new_card', 'position_first_tile', 'position_second_tile', 'rotation_code')
+
+    # new_card can be None for the moves generated by the board, which get their own card when they are first played.
     def __init__(self, new_card, position_first_tile, position_second_tile, rotation_code):
         self.new_card = new_card
         self.position_first_tile = position_first_tile
@@ -60,44 +83,44 @@ def findMinimax(board, tracing, current_player):
     # regular moves.
     if board.isInRecyclingPhase():
         for recycling_move in board.generate_valid_recycling_moves():
-            board.swap_card_direct(recycling_move)
+            board.make(recycling_move)
             recycling_move_heuristic = board.heuristic_recycling_moves([recycling_move.position_first_tile, recycling_move.position_second_tile], current_player)
             level2Array.append((recycling_move_heuristic, recycling_move))
             # Restore the swapped card
-            board.put_back_card_direct(recycling_move)
+            board.unmake()
     else:
         # Generating the next moves we can do from the current state of the board.
         # Temporarily insert cards to it to check the heuristic cost of each move.
         for regular_move in board.generate_valid_regular_moves():
-            board.insert_card_direct(regular_move)
+            board.make(regular_move)
             minLevel3Heuristic = 1000000
             # If the move we are finding the heuristic for is the last regular move, then the next moves to be
             # generated are recycling ones.
-            if board.nbr_cards == board.max_nbr_cards - 1:
+            if board.isInRecyclingPhase():
                 # Find the move with the smallest heuristic since min is playing.
                 for level3_recycling_move in board.generate_valid_recycling_moves():
-                    board.swap_card_direct(level3_recycling_move)
+                    board.make(level3_recycling_move)
                     inserted_tiles_pos = [level3_recycling_move.position_first_tile, level3_recycling_move.position_second_tile, regular_move.position_first_tile, regular_move.position_second_tile]
                     level3RecyclingMoveHeuristic = board.heuristic_recycling_moves(inserted_tiles_pos, current_player)
                     if level3RecyclingMoveHeuristic < minLevel3Heuristic:
                         minLevel3Heuristic = level3RecyclingMoveHeuristic
-                    board.put_back_card_direct(level3_recycling_move)
+                    board.unmake()
                     level3Nodes += 1
             else:
                 # Again, generating next moves, the ones min is to play. Temporarily insert cards to the board.
                 # Find the move with the smallest heuristic since min is playing.
                 for level3move in board.generate_valid_regular_moves():
-                    board.insert_card_direct(level3move)
+                    board.make(level3move)
                     inserted_tiles_pos = [level3move.position_first_tile, level3move.position_second_tile, regular_move.position_first_tile, regular_move.position_second_tile]
                     level3Heuristic = board.heuristic_regular_moves(inserted_tiles_pos, current_player)
                     if level3Heuristic < minLevel3Heuristic:
                         minLevel3Heuristic = level3Heuristic
-                    board.remove_card(level3move)
+                    board.unmake()
                     level3Nodes += 1
             # We found the smallest heuristic cost out of all the level 3 moves.
             # We can append the current regular move with its smallest resulting heuristic (since min is playing next)
             level2Array.append((minLevel3Heuristic, regular_move))
-            board.remove_card(regular_move)
+            board.unmake()
 
     chosenHeuristic = level2Array[0][0]
     moveChosen = level2Array[0][1]
@@ -120,6 +143,8 @@ class Tile:
         W = White
         F = Filled
         E = Empty
+        There are only 4 different tiles, shared by all the cards and boards (see Tile.get). The card a tile of the
+        board belongs to is kept by the board (see Board.get_card).
     """
     class Color(Enum):
         red = 'R'
@@ -129,21 +154,33 @@ class Tile:
         filled = 'F'
         empty = 'E'
 
-    def __init__(self, color, dotState, cardOwner):
+    __slots__ = ('color', 'dotState', 'is_red', 'is_filled', 'item_keys')
+
+    # The 4 tiles, by (is red, is filled).
+    tiles = dict()
+
+    def __init__(self, color, dotState):
         self.color = color
         self.dotState = dotState
-        self.cardOwner = cardOwner
+        self.is_red = color == Tile.Color.red
+        self.is_filled = dotState == Tile.DotState.filled
+        self.item_keys = {Tile.Color: color, Tile.DotState: dotState}
+
+    @staticmethod
+    def get(color, dotState):
+        return Tile.tiles[color == Tile.Color.red, dotState == Tile.DotState.filled]
 
     def get_item_key(self, type_item):
-        if type_item == Tile.Color:
-            return self.color
-        else:
-            return self.dotState
+        return self.item_keys[type_item]
 
     def __str__(self):
-        # Note: We assume there is no more than 99 different ids
-        return self.color.value + self.dotState.value + "%-2d" % self.cardOwner.id
+        return self.color.value + self.dotState.value
+
 
+for tile_color in Tile.Color:
+    for tile_dot_state in Tile.DotState:
+        Tile.tiles[tile_color == Tile.Color.red, tile_dot_state == Tile.DotState.filled] = Tile(tile_color,
+                                                                                                tile_dot_state)
 
 
 class Side:
@@ -169,12 +206,14 @@ class Card:
     # please do not call self.id_count but Card.id_count instead whenever you want to modify the value of the variable.
     id_count = 0
 
+    # Every card has the same 2 sides, so they are shared by all the cards, which only keep their id and rotation.
+    side1 = Side(Tile.get(Tile.Color.red, Tile.DotState.filled), Tile.get(Tile.Color.white, Tile.DotState.empty))
+    side2 = Side(Tile.get(Tile.Color.red, Tile.DotState.empty), Tile.get(Tile.Color.white, Tile.DotState.filled))
+
+    __slots__ = ('id', 'rotationCode', 'activeSide', 'orientation')
+
     def __init__(self, rotation_code=1):
         self.id = Card.id_count
-        self.side1 = Side(Tile(Tile.Color.red, Tile.DotState.filled, self),
-                          Tile(Tile.Color.white, Tile.DotState.empty, self))
-        self.side2 = Side(Tile(Tile.Color.red, Tile.DotState.empty, self),
-                          Tile(Tile.Color.white, Tile.DotState.filled, self))
         self.update_rotation_code(rotation_code)
 
     def update_rotation_code(self, rotation_code):
@@ -221,15 +260,75 @@ class Board:
         for j in range(0, DIMENSIONS_X_Y[1]):
             heuristic_board_conversion[(i, j)] = (i + 1) + j * 10
 
-    def __init__(self, max_nbr_cards):
+    # Legality template of each rotation code: the offsets of the 1st and 2nd tiles of the card from its position
+    # (bottom left cell), and whether the card lies horizontally (on 2 columns) or vertically (on 2 rows).
+    ROTATION_TEMPLATES = []
+    for rotation_code in range(1, Card.NBR_ROTATION_CODES + 1):
+        tile_1_offset, tile_2_offset = Card(rotation_code).get_tile_positions((0, 0))
+        ROTATION_TEMPLATES.append((rotation_code, tile_1_offset, tile_2_offset, tile_1_offset[1] == tile_2_offset[1]))
+    # (is red, is filled) of the 1st and 2nd tiles of a card with each rotation code.
+    ROTATION_TILE_FACES = []
+    for rotation_code in range(1, Card.NBR_ROTATION_CODES + 1):
+        active_side = Card(rotation_code).activeSide
+        ROTATION_TILE_FACES.append(((active_side.tile1.color == Tile.Color.red,
+                                     active_side.tile1.dotState == Tile.DotState.filled),
+                                    (active_side.tile2.color == Tile.Color.red,
+                                     active_side.tile2.dotState == Tile.DotState.filled)))
+
+    # Keys used to hash the positions of the board, shared by all the boards.
+    zobrist_keys = ZobristKeys(DIMENSIONS_X_Y[0] * DIMENSIONS_X_Y[1])
+
+    def __init__(self, max_nbr_cards, transposition_table_size_mb=DEFAULT_TRANSPOSITION_TABLE_SIZE_MB,
+                 opening_book_path=DEFAULT_OPENING_BOOK_PATH):
         # NOTE: Initially, the board is empty (no cards on it), so no tiles are on it either.
         # We illustrate a location on the board with no tile/card as a string (blank spaces).
         self.board = [[' ' * 4 for x in range(self.DIMENSIONS_X_Y[0])] for y in range(self.DIMENSIONS_X_Y[1])]
+        # The bitboard mirrors self.board and is what the AI probes. Both are only modified through
+        # set_tile and clear_tile so that they never get out of sync.
+        self.bitboard = BitBoard(self.DIMENSIONS_X_Y[0], self.DIMENSIONS_X_Y[1])
+        # Card each cell of the board belongs to (or None), indexed like the cells of the bitboard. The tiles are shared
+        # by all the cards (see Tile), so the board is what knows which card a tile is part of.
+        self.cell_cards = [None] * self.bitboard.nbr_cells
+        # All the lines of 4 cells in which a player can win, shared by all the boards of the same size.
+        self.windows = get_window_table(self.DIMENSIONS_X_Y[0], self.DIMENSIONS_X_Y[1])
+        # Number of tiles in each column. Since cards always lie on top of other cards, it is also the row
+        # of the first empty cell of the column.
+        self.column_heights = [0] * self.DIMENSIONS_X_Y[0]
+        # Zobrist hash of the tiles on the board and counts of the tiles of each window of 4 cells used
+        # by the heuristic, also updated by set_tile and clear_tile.
+        self.zobrist_hash = 0
+        # Hashes of the cells of every card and of the cells of the card recycled last (see ZobristKeys.get_card_key),
+        # which tell apart the positions having the same tiles but not the same recycling moves. They are updated by
+        # apply_move and unmake, and set by the methods loading a position.
+        self.cards_hash = 0
+        self.recycled_card_hash = 0
+        self.evaluator = IncrementalEvaluator(self.bitboard)
+        # Only created if the AI scores its leaves in batches (see evaluate_moves), since it needs NumPy.
+        self.batch_evaluator = None
+        # The transposition table of the AI is only allocated once it plays its first move.
+        # A size of 0 disables it.
+        self.transposition_table_size_mb = transposition_table_size_mb
+        self.transposition_table = None
+        # The opening book (see OpeningBook) is only opened when the AI plays its first move, if there is one.
+        self.opening_book_path = opening_book_path
+        self.opening_book = None
+        # Likewise, the worker processes of the parallel search are only started when it is first used. They are only
+        # stopped by close.
+        self.process_pool = None
+        self.process_pool_nbr_workers = 0
         self.nbr_cards = 0
         # There is at most maxNbrCards cards on the board and we have to ensure no one can insert cards (through the
         # methods we provide) when we reach that quota.
         self.max_nbr_cards = max_nbr_cards
         self.recycled_card = 23
+        # Cards taken off the board by remove_card, given to the next generated moves played (see insert_card_direct)
+        # so that the search does not create a card for every move it plays.
+        self.spare_cards = []
+        # Number of moves played by both players since the beginning of the game.
+        self.nbr_moves = 0
+        # (move, card recycled before it, hash of that card) of every move played by make and not undone yet by unmake.
+        # The rest of the state of the board before a move follows from the move itself.
+        self.undo_stack = []
 
     # Looping through the board
     # For all coordinates with a card placed on it, we determine if it's red/white and empty/filled
@@ -260,6 +359,21 @@ class Board:
         return evaluation_func
 
     def heuristic_regular_moves(self, inserted_tiles_pos, current_player):
+        # The evaluator gives the same result as heuristic_regular_moves_full_scan by reading the counts of tiles
+        # it keeps up to date for every window of 4 cells, instead of going through the cells around each tile.
+        return self.evaluator.heuristic(inserted_tiles_pos, current_player.typeItem == Tile.Color)
+
+    def evaluate_moves(self, moves, inserted_tiles_pos, is_recycling, current_player):
+        """ Return the heuristic of the positions reached by playing each of the moves, the tiles of inserted_tiles_pos
+            having been inserted before them, as a list. The moves are not played.
+        """
+        if self.batch_evaluator is None:
+            self.batch_evaluator = BatchEvaluator(self.DIMENSIONS_X_Y[0], self.DIMENSIONS_X_Y[1])
+        # The heuristic of the recycling moves is the same as the one of the regular moves.
+        return self.batch_evaluator.evaluate_moves(self, moves, inserted_tiles_pos, is_recycling,
+                                                   current_player.typeItem == Tile.Color).tolist()
+
+    def heuristic_regular_moves_full_scan(self, inserted_tiles_pos, current_player):
         enemy_player_type_item = Tile.DotState if current_player.typeItem == Tile.Color else Tile.Color
         return self.calculate_heuristic_inserted_tiles(inserted_tiles_pos, current_player.typeItem)\
                 - 0.8 * self.calculate_heuristic_inserted_tiles(inserted_tiles_pos, enemy_player_type_item)\
@@ -290,16 +404,278 @@ class Board:
             self.position_second_tile = position_second_tile
             self.rotation_code = rotation_code
 
-    def ai_move(self, tracing, current_player):
-        with TogglePrintingOffGuard():
-            aiMove = findMinimax(self, tracing, current_player)
-            self.nbr_cards += 1
+    def ai_move(self, tracing, current_player, depth=None, time_budget_ms=None, node_limit=None, print_move=True,
+                nbr_workers=None, lazy_smp=False, use_opening_book=True, use_endgame_solver=True, stats=None,
+                cancel_event=None, progress_callback=None):
+        """ Find the best move for current_player by searching depth plies (moves of either player) ahead and play it.
+            If a time budget (the number of milliseconds the AI has left for the rest of the game) or a node limit is
+            given, the AI instead searches deeper and deeper (up to depth plies, if given) until its share of the time
+            budget for this move or its node limit is exhausted, and plays the best move of the deepest completed search.
+            The move played is printed in the notation of the players (see get_move_notation), unless print_move is False.
+            If nbr_workers is more than 1, the search is done by that many worker processes. A search to a fixed depth
+            splits the root moves between them (see ParallelRootSearch) and chooses the same move as the serial search,
+            unless lazy_smp is True. Searches with a time budget or node limit, and the ones with lazy_smp, have all the
+            workers search the whole position while sharing their transposition table (see LazySMPSearch).
+            The serial search scores its leaves in batches when NumPy is installed (see Board.evaluate_moves).
+            If use_opening_book is True and the position is in the opening book, searched at least depth plies deep (or
+            DEFAULT_SEARCH_DEPTH, if no depth is given), its move is played without searching.
+            If use_endgame_solver is True and at most ENDGAME_SOLVER_NBR_MOVES moves are left before the game ends in
+            a draw, the game is solved instead (see EndgameSolver): the AI plays a winning move if there is one,
+            or else a move that does not lose. The solver is bound by the time budget, node limit and cancel_event too.
+            If tracing is not None, what the AI found is given to its add_search method (see SearchTrace). The root moves
+            are then all searched with the full window, so that their scores are exact and not bounds.
+            If stats is a SearchStats, what the move cost is added to it, and the serial search measures the time of
+            each of its phases (see InstrumentedAlphaBetaSearch). Without it, nothing is measured.
+            If cancel_event (a threading.Event) is given, it can be set from another thread to stop the serial search:
+            the AI then plays the best move found so far. The search to a fixed depth is then done by searching deeper
+            and deeper up to that depth, so that there is a best move to play as soon as possible. progress_callback,
+            if given, is called by the serial search with the depth it searches and the number of nodes searched so far
+            (see AlphaBetaSearch).
+        """
+        start = time.perf_counter()
+        if use_opening_book:
+            book_move, book_score = self.get_opening_book_move(current_player,
+                                                               depth if depth is not None else DEFAULT_SEARCH_DEPTH)
+            if book_move is not None:
+                if tracing != None:
+                    tracing.add_search(self.get_search_trace("book", current_player, None, book_move, book_score, 0,
+                                                             0, start, [(book_score, book_move)]))
+                if stats is not None:
+                    self.add_search_stats(stats, "book", None, None, start)
+                if print_move:
+                    print(self.get_move_notation(book_move))
+                return self.play_move(book_move)
+        deadline = None
+        if time_budget_ms is not None:
+            deadline = time.perf_counter() + allocate_move_time(time_budget_ms, self.nbr_moves, MAX_NBR_MOVES) / 1000
+        nbr_moves_left = MAX_NBR_MOVES - self.nbr_moves
+        if use_endgame_solver and 0 < nbr_moves_left <= ENDGAME_SOLVER_NBR_MOVES:
+            endgame_solver = EndgameSolver(self, current_player, deadline=deadline, node_limit=node_limit,
+                                           cancel_event=cancel_event, progress_callback=progress_callback,
+                                           exact_root_scores=tracing is not None)
+            aiMove, result = endgame_solver.solve(nbr_moves_left)
+            if tracing != None:
+                tracing.add_search(self.get_search_trace("endgame", current_player, nbr_moves_left, aiMove, result,
+                                                         endgame_solver.nbr_nodes, endgame_solver.nbr_leaves, start,
+                                                         endgame_solver.root_scores, endgame_solver.root_move_stats))
+            if stats is not None:
+                self.add_search_stats(stats, "endgame", nbr_moves_left, endgame_solver, start)
+            if print_move:
+                print(self.get_move_notation(aiMove))
+            return self.play_move(aiMove)
+        if self.transposition_table is None and self.transposition_table_size_mb > 0:
+            self.transposition_table = TranspositionTable(self.transposition_table_size_mb)
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        is_parallel = nbr_workers is not None and nbr_workers > 1
+        exact_root_scores = tracing is not None
+        if time_budget_ms is None and node_limit is None and depth is None:
+            depth = DEFAULT_RECYCLING_SEARCH_DEPTH if self.isInRecyclingPhase() else DEFAULT_SEARCH_DEPTH
+        if time_budget_ms is None and node_limit is None and not (is_parallel and lazy_smp) \
+                and (cancel_event is None or is_parallel):
+            if is_parallel:
+                search_name = "parallel"
+                ai_search = ParallelRootSearch(self, current_player, self.get_process_pool(nbr_workers), nbr_workers,
+                                               exact_root_scores=exact_root_scores)
+            elif stats is not None:
+                search_name = "alphabeta"
+                ai_search = InstrumentedAlphaBetaSearch(self, current_player, transposition_table=self.transposition_table,
+                                                        move_orderer=MoveOrderer(self),
+                                                        batch_evaluation=is_batch_evaluation_available(), stats=stats,
+                                                        exact_root_scores=exact_root_scores)
+            else:
+                search_name = "alphabeta"
+                ai_search = AlphaBetaSearch(self, current_player, transposition_table=self.transposition_table,
+                                            move_orderer=MoveOrderer(self),
+                                            batch_evaluation=is_batch_evaluation_available(),
+                                            exact_root_scores=exact_root_scores)
+            aiMove, aiScore = ai_search.search(depth)
+            searched_depth = depth
+        else:
+            if depth is None:
+                # There is no point in searching past the end of the game.
+                depth = max(MAX_NBR_MOVES - self.nbr_moves, 1)
+            if is_parallel:
+                search_name = "lazy-smp"
+                ai_search = LazySMPSearch(self, current_player, deadline, node_limit, self.get_process_pool(nbr_workers),
+                                          nbr_workers, exact_root_scores=exact_root_scores)
+            elif stats is not None:
+                search_name = "alphabeta"
+                ai_search = InstrumentedAlphaBetaSearch(self, current_player, deadline, node_limit,
+                                                        self.transposition_table, MoveOrderer(self),
+                                                        is_batch_evaluation_available(), stats, cancel_event,
+                                                        progress_callback, exact_root_scores)
+            else:
+                search_name = "alphabeta"
+                ai_search = AlphaBetaSearch(self, current_player, deadline, node_limit, self.transposition_table,
+                                            MoveOrderer(self), is_batch_evaluation_available(), cancel_event,
+                                            progress_callback, exact_root_scores)
+            aiMove, aiScore, searched_depth = ai_search.iterative_deepening(depth)
+        if tracing != None:
+            tracing.add_search(self.get_search_trace(search_name, current_player, searched_depth, aiMove, aiScore,
+                                                     ai_search.nbr_nodes, ai_search.nbr_leaves, start,
+                                                     ai_search.root_scores, ai_search.root_move_stats))
+        if stats is not None:
+            self.add_search_stats(stats, search_name, searched_depth, ai_search, start)
+        if print_move:
+            print(self.get_move_notation(aiMove))
+        return self.play_move(aiMove)
+
+    def get_search_trace(self, search_name, current_player, depth, move, score, nbr_nodes, nbr_leaves, start,
+                         root_scores, root_move_stats=None):
+        return SearchTrace(search_name, self.nbr_moves, current_player.name, depth, self.get_move_notation(move), score,
+                           nbr_nodes, nbr_leaves, time.perf_counter() - start, root_scores,
+                           [self.get_move_notation(root_move) for score, root_move in root_scores], root_move_stats)
+
+    def add_search_stats(self, stats, search_name, depth, ai_search, start):
+        stats.search_name = search_name
+        stats.depth = depth
+        if ai_search is not None:
+            stats.add_search(ai_search)
+        stats.total_ns += int((time.perf_counter() - start) * 1e9)
+
+    def play_move(self, move):
+        """ Play a valid move (generated by the board) for the player to move, keeping count of the cards and moves
+            like insert_card and swap_card do. Return the positions of the tiles placed.
+            Unlike make, the move cannot be undone.
+        """
+        inserted_tiles_pos = self.apply_move(move)
+        if not isinstance(move, RecyclingMove):
+            # The card may have been used by the search before, so it is given the id of a new card.
+            move.new_card.id = Card.id_count
             Card.id_count += 1
-        return self.swap_card_direct(aiMove) if isinstance(aiMove, RecyclingMove) else self.insert_card_direct(aiMove)
+        return inserted_tiles_pos
+
+    def apply_move(self, move):
+        self.nbr_moves += 1
+        if isinstance(move, RecyclingMove):
+            # Like for the players, the card recycled by the AI cannot be moved on the next turn.
+            self.recycled_card = move.card_to_swap
+            self.cards_hash ^= self.get_card_key(move.position_card_1st_tile, move.position_card_2nd_tile) \
+                ^ self.get_card_key(move.position_first_tile, move.position_second_tile)
+            self.recycled_card_hash = self.get_recycled_card_key(move.position_first_tile, move.position_second_tile)
+            return self.swap_card_direct(move)
+        self.nbr_cards += 1
+        self.cards_hash ^= self.get_card_key(move.position_first_tile, move.position_second_tile)
+        return self.insert_card_direct(move)
+
+    def make(self, move):
+        """ Play a valid move (generated by the board) like play_move, so that unmake can undo it: the cells, the
+            rotation code of the card, the numbers of cards and moves, the card recycled last, the hash and the
+            incremental evaluation are all restored. The kind of move played is given by the move itself, not by the
+            phase of the game, so moves can be made and unmade across the start of the recycling phase.
+            Return the positions of the tiles placed.
+        """
+        self.undo_stack.append((move, self.recycled_card, self.recycled_card_hash))
+        return self.apply_move(move)
+
+    def unmake(self):
+        """ Undo the last move played by make. """
+        move, self.recycled_card, self.recycled_card_hash = self.undo_stack.pop()
+        self.nbr_moves -= 1
+        if isinstance(move, RecyclingMove):
+            # The move knows the cells and rotation code the card had before it.
+            self.cards_hash ^= self.get_card_key(move.position_card_1st_tile, move.position_card_2nd_tile) \
+                ^ self.get_card_key(move.position_first_tile, move.position_second_tile)
+            self.put_back_card_direct(move)
+        else:
+            self.nbr_cards -= 1
+            self.cards_hash ^= self.get_card_key(move.position_first_tile, move.position_second_tile)
+            self.remove_card(move)
+
+    def get_opening_book_move(self, current_player, depth):
+        """ Return the move of the opening book for the position searched at least depth plies deep and its score, or
+            (None, None).
+        """
+        if self.opening_book is None:
+            if self.opening_book_path is None or not os.path.exists(self.opening_book_path):
+                return None, None
+            try:
+                self.opening_book = OpeningBook(self.opening_book_path)
+            except InvalidOpeningBookException:
+                # The AI can play without the book, so it is simply not used.
+                self.opening_book_path = None
+                return None, None
+        return self.opening_book.get_move(self, current_player, depth)
+
+    def get_process_pool(self, nbr_workers):
+        # The pool is kept from one move to the next, since starting the worker processes takes time.
+        if self.process_pool is None or self.process_pool_nbr_workers != nbr_workers:
+            if self.process_pool is not None:
+                self.process_pool.shutdown()
+            self.process_pool = create_process_pool(nbr_workers)
+            self.process_pool_nbr_workers = nbr_workers
+        return self.process_pool
+
+    def close(self):
+        """ Stop the worker processes of the parallel search and close the opening book, if the AI used them. The board
+            can still be played on afterwards: they are started or opened again when needed.
+        """
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+            self.process_pool = None
+            self.process_pool_nbr_workers = 0
+        if self.opening_book is not None:
+            self.opening_book.close()
+            self.opening_book = None
 
     def remove_card(self, regular_move):
-        self.board[regular_move.position_first_tile[1]][regular_move.position_first_tile[0]] = ' ' * 4
-        self.board[regular_move.position_second_tile[1]][regular_move.position_second_tile[0]] = ' ' * 4
+        self.clear_tile(regular_move.position_first_tile)
+        self.clear_tile(regular_move.position_second_tile)
+        if regular_move.new_card is not None:
+            self.spare_cards.append(regular_move.new_card)
+            regular_move.new_card = None
+
+    def get_card_key(self, position_1st_tile, position_2nd_tile):
+        return self.zobrist_keys.get_card_key(self.bitboard.cell_index(position_1st_tile[0], position_1st_tile[1]),
+                                              self.bitboard.cell_index(position_2nd_tile[0], position_2nd_tile[1]))
+
+    def get_recycled_card_key(self, position_1st_tile, position_2nd_tile):
+        return self.zobrist_keys.get_recycled_card_key(
+            self.bitboard.cell_index(position_1st_tile[0], position_1st_tile[1]),
+            self.bitboard.cell_index(position_2nd_tile[0], position_2nd_tile[1]))
+
+    def init_card_hashes(self):
+        """ Compute cards_hash and recycled_card_hash from the cards on the board. """
+        card_cell_indexes = dict()
+        for cell_index, card in enumerate(self.cell_cards):
+            if card is not None:
+                card_cell_indexes.setdefault(id(card), []).append(cell_index)
+        self.cards_hash = 0
+        for cell_indexes in card_cell_indexes.values():
+            self.cards_hash ^= self.zobrist_keys.get_card_key(cell_indexes[0], cell_indexes[1])
+        cell_indexes = card_cell_indexes.get(id(self.recycled_card))
+        self.recycled_card_hash = 0 if cell_indexes is None \
+            else self.zobrist_keys.get_recycled_card_key(cell_indexes[0], cell_indexes[1])
+
+    def get_card(self, position):
+        """ Return the card the tile at the given position belongs to, or None if there is no tile there. """
+        return self.cell_cards[self.bitboard.cell_index(position[0], position[1])]
+
+    def set_tile(self, position, tile, card):
+        if self.bitboard.is_occupied(position[0], position[1]):
+            self.clear_tile(position)
+        self.column_heights[position[0]] += 1
+        is_red = tile.is_red
+        is_filled = tile.is_filled
+        cell_index = self.bitboard.cell_index(position[0], position[1])
+        self.board[position[1]][position[0]] = tile
+        self.cell_cards[cell_index] = card
+        self.bitboard.set_cell(position[0], position[1], is_red, is_filled)
+        self.zobrist_hash ^= self.zobrist_keys.get_tile_key(cell_index, is_red, is_filled)
+        self.evaluator.add_tile(cell_index, is_red, is_filled)
+
+    def clear_tile(self, position):
+        if self.bitboard.is_occupied(position[0], position[1]):
+            cell_index = self.bitboard.cell_index(position[0], position[1])
+            is_red = self.bitboard.is_red(position[0], position[1])
+            is_filled = self.bitboard.is_filled(position[0], position[1])
+            self.zobrist_hash ^= self.zobrist_keys.get_tile_key(cell_index, is_red, is_filled)
+            self.evaluator.remove_tile(cell_index, is_red, is_filled)
+            self.column_heights[position[0]] -= 1
+        self.board[position[1]][position[0]] = ' ' * 4
+        self.cell_cards[self.bitboard.cell_index(position[0], position[1])] = None
+        self.bitboard.clear_cell(position[0], position[1])
 
     def convert_coordinate(self, letter_num_coordinate):
         """ Convert a coordinate in the form [A-Z] [0-9] (eg. A 2) (given as a tuple)
@@ -341,298 +717,334 @@ class Board:
 
     def read_input(self, input_std):
         """ Method used to try the read the input from the user.
-            Return true if we were able to successfully and false otherwise.
+            Return the positions of the tiles placed if we were able to play the move and None otherwise,
+            in which case the reason why the move is not valid is printed.
         """
         args = input_std.split()
-        if len(args) == 0:
-            print("Enter a move.")
+        if len(args) == 4 and args[0] == "0":
+            inserted_tiles_pos = self.insert_card(args)
+        elif len(args) == 7:
+            inserted_tiles_pos = self.swap_card(args)
+        else:
+            inserted_tiles_pos = self.parse_move(input_std)
+        if isinstance(inserted_tiles_pos, MoveRejection):
+            print(self.get_rejection_message(inserted_tiles_pos, args))
             return None
+        return inserted_tiles_pos
+
+    def parse_move(self, input_std):
+        """ Return the move entered by a player (as read by read_input), or the reason why it is not valid
+            (MoveRejection), without playing it nor printing anything. The move can then be played with play_move.
+        """
+        args = input_std.split()
+        if len(args) == 0:
+            return MoveRejection.no_move
         if args[0] == "0":
             if len(args) != 4:
-                print("Input error: Regular moves should have 4 arguments (not " + str(len(args)) + "):")
-                print("0 orientationCode xCoord yCoord")
-                print("Example: 0 5 A 2")
-                return None
-            return self.insert_card(args)
-        else:
-            if len(args) != 7:
-                print("Input error: Swap moves should have 7 arguments (not " + str(len(args)) + "):")
-                print("xCoordTile1 yCoordTile1 xCoordTile2 yCoordTile2 newOrientationCode newCoordX newCoordY")
-                print("Example: F 2 F 3 3 A 2")
-                return None
-            return self.swap_card(args)
+                return MoveRejection.wrong_nbr_regular_arguments
+            return self.get_regular_move(args)
+        if len(args) != 7:
+            return MoveRejection.wrong_nbr_recycling_arguments
+        return self.get_recycling_move(args)
+
+    def get_rejection_message(self, rejection, args):
+        """ Return the message explaining to the player why the move given by args (the arguments entered by the player)
+            was rejected.
+        """
+        fields = {'nbr_args': len(args), 'max_nbr_cards': self.max_nbr_cards,
+                  'nbr_rotation_codes': Card.NBR_ROTATION_CODES}
+        if len(args) == 4:
+            fields.update(rotation_code_argument="2nd", rotation_code=args[1], position=" ".join(args[2:4]))
+        elif len(args) == 7:
+            fields.update(rotation_code_argument="5th", rotation_code=args[4], position=" ".join(args[5:7]),
+                          tile_1_position=" ".join(args[0:2]), tile_2_position=" ".join(args[2:4]))
+        return REJECTION_MESSAGES[rejection].format(**fields)
+
+    def get_move_notation(self, move):
+        """ Return the move as a player would enter it. """
+        if isinstance(move, RecyclingMove):
+            return chr(65 + min(move.position_card_1st_tile[0], move.position_card_2nd_tile[0])) + " " + \
+                   str(min(move.position_card_1st_tile[1], move.position_card_2nd_tile[1]) + 1) + " " + \
+                   chr(65 + max(move.position_card_1st_tile[0], move.position_card_2nd_tile[0])) + " " + \
+                   str(max(move.position_card_1st_tile[1], move.position_card_2nd_tile[1]) + 1) + " " + \
+                   str(move.new_rot_code) + " " + \
+                   chr(65 + min(move.position_first_tile[0], move.position_second_tile[0])) + " " + \
+                   str(min(move.position_first_tile[1], move.position_second_tile[1]) + 1)
+        return "0 " + str(move.rotation_code) + " " + \
+               chr(65 + min(move.position_first_tile[0], move.position_second_tile[0])) + " " + \
+               str(min(move.position_first_tile[1], move.position_second_tile[1]) + 1)
+
+    def parse_position(self, letter, number):
+        """ Return the position of the board given by the coordinates entered by a player (eg. A 2), or None. """
+        try:
+            return self.convert_coordinate((letter, int(number)))
+        except (OutOfBoundsException, KeyError, ValueError):
+            return None
+
+    def parse_rotation_code(self, rotation_code):
+        """ Return the rotation code entered by a player, or the reason why it is not valid. """
+        try:
+            input_rot_code = int(rotation_code)
+        except ValueError:
+            return MoveRejection.rotation_code_not_integer
+        if input_rot_code <= 0 or input_rot_code > Card.NBR_ROTATION_CODES:
+            return MoveRejection.rotation_code_out_of_range
+        return input_rot_code
 
     def swap_card(self, args):
+        """ Tries to recycle the card given by the 7 arguments entered by the player.
+            Return the positions of the tiles of the card before and after the move if it was successful,
+            and the reason why the move is not valid (MoveRejection) otherwise.
+        """
+        recyclingMove = self.get_recycling_move(args)
+        if isinstance(recyclingMove, MoveRejection):
+            return recyclingMove
+        # Make sure the same card can't be recycled twice (see play_move)
+        return self.play_move(recyclingMove)
+
+    def get_recycling_move(self, args):
+        """ Return the recycling move given by the 7 arguments entered by the player, or the reason why it is not valid
+            (MoveRejection). The board is not modified.
+        """
         # Check if you should recycle on this turn
         if not self.isInRecyclingPhase():
-            print("Error: Cannot do a recycling move until " + str(self.max_nbr_cards) + " cards are on the board.\n" \
-                                                                                  "Please do a normal move instead.")
-            return None
+            return MoveRejection.not_recycling_phase
 
         # Check if the first 4 inputs give you a position
-        try:
-            position_card_1st_tile = self.convert_coordinate((args[0], int(args[1])))
-            card_1st_tile = self.board[position_card_1st_tile[1]][position_card_1st_tile[0]]
-        except Exception:
-            print(args[2] + " " + args[3] + " does not represent a valid position.")
-            return None
-        try:
-            position_card_2nd_tile = self.convert_coordinate((args[2], int(args[3])))
-            card_2nd_tile = self.board[position_card_2nd_tile[1]][position_card_2nd_tile[0]]
-        except Exception:
-            print(args[2] + " " + args[3] + " does not represent a valid position.")
-            return None
+        position_card_1st_tile = self.parse_position(args[0], args[1])
+        if position_card_1st_tile is None:
+            return MoveRejection.invalid_tile_1_position
+        position_card_2nd_tile = self.parse_position(args[2], args[3])
+        if position_card_2nd_tile is None:
+            return MoveRejection.invalid_tile_2_position
+        card_1st_tile = self.board[position_card_1st_tile[1]][position_card_1st_tile[0]]
+        card_2nd_tile = self.board[position_card_2nd_tile[1]][position_card_2nd_tile[0]]
 
         # Check if the position are tiles with cards on them
         if isinstance(card_1st_tile, str) or isinstance(card_2nd_tile, str):
-            print("1 or both tile do not have a card on them.")
-            return None
+            return MoveRejection.no_card_on_tiles
 
         # Checks if the tiles come from the same card
-        if card_1st_tile.cardOwner != card_2nd_tile.cardOwner:
-            print("The 2 tiles selected do not come from the same card. Choose 2 tiles from the same card.")
-            return None
+        card_to_swap = self.get_card(position_card_1st_tile)
+        if card_to_swap is not self.get_card(position_card_2nd_tile) or position_card_1st_tile == position_card_2nd_tile:
+            return MoveRejection.tiles_of_different_cards
         # Otherwise, we ensured the identity of the card needing to be swapped
-        card_to_swap = card_1st_tile.cardOwner
-
-        # Checks to see if there is a tile used over the chosen card, so that the board won't become illegal
-        if position_card_2nd_tile[0] == position_card_1st_tile[0]:
-            if isinstance(self.board[max(position_card_1st_tile[1], position_card_2nd_tile[1]) + 1][position_card_1st_tile[0]],
-                          Tile):
-                print(
-                    "You cannot move this card, it would leave the board in an illegal state. Please choose another card.")
-                return None
-        elif isinstance(self.board[position_card_1st_tile[1] + 1][position_card_1st_tile[0]], Tile) or isinstance(
-                self.board[position_card_2nd_tile[1] + 1][position_card_2nd_tile[0]], Tile):
-            print("You cannot move this card, it would leave the board in an illegal state. Please choose another card.")
-            return None
 
         # Checks that the 5th argument is a rotation code
-        try:
-            input_rot_code = int(args[4])
-        except ValueError:
-            print("The 5th argument should be an integer and " + args[5] + " is not.")
-            return None
-        if input_rot_code <= 0 or input_rot_code > Card.NBR_ROTATION_CODES:
-            print("Valid rotation codes range from 1 to " + str(Card.NBR_ROTATION_CODES) + ", " + "thus " +
-                  str(input_rot_code) + " is out of range.")
-            return None
+        input_rot_code = self.parse_rotation_code(args[4])
+        if isinstance(input_rot_code, MoveRejection):
+            return input_rot_code
 
         # Gets the new position of the card
-        try:
-            position_new_card = self.convert_coordinate((args[5], int(args[6])))
-        except ValueError:
-            print(args[5] + " " + args[6] + " does not represent a valid position.")
-            return None
-
+        position_new_card = self.parse_position(args[5], args[6])
+        if position_new_card is None:
+            return MoveRejection.invalid_position
 
-        recyclingMove = self.get_valid_recycling_move(card_to_swap, card_1st_tile, card_2nd_tile, input_rot_code, position_new_card,
-                                                      position_card_1st_tile, position_card_2nd_tile)
-        if recyclingMove is None:
-            print ("This is not a valid recycling move")
-            return None
-
-        self.swap_card_direct(recyclingMove)
-
-        # Make sure the same card can't be recycled twice
-        self.recycled_card = card_to_swap
-
-        return [recyclingMove.position_card_1st_tile, recyclingMove.position_card_2nd_tile, recyclingMove.position_first_tile, recyclingMove.position_second_tile]
+        return self.get_valid_recycling_move(card_to_swap, position_card_1st_tile, position_card_2nd_tile,
+                                             input_rot_code, position_new_card)
 
     def swap_card_direct(self, recyclingMove):
-        if game_info.ai_player != None and game_info.current_player == game_info.ai_player:
-            print(chr(65 + min(recyclingMove.position_card_1st_tile[0], recyclingMove.position_card_2nd_tile[0]))
-                  + " " + str(
-                min(recyclingMove.position_card_1st_tile[1], recyclingMove.position_card_2nd_tile[1]) + 1) + " " +
-                  chr(65 + max(recyclingMove.position_card_1st_tile[0], recyclingMove.position_card_2nd_tile[0]))
-                  + " " + str(
-                max(recyclingMove.position_card_1st_tile[1], recyclingMove.position_card_2nd_tile[1]) + 1) + " " +
-                  str(recyclingMove.new_rot_code) + " " + chr(
-                65 + min(recyclingMove.position_first_tile[0], recyclingMove.position_second_tile[0]))
-                  + " " + str(min(recyclingMove.position_first_tile[1], recyclingMove.position_second_tile[1]) + 1))
-
-        recyclingMove.card_to_swap.update_rotation_code(recyclingMove.new_rot_code)
-        self.board[recyclingMove.position_card_1st_tile[1]][recyclingMove.position_card_1st_tile[0]] = ' ' * 4
-        self.board[recyclingMove.position_card_2nd_tile[1]][recyclingMove.position_card_2nd_tile[0]] = ' ' * 4
-        self.board[recyclingMove.position_first_tile[1]][recyclingMove.position_first_tile[0]] = recyclingMove.card_to_swap.activeSide.tile1
-        self.board[recyclingMove.position_second_tile[1]][recyclingMove.position_second_tile[0]] = recyclingMove.card_to_swap.activeSide.tile2
+        card = recyclingMove.card_to_swap
+        card.update_rotation_code(recyclingMove.new_rot_code)
+        self.clear_tile(recyclingMove.position_card_1st_tile)
+        self.clear_tile(recyclingMove.position_card_2nd_tile)
+        self.set_tile(recyclingMove.position_first_tile, card.activeSide.tile1, card)
+        self.set_tile(recyclingMove.position_second_tile, card.activeSide.tile2, card)
         return [recyclingMove.position_card_1st_tile, recyclingMove.position_card_2nd_tile, recyclingMove.position_first_tile, recyclingMove.position_second_tile]
 
     # Method used to "cancel" a recycling move
     def put_back_card_direct(self, recyclingMove):
-        recyclingMove.card_to_swap.update_rotation_code(recyclingMove.old_rot_code)
-        self.board[recyclingMove.position_card_1st_tile[1]][recyclingMove.position_card_1st_tile[0]] = recyclingMove.card_to_swap.activeSide.tile1
-        self.board[recyclingMove.position_card_2nd_tile[1]][recyclingMove.position_card_2nd_tile[0]] = recyclingMove.card_to_swap.activeSide.tile2
-        self.board[recyclingMove.position_first_tile[1]][recyclingMove.position_first_tile[0]] = ' ' * 4
-        self.board[recyclingMove.position_second_tile[1]][recyclingMove.position_second_tile[0]] = ' ' * 4
-
-    def get_valid_recycling_move(self, card_to_swap, card_1st_tile, card_2nd_tile, input_rot_code, position_new_card,
-                                 position_card_1st_tile, position_card_2nd_tile):
+        card = recyclingMove.card_to_swap
+        card.update_rotation_code(recyclingMove.old_rot_code)
+        self.clear_tile(recyclingMove.position_first_tile)
+        self.clear_tile(recyclingMove.position_second_tile)
+        self.set_tile(recyclingMove.position_card_1st_tile, card.activeSide.tile1, card)
+        self.set_tile(recyclingMove.position_card_2nd_tile, card.activeSide.tile2, card)
+
+    def get_valid_recycling_move(self, card_to_swap, position_card_1st_tile, position_card_2nd_tile, input_rot_code,
+                                 position_new_card):
+        """ Return the recycling move placing the card on the given cells at position_new_card with the given
+            rotation code, or the reason why it is not valid (MoveRejection). The board is not modified.
+        """
+        # Checks to see if there is a tile used over the chosen card, so that the board won't become illegal
+        for position in (position_card_1st_tile, position_card_2nd_tile):
+            above_position = (position[0], position[1] + 1)
+            if above_position[1] < self.column_heights[position[0]] and \
+                    above_position not in (position_card_1st_tile, position_card_2nd_tile):
+                return MoveRejection.card_covered
+
         # Makes sure the last card used isn't the one being played/swapped now
         if card_to_swap == self.recycled_card:
-            print("You cannot move the card that was moved/played last turn. Please choose another card.")
-            return None
+            return MoveRejection.card_recycled_last_turn
 
         # Check if the card has the same rotation code and a different location, to be a legal recycle move
-        if not(card_1st_tile.cardOwner.rotationCode == input_rot_code and position_new_card[0] == min(position_card_1st_tile[0], position_card_2nd_tile[0])
-               and position_new_card[1] == min(position_card_1st_tile[1], position_card_2nd_tile[1])):
-            self.board[position_card_1st_tile[1]][position_card_1st_tile[0]] = ' ' * 4
-            self.board[position_card_2nd_tile[1]][position_card_2nd_tile[0]] = ' ' * 4
-            old_rot_code_cache = card_to_swap.rotationCode
-            card_to_swap.update_rotation_code(input_rot_code)
-            position_first_tile, position_second_tile = card_to_swap.get_tile_positions(position_new_card)
-
-            # The new position is tested for legality. Place the card back before returning,
-            # whether it is an illegal move or not.
-            if not self.card_location_is_valid_spot(position_first_tile, position_second_tile, card_to_swap):
-                print("The location where you want to place your recycled card is not valid.")
-                self.board[position_card_1st_tile[1]][position_card_1st_tile[0]] = card_1st_tile
-                self.board[position_card_2nd_tile[1]][position_card_2nd_tile[0]] = card_2nd_tile
-                card_to_swap.update_rotation_code(old_rot_code_cache)
-                return None
-            self.board[position_card_1st_tile[1]][position_card_1st_tile[0]] = card_1st_tile
-            self.board[position_card_2nd_tile[1]][position_card_2nd_tile[0]] = card_2nd_tile
-            card_to_swap.update_rotation_code(old_rot_code_cache)
-            return RecyclingMove(card_to_swap, old_rot_code_cache, input_rot_code,
-                                 position_card_1st_tile, position_card_2nd_tile,
-                                 position_first_tile, position_second_tile)
-
-        print("You cannot keep the same rotation and position.")
-        return None
+        card_position = (min(position_card_1st_tile[0], position_card_2nd_tile[0]),
+                         min(position_card_1st_tile[1], position_card_2nd_tile[1]))
+        if card_to_swap.rotationCode == input_rot_code and tuple(position_new_card) == card_position:
+            return MoveRejection.same_rotation_and_position
+
+        # The new position is tested for legality as if the card had already been removed from the board,
+        # without actually removing it.
+        heights = self.get_column_heights_without_card(position_card_1st_tile, position_card_2nd_tile)
+        rotation_code, tile_1_offset, tile_2_offset, is_horizontal = self.ROTATION_TEMPLATES[input_rot_code - 1]
+        position_first_tile = add_tuples(position_new_card, tile_1_offset)
+        position_second_tile = add_tuples(position_new_card, tile_2_offset)
+        rejection = self.get_location_rejection(position_first_tile, position_second_tile, heights)
+        if rejection is not None:
+            return rejection
+        # The cells are given in any order by the player, so the ones of each tile are recomputed from the card.
+        old_position_1st_tile, old_position_2nd_tile = card_to_swap.get_tile_positions(card_position)
+        return RecyclingMove(card_to_swap, card_to_swap.rotationCode, input_rot_code,
+                             old_position_1st_tile, old_position_2nd_tile, position_first_tile, position_second_tile)
 
     def insert_card(self, input_args):
         """ Tries to insert card into the board from the inputArgs given by player.
-            If it was successful in inserting it, it increments self.nbrCards by 1 and returns the new_card.
-            Otherwise, it returns None.
+            If it was successful in inserting it, it increments self.nbrCards by 1 and returns the positions
+            of its tiles. Otherwise, it returns the reason why the move is not valid (MoveRejection).
+        """
+        regular_move = self.get_regular_move(input_args)
+        if isinstance(regular_move, MoveRejection):
+            return regular_move
+        return list(self.play_move(regular_move))
+
+    def get_regular_move(self, input_args):
+        """ Return the regular move given by the 4 arguments entered by the player, or the reason why it is not valid
+            (MoveRejection). The board is not modified.
         """
-        # Ensure that an exception is thrown when we try to exceed the max number of cards to indicate failure
+        # Ensure that the move is rejected when we try to exceed the max number of cards
         if self.nbr_cards >= self.max_nbr_cards:
-            print("Error: Cannot insert more than " + str(self.max_nbr_cards) + " cards on the board.\nPlease do a recycling "
-                                                                         "move instead.")
-            return None
-        try:
-            input_rot_code = int(input_args[1])
-        except ValueError:
-            print("The 2nd argument should be an integer and " + input_args[1] + " is not.")
-            return None
-        if input_rot_code <= 0 or input_rot_code > Card.NBR_ROTATION_CODES:
-            print("Valid rotation codes range from 1 to " + str(Card.NBR_ROTATION_CODES) + ", " + "thus " +
-                  str(input_rot_code) + " is out of range.")
-            return None
-
-        new_card = Card(input_rot_code)
-        try:
-            position_new_card = self.convert_coordinate((input_args[2], int(input_args[3])))
-        except OutOfBoundsException as e:
-            print(e.message)
-            print(input_args[2] + " " + input_args[3] + " does not represent a valid position.")
-            return None
-        position_first_tile, position_second_tile = new_card.get_tile_positions(position_new_card)
-        if not self.card_location_is_valid_spot(position_first_tile, position_second_tile, new_card):
-            print("The location where you want to place your card is not valid.")
-            return None
-
-        self.board[position_first_tile[1]][position_first_tile[0]] = new_card.activeSide.tile1
-        self.board[position_second_tile[1]][position_second_tile[0]] = new_card.activeSide.tile2
-
-        self.nbr_cards += 1
-        Card.id_count += 1
-
-        return [position_first_tile, position_second_tile]
+            return MoveRejection.no_card_left
+        input_rot_code = self.parse_rotation_code(input_args[1])
+        if isinstance(input_rot_code, MoveRejection):
+            return input_rot_code
+
+        position_new_card = self.parse_position(input_args[2], input_args[3])
+        if position_new_card is None:
+            return MoveRejection.invalid_position
+        rotation_code, tile_1_offset, tile_2_offset, is_horizontal = self.ROTATION_TEMPLATES[input_rot_code - 1]
+        position_first_tile = add_tuples(position_new_card, tile_1_offset)
+        position_second_tile = add_tuples(position_new_card, tile_2_offset)
+        rejection = self.get_location_rejection(position_first_tile, position_second_tile, self.column_heights)
+        if rejection is not None:
+            return rejection
+        # Like for the moves generated by the board, the card is only taken when the move is played.
+        return RegularMove(None, position_first_tile, position_second_tile, input_rot_code)
 
     def insert_card_direct(self, regular_move):
-        if game_info.ai_player != None and game_info.current_player == game_info.ai_player:
-            print("0 " + str(regular_move.rotation_code) + " " + chr(
-                65 + min(regular_move.position_first_tile[0], regular_move.position_second_tile[0]))
-                  + " " + str(min(regular_move.position_first_tile[1], regular_move.position_second_tile[1]) + 1))
-
+        if regular_move.new_card is None:
+            regular_move.new_card = self.spare_cards.pop() if self.spare_cards else Card(regular_move.rotation_code)
         regular_move.new_card.update_rotation_code(regular_move.rotation_code)
-        self.board[regular_move.position_first_tile[1]][regular_move.position_first_tile[0]] = regular_move.new_card.activeSide.tile1
-        self.board[regular_move.position_second_tile[1]][regular_move.position_second_tile[0]] = regular_move.new_card.activeSide.tile2
+        card = regular_move.new_card
+        self.set_tile(regular_move.position_first_tile, card.activeSide.tile1, card)
+        self.set_tile(regular_move.position_second_tile, card.activeSide.tile2, card)
         return (regular_move.position_first_tile, regular_move.position_second_tile)
 
     def card_location_is_valid_spot(self, tile_1_location, tile_2_location, new_card):
-        """ Return whether or not the given location in the 2d-dimensional array is valid.
-            To be valid, it has to:
+        """ Return whether or not the given location in the 2d-dimensional array is valid (see get_location_rejection).
+            Used to check if we can put a new tile on that location or if it is illegal.
+        """
+        return self.get_location_rejection(tile_1_location, tile_2_location, self.column_heights) is None
+
+    def get_location_rejection(self, tile_1_location, tile_2_location, heights):
+        """ Return why the tiles of a card cannot be placed on the given locations of a board whose columns have
+            the given heights (MoveRejection), or None if they can.
+            To be valid, the location has to:
             - 1- Be empty (no tiles already on it)
             - 2- Not be out of bounds (x and y not < 0, x < dimensions.x, y < dimensions.y)
             - 3- a: Be placed on row 1 (tile1location.y = 0) or
                  b: On top of cards that were already placed
-            Used to check if we can put a new tile on that location or if it is illegal.
+            Since cards always lie on top of other cards, a cell is empty if it is at or above the height
+            of its column, and it is supported if it is right at that height.
         """
-        # This variable is used for condition 1:
-        # Check whether both board locations are empty (no tile on neither of them)
-        empty_locations = False
-        try:
-            empty_locations = not isinstance(self.board[tile_1_location[1]][tile_1_location[0]], Tile) and \
-                             not isinstance(self.board[tile_2_location[1]][tile_2_location[0]], Tile)
-        # Condition 2: Exception raised when at least one of the locations of the card is out of bounds
-        except ValueError:
-            print("Error: Both squares (tiles) that are part of the card being placed must not have empty tiles at the "
-                  "bottom.")
-            return False
-        except IndexError:
-            print("Error: One square is not on a board tile.")
-            return False
-
-        if not empty_locations:
-            print("Error: The card would be placed on top of another card's segment(s).")
-            return False
-
-        # Condition 3a: Check whether the card is placed on row 1
-        if tile_1_location[1] == 0 or tile_2_location[1] == 0:
-            # Since we checked conditions 1, 2 and 3a, the card location is valid.
-            return True
-        # Condition 3b: Card has to be placed on top of other cards
-        if new_card.orientation == Card.Orientation.right or new_card.orientation == Card.Orientation.left:
-            tile1_location_y_under = tile_1_location[1] - 1
-            tile2_location_y_under = tile_2_location[1] - 1
-
-            occupied_locations = (isinstance(self.board[tile1_location_y_under][tile_1_location[0]], Tile) and
-                                  isinstance(self.board[tile2_location_y_under][tile_2_location[0]], Tile))
-            if not occupied_locations:
-                print("Error: The card would hang over one or 2 empty cells, which is not allowed.")
-                return False
-            # Since we checked conditions 1, 2 and 3b, the card location is valid.
-            return True
-        else:  # if new_card.orientation == Card.Orientation.up or new_card.orientation == Card.Orientation.down:
-            tile_location_under_y = min(tile_1_location[1], tile_2_location[1]) - 1
-            if not isinstance(self.board[tile_location_under_y][tile_1_location[0]], Tile):
-                print("Error: The card would hang over an empty cell, which is not allowed.")
-                return False
-            # Since we checked conditions 1, 2 and 3b, the card location is valid.
-            return True
+        tile_locations = (tile_1_location, tile_2_location)
+        # Condition 2: At least one of the locations of the card is out of bounds
+        for x, y in tile_locations:
+            if not self.bitboard.is_in_bounds(x, y):
+                return MoveRejection.out_of_bounds
+
+        # Condition 1: Check whether both board locations are empty (no tile on neither of them)
+        for x, y in tile_locations:
+            if y < heights[x]:
+                return MoveRejection.cell_occupied
+
+        # Condition 3: Each tile has to be placed on row 1, on top of other cards or on top of the other tile
+        for x, y in tile_locations:
+            if y > heights[x] and (x, y - 1) not in tile_locations:
+                return MoveRejection.hanging_over_empty_cell
+        return None
 
     def get_type_tile_pos(self, tile_pos, type_item):
-        tile = self.board[tile_pos[1]][tile_pos[0]]
-        if not isinstance(tile, Tile):
+        if not self.bitboard.is_occupied(tile_pos[0], tile_pos[1]):
             return None
         if type_item == Tile.Color:
-            type = tile.color
-        else:
-            type = tile.dotState
-        return type
+            return Tile.Color.red if self.bitboard.is_red(tile_pos[0], tile_pos[1]) else Tile.Color.white
+        return Tile.DotState.filled if self.bitboard.is_filled(tile_pos[0], tile_pos[1]) else Tile.DotState.empty
+
+    def get_other_type_item(self, type_item):
+        # Type of item of the other player.
+        return Tile.DotState if type_item == Tile.Color else Tile.Color
+
+    def get_matching_mask(self, type, type_item):
+        # Mask of the cells of the bitboard holding a tile whose color/dot state (depending on type_item) is type.
+        if type_item == Tile.Color:
+            return self.bitboard.get_matching_mask(self.bitboard.red, type == Tile.Color.red)
+        return self.bitboard.get_matching_mask(self.bitboard.filled, type == Tile.DotState.filled)
 
     def check_win_conditions(self, inserted_tiles_pos, type_item):
-        offsets = [(0, -1), (1, 0), (1, 1), (1, -1)]
-        for tile_pos in inserted_tiles_pos:
-            type = self.get_type_tile_pos(tile_pos, type_item)
-            if type is None:
-                continue
-            for offset in offsets:
-                for i in range(4):
-                    start_pos = (tile_pos[0] - i * offset[0], tile_pos[1] - i * offset[1])
-                    end_pos = (start_pos[0] + 3 * offset[0], start_pos[1] + 3 * offset[1])
-                    if all_values_positive(start_pos[0], start_pos[1], end_pos[0], end_pos[1]):
-                        if self.get_nbr_matching_tiles_in_offset_direction(start_pos, offset, type, type_item) >= 4:
-                            pos2 = add_tuples(start_pos, offset)
-                            pos3 = add_tuples(pos2, offset)
-                            pos4 = add_tuples(pos3, offset)
-                            return [start_pos, pos2, pos3, pos4]
+        bitboard = self.bitboard
+        plane = bitboard.red if type_item == Tile.Color else bitboard.filled
+        cell_indexes = [bitboard.cell_index(tile_pos[0], tile_pos[1]) for tile_pos in inserted_tiles_pos
+                        if bitboard.is_occupied(tile_pos[0], tile_pos[1])]
+        window_index = self.find_winning_window(cell_indexes, bitboard.occupied, plane)
+        return None if window_index is None else list(self.windows.window_positions[window_index])
+
+    def check_move_win_conditions(self, move, type_item):
+        """ Return whether playing the (regular or recycling) move would complete a line of the given type of item,
+            like check_win_conditions would once the move is played, but without playing it.
+        """
+        bitboard = self.bitboard
+        occupied = bitboard.occupied
+        plane = bitboard.red if type_item == Tile.Color else bitboard.filled
+        if isinstance(move, RecyclingMove):
+            removed_mask = (1 << bitboard.cell_index(move.position_card_1st_tile[0], move.position_card_1st_tile[1])) | \
+                           (1 << bitboard.cell_index(move.position_card_2nd_tile[0], move.position_card_2nd_tile[1]))
+            occupied &= ~removed_mask
+            plane &= ~removed_mask
+            rotation_code = move.new_rot_code
+        else:
+            rotation_code = move.rotation_code
+        tile_faces = self.ROTATION_TILE_FACES[rotation_code - 1]
+        cell_indexes = []
+        for tile_pos, (is_red, is_filled) in zip((move.position_first_tile, move.position_second_tile), tile_faces):
+            cell_index = bitboard.cell_index(tile_pos[0], tile_pos[1])
+            occupied |= 1 << cell_index
+            if is_red if type_item == Tile.Color else is_filled:
+                plane |= 1 << cell_index
+            else:
+                plane &= ~(1 << cell_index)
+            cell_indexes.append(cell_index)
+        return self.find_winning_window(cell_indexes, occupied, plane) is not None
+
+    def find_winning_window(self, cell_indexes, occupied, plane):
+        """ Return the index of a window containing one of the given cells and filled with tiles having the same value
+            in the plane (the red or filled plane of the bitboard) as the tile of that cell, or None.
+        """
+        windows = self.windows
+        full_mask = self.bitboard.full_mask
+        for cell_index in cell_indexes:
+            # Only the tiles having the same color (or dot state) as the inserted one can form a line with it.
+            if (plane >> cell_index) & 1:
+                matching_mask = occupied & plane
+            else:
+                matching_mask = occupied & ~plane & full_mask
+            for window_index in windows.cell_windows[cell_index]:
+                window_mask = windows.window_masks[window_index]
+                if matching_mask & window_mask == window_mask:
+                    return window_index
         return None
 
     def calculate_heuristic_inserted_tiles(self, inserted_tiles_pos, type_item):
-        offsets = [(0, 1), (1, 0), (1, 1), (1, -1)]
+        windows = self.windows
         nbr_2_matching = 0
         nbr_3_matching = 0
         nbr_4_matching = 0
@@ -640,16 +1052,13 @@ class Board:
             type = self.get_type_tile_pos(tile_pos, type_item)
             if type is None:
                 continue
-
-            for offset in offsets:
+            matching_mask = self.get_matching_mask(type, type_item)
+            for direction_windows in windows.cell_direction_windows[self.bitboard.cell_index(tile_pos[0], tile_pos[1])]:
                 max_nbr_macthing_tiles = 0
-                for i in range(4):
-                    start_pos = (tile_pos[0] - i * offset[0], tile_pos[1] - i * offset[1])
-                    end_pos = (start_pos[0] + 3 * offset[0], start_pos[1] + 3 * offset[1])
-                    if all_values_positive(start_pos[0], start_pos[1], end_pos[0], end_pos[1]):
-                        nbr_matching_tiles = self.get_nbr_matching_tiles_in_offset_direction(start_pos, offset, type, type_item)
-                        if nbr_matching_tiles > max_nbr_macthing_tiles:
-                            max_nbr_macthing_tiles = nbr_matching_tiles
+                for window_index in direction_windows:
+                    nbr_matching_tiles = self.get_nbr_matching_tiles_in_window(window_index, matching_mask)
+                    if nbr_matching_tiles > max_nbr_macthing_tiles:
+                        max_nbr_macthing_tiles = nbr_matching_tiles
                 if max_nbr_macthing_tiles == 1:
                     pass
                 elif max_nbr_macthing_tiles == 2:
@@ -661,7 +1070,11 @@ class Board:
         return nbr_2_matching + 10 * nbr_3_matching + 100000 * nbr_4_matching
 
     def calculate_heuristic_blocking(self, inserted_tiles_pos, blocking_type_item):
-        offsets = [(0, -1), (1, 0), (1, 1), (1, -1)]
+        windows = self.windows
+        # The inserted tiles are neither blocked nor blocking tiles.
+        inserted_tiles_mask = 0
+        for tile_pos in inserted_tiles_pos:
+            inserted_tiles_mask |= 1 << self.bitboard.cell_index(tile_pos[0], tile_pos[1])
         nbr_1_blocking = 0
         nbr_2_blocking = 0
         nbr_3_blocking = 0
@@ -669,15 +1082,14 @@ class Board:
             blocking_type = self.get_type_tile_pos(tile_pos, blocking_type_item)
             if blocking_type is None:
                 continue
-            for offset in offsets:
+            blocking_mask = self.get_matching_mask(blocking_type, blocking_type_item)
+            for direction_windows in windows.cell_direction_windows[self.bitboard.cell_index(tile_pos[0], tile_pos[1])]:
                 max_nbr_blocked_tiles = 0
-                for j in range(4):
-                    start_pos = (tile_pos[0] - j * offset[0], tile_pos[1] - j * offset[1])
-                    end_pos = (start_pos[0] + 3 * offset[0], start_pos[1] + 3 * offset[1])
-                    if all_values_positive(start_pos[0], start_pos[1], end_pos[0], end_pos[1]):
-                        nbr_blocked_tiles = self.get_nbr_blocking_tiles_in_offset_direction(start_pos, inserted_tiles_pos, offset, blocking_type, blocking_type_item)
-                        if nbr_blocked_tiles > max_nbr_blocked_tiles:
-                            max_nbr_blocked_tiles = nbr_blocked_tiles
+                for window_index in direction_windows:
+                    nbr_blocked_tiles = self.get_nbr_blocked_tiles_in_window(window_index, inserted_tiles_mask,
+                                                                             blocking_mask)
+                    if nbr_blocked_tiles > max_nbr_blocked_tiles:
+                        max_nbr_blocked_tiles = nbr_blocked_tiles
                 if max_nbr_blocked_tiles == 1:
                     nbr_1_blocking += 1
                 elif max_nbr_blocked_tiles == 2:
@@ -686,179 +1098,283 @@ class Board:
                     nbr_3_blocking += 1
         return nbr_1_blocking + 10 * nbr_2_blocking + 10000 * nbr_3_blocking
 
-    def get_nbr_blocking_tiles_in_offset_direction(self, tile_pos, inserted_tiles_pos, offset, blocking_type, type_item):
-        current_pos = tile_pos
-        nbr_blocked_tiles = 0
-        checked_tiles = 0
-        while checked_tiles < 4:
-            inserted_tile_check = False
-            for placed_tile in inserted_tiles_pos:
-                if current_pos == placed_tile:
-                    inserted_tile_check = True
-            if not inserted_tile_check:
-                if all_values_positive(current_pos[0], current_pos[1]) \
-                        and isinstance(self.board[current_pos[1]][current_pos[0]], Tile):
-                    if self.board[current_pos[1]][current_pos[0]].get_item_key(type_item) != blocking_type:
-                        nbr_blocked_tiles += 1
-                    # If any of the 3 tiles checked are already blocked,
-                    # return that the current tile would not block anything further
-                    else:
-                        return 0
-            checked_tiles += 1
-            current_pos = add_tuples(current_pos, offset)
-        return nbr_blocked_tiles
-    
-    def get_nbr_matching_tiles_in_offset_direction(self, tile_pos, offset, type, type_item):
-        nbr_consecutives = 0
-        current_pos = tile_pos
-        checked_tiles = 0
-        while checked_tiles < 4:
-            if all_values_positive(current_pos[0], current_pos[1]) \
-                and isinstance(self.board[current_pos[1]][current_pos[0]], Tile):
-                # Check whether this tile is a blocking one or not
-                if self.board[current_pos[1]][current_pos[0]].get_item_key(type_item) == type:
-                    nbr_consecutives += 1
-                # If it is a blocking tile, stop checking in the offset direction.
-                else:
-                    return 0
-            checked_tiles += 1
-            current_pos = add_tuples(current_pos, offset)
-        return nbr_consecutives
+    def get_nbr_blocked_tiles_in_window(self, window_index, inserted_tiles_mask, blocking_mask):
+        window_mask = self.windows.window_masks[window_index] & ~inserted_tiles_mask
+        # If any of the other tiles of the window is already a blocking one,
+        # the current tile would not block anything further
+        if blocking_mask & window_mask:
+            return 0
+        return bin(self.bitboard.occupied & window_mask).count('1')
+
+    def get_nbr_matching_tiles_in_window(self, window_index, matching_mask):
+        window_mask = self.windows.window_masks[window_index]
+        # A tile which is not a matching one blocks the whole window.
+        if self.bitboard.occupied & ~matching_mask & window_mask:
+            return 0
+        return bin(matching_mask & window_mask).count('1')
 
     def generate_valid_recycling_moves(self):
-        cardOwnerPreviousTile = None
-        cards_recycled_and_locations = dict()
-        valid_tile_locations = list()
-        # For all rows on the board, search upwards through the corresponding column
-        # in order to find the highest nonempty tile of each column. This is because we can only recycle cards
-        # that do not have anything on top of them.
-        for i in range(0, self.DIMENSIONS_X_Y[0]):
-            for j in range(0, self.DIMENSIONS_X_Y[1]):
-                # If we found the highest tile on that column (i.e. the next highest tile is either an empty tile
-                # or the very top of the board), then generate valid recycling moves that involve swapping it out.
-                if isinstance(self.board[j][i], Tile) and \
-                        (((j+1) == self.DIMENSIONS_X_Y[1]) or not isinstance(self.board[j + 1][i], Tile)):
-                    card_to_recycle = self.board[j][i].cardOwner
-                    otherPos = self.find_location_other_tile_of_card(card_to_recycle, (i, j))
-                    if i != otherPos[0]:
-                        if isinstance(self.board[otherPos[1]+1][otherPos[0]],Tile):
-                            break
-                    # If we already checked the valid moves of that card, we can ignore it.
-                    if card_to_recycle != cardOwnerPreviousTile:
-                        cards_recycled_and_locations[card_to_recycle] = ((i, j), self.find_location_other_tile_of_card(card_to_recycle, (i, j)))
-                    cardOwnerPreviousTile = card_to_recycle
-                    # If the tile above the current one is not out of bounds, then
-                    # we assume that it is a valid tile location, since it is, by definition, the
-                    # first empty tile we encounter going upwards.
-                    if j + 1 < self.DIMENSIONS_X_Y[1]:
-                        valid_tile_locations.append((i, j+1))
-                    # We should NOT search the tiles upwards from there.
-                    break
-                # If the column contains no tile, then the bottom position of the column
-                # needs to be added as a valid tile location for the recycling move.
-                if j == 0 and not isinstance(self.board[j][i], Tile):
-                    valid_tile_locations.append((i, j))
-
+        """ Return all the valid recycling moves without modifying the board (nor printing anything).
+            A card can be recycled if nothing lies on top of it and if it is not the card moved/played last turn.
+            It can then be placed anywhere a new card could be inserted once it is removed from the board,
+            as long as it does not keep both its position and its rotation code.
+        """
         valid_recycling_moves = list()
-        # Then, for each card that can be recycled, generate its valid next moves
-        for card, locations in cards_recycled_and_locations.items():
-            potential_valid_recycling_moves = self.generate_valid_recycling_moves_for_card(card, locations, valid_tile_locations)
-            if potential_valid_recycling_moves != None:
-                valid_recycling_moves.extend(potential_valid_recycling_moves)
+        width = self.DIMENSIONS_X_Y[0]
+        for card, card_position in self.get_recyclable_cards():
+            position_card_1st_tile, position_card_2nd_tile = card.get_tile_positions(card_position)
+            heights = self.get_column_heights_without_card(position_card_1st_tile, position_card_2nd_tile)
+            for i in range(0, width):
+                j = heights[i]
+                for rotation_code, tile_1_offset, tile_2_offset, is_horizontal in self.ROTATION_TEMPLATES:
+                    if rotation_code == card.rotationCode and (i, j) == card_position:
+                        continue
+                    if not self.placement_is_valid((i, j), is_horizontal, heights):
+                        continue
+                    valid_recycling_moves.append(RecyclingMove(card, card.rotationCode, rotation_code,
+                                                               position_card_1st_tile, position_card_2nd_tile,
+                                                               (i + tile_1_offset[0], j + tile_1_offset[1]),
+                                                               (i + tile_2_offset[0], j + tile_2_offset[1])))
         return valid_recycling_moves
 
-    def find_location_other_tile_of_card(self, card, first_tile_position):
-        if (first_tile_position[0] + 1) < self.DIMENSIONS_X_Y[0] \
-                and isinstance(self.board[first_tile_position[1]][first_tile_position[0] + 1], Tile)\
-                and self.board[first_tile_position[1]][first_tile_position[0] + 1].cardOwner == card:
-            return (first_tile_position[0]+1, first_tile_position[1])
-        if (first_tile_position[0] - 1) >= 0 \
-                and isinstance(self.board[first_tile_position[1]][first_tile_position[0] - 1], Tile)\
-                and self.board[first_tile_position[1]][first_tile_position[0] - 1].cardOwner == card:
-            return (first_tile_position[0] - 1, first_tile_position[1])
-        if (first_tile_position[1] + 1) < self.DIMENSIONS_X_Y[1] \
-                and isinstance(self.board[first_tile_position[1] + 1][first_tile_position[0]], Tile) \
-                and self.board[first_tile_position[1] + 1][first_tile_position[0]].cardOwner == card:
-            return (first_tile_position[0], first_tile_position[1]+1)
-        if (first_tile_position[1] - 1) >= 0 \
-                and isinstance(self.board[first_tile_position[1] - 1][first_tile_position[0]], Tile)\
-                and self.board[first_tile_position[1] - 1][first_tile_position[0]].cardOwner == card:
-            return (first_tile_position[0], first_tile_position[1]-1)
-
-    def generate_valid_recycling_moves_for_card(self, card, cardLocations, valid_tile_locations):
-        recycling_moves = list()
-        for new_card_location in valid_tile_locations:
-            for rotation_code in self.get_rotation_codes():
-                potential_valid_recycling_move = \
-                    self.get_valid_recycling_move(card, card.activeSide.tile1, card.activeSide.tile2, rotation_code,
-                                                  new_card_location, cardLocations[0], cardLocations[1])
-                if potential_valid_recycling_move is not None:
-                    recycling_moves.append(potential_valid_recycling_move)
-        return recycling_moves
+    def get_recyclable_cards(self):
+        """ Return (card, position of the card) of every card that can be recycled, the position being the bottom left
+            cell of the card. Only the top tile of each column has to be looked at, since a card with a tile
+            on top of it cannot be moved.
+        """
+        recyclable_cards = list()
+        checked_cards = list()
+        heights = self.column_heights
+        for i in range(0, self.DIMENSIONS_X_Y[0]):
+            if heights[i] == 0:
+                continue
+            top_tile = self.board[heights[i] - 1][i]
+            card = self.cell_cards[(heights[i] - 1) * self.DIMENSIONS_X_Y[0] + i]
+            if any(card is checked_card for checked_card in checked_cards):
+                continue
+            checked_cards.append(card)
+            if card == self.recycled_card:
+                continue
+            rotation_code, tile_1_offset, tile_2_offset, is_horizontal = self.ROTATION_TEMPLATES[card.rotationCode - 1]
+            tile_offset = tile_1_offset if top_tile is card.activeSide.tile1 else tile_2_offset
+            card_position = (i - tile_offset[0], heights[i] - 1 - tile_offset[1])
+            # The top tile of a vertical card is always its upper one, but both columns of a horizontal card
+            # have to end with it.
+            if is_horizontal and heights[card_position[0]] != heights[card_position[0] + 1]:
+                continue
+            recyclable_cards.append((card, card_position))
+        return recyclable_cards
+
+    def get_column_heights_without_card(self, position_card_1st_tile, position_card_2nd_tile):
+        """ Return the heights the columns would have if the card on the given cells, which has to be
+            on top of its column(s), was removed from the board.
+        """
+        heights = list(self.column_heights)
+        heights[position_card_1st_tile[0]] -= 1
+        heights[position_card_2nd_tile[0]] -= 1
+        return heights
+
+    def placement_is_valid(self, position, is_horizontal, heights):
+        """ Return whether a card lying horizontally or vertically can be placed at the given position
+            (its bottom left cell) on a board whose columns have the given heights.
+            Since cards always lie on top of other cards, the card must start right at the top of its column(s).
+        """
+        i, j = position
+        width = self.DIMENSIONS_X_Y[0]
+        height = self.DIMENSIONS_X_Y[1]
+        if i < 0 or i >= width or j >= height or heights[i] != j:
+            return False
+        if is_horizontal:
+            # The second tile is in the next column, which must have the same height to support it
+            # (and to not be already occupied).
+            return i + 1 < width and heights[i + 1] == j
+        # The second tile is on top of the first one, so it has to fit under the top of the board.
+        return j + 1 < height
 
     def generate_valid_regular_moves(self):
+        """ Return all the valid regular moves. Their card is only given to them when they are played
+            (see insert_card_direct), so that every card placed on the board is a different one.
+        """
         valid_regular_moves = list()
-        new_card = Card(1) # We pass rotation_code but we are supposed to update the rotationCode later
-        # For all rows on the board, search upwards through the corresponding column
-        # in order to find the first empty tile.
-        for i in range(0, self.DIMENSIONS_X_Y[0]):
-            for j in range(0, self.DIMENSIONS_X_Y[1]):
-                # If we found the first empty tile, try to insert a card from this position.
-                if not isinstance(self.board[j][i], Tile):
-                    potential_valid_moves = None
-                    # If we are checking the very last column, then there is no need to check the "horizontal" moves
-                    #  => they are invalid for sure.
-                    if i == self.DIMENSIONS_X_Y[0] - 1:
-                        potential_valid_moves = self.generate_valid_regular_moves_from_pos_and_rot_codes(
-                                                                        new_card,
-                                                                        (i, j),
-                                                                        self.get_vertical_rotation_codes())
-                    # Similar logic applies to the very top row, the "vertical" moves
-                    # are guaranteed to be invalid.
-                    elif j == self.DIMENSIONS_X_Y[1] - 1:
-                        potential_valid_moves = self.generate_valid_regular_moves_from_pos_and_rot_codes(
-                                                                        new_card,
-                                                                        (i, j),
-                                                                        self.get_horizontal_rotation_codes())
-                    else:
-                        potential_valid_moves = self.generate_valid_regular_moves_from_pos_and_rot_codes(
-                                                                        new_card,
-                                                                        (i, j),
-                                                                        self.get_rotation_codes())
-                    if potential_valid_moves is not None:
-                        valid_regular_moves.extend(potential_valid_moves)
-                    # We should NOT search the tiles upwards from the first empty tile, since they are guaranteed to be invalid.
-                    break
+        width = self.DIMENSIONS_X_Y[0]
+        height = self.DIMENSIONS_X_Y[1]
+        heights = self.column_heights
+        # A card can only be inserted from the first empty cell of a column, which is given by the height of the column.
+        for i in range(0, width):
+            j = heights[i]
+            if j == height:
+                continue
+            for rotation_code, tile_1_offset, tile_2_offset, is_horizontal in self.ROTATION_TEMPLATES:
+                if not self.placement_is_valid((i, j), is_horizontal, heights):
+                    continue
+                valid_regular_moves.append(RegularMove(None,
+                                                       (i + tile_1_offset[0], j + tile_1_offset[1]),
+                                                       (i + tile_2_offset[0], j + tile_2_offset[1]),
+                                                       rotation_code))
         return valid_regular_moves
 
-    def generate_valid_regular_moves_from_pos_and_rot_codes(self, new_card, position, rotation_codes):
-        regular_moves = []
-        for rotation_code in rotation_codes:
-            potential_regular_move = self.try_insert_card_in_new_board_AI(new_card, position, rotation_code)
-            if potential_regular_move is not None:
-                regular_moves.append(potential_regular_move)
-        return regular_moves
-
-    def try_insert_card_in_new_board_AI(self, new_card, position, rotation_code):
-        new_card.update_rotation_code(rotation_code)
-        position_first_tile, position_second_tile = new_card.get_tile_positions(position)
-        if self.card_location_is_valid_spot(position_first_tile, position_second_tile, new_card):
-            return RegularMove(new_card, position_first_tile, position_second_tile, rotation_code)
-        else:
-            return None
+    def generate_valid_regular_move_codes(self):
+        """ Return the codes (see move_encoding) of the moves of generate_valid_regular_moves, in the same order, in an
+            array. This is a lot cheaper than creating the moves when only some of them are needed.
+        """
+        move_codes = create_move_codes(False)
+        width = self.DIMENSIONS_X_Y[0]
+        height = self.DIMENSIONS_X_Y[1]
+        heights = self.column_heights
+        for i in range(0, width):
+            j = heights[i]
+            if j == height:
+                continue
+            for rotation_code, tile_1_offset, tile_2_offset, is_horizontal in self.ROTATION_TEMPLATES:
+                if self.placement_is_valid((i, j), is_horizontal, heights):
+                    move_codes.append(encode_regular_move((j + tile_1_offset[1]) * width + i + tile_1_offset[0],
+                                                          rotation_code))
+        return move_codes
+
+    def generate_valid_recycling_move_codes(self):
+        """ Return the codes of the moves of generate_valid_recycling_moves, in the same order, in an array. """
+        move_codes = create_move_codes(True)
+        width = self.DIMENSIONS_X_Y[0]
+        nbr_cells = self.bitboard.nbr_cells
+        for card, card_position in self.get_recyclable_cards():
+            position_card_1st_tile, position_card_2nd_tile = card.get_tile_positions(card_position)
+            source_cell_index = position_card_1st_tile[1] * width + position_card_1st_tile[0]
+            heights = self.get_column_heights_without_card(position_card_1st_tile, position_card_2nd_tile)
+            for i in range(0, width):
+                j = heights[i]
+                for rotation_code, tile_1_offset, tile_2_offset, is_horizontal in self.ROTATION_TEMPLATES:
+                    if rotation_code == card.rotationCode and (i, j) == card_position:
+                        continue
+                    if self.placement_is_valid((i, j), is_horizontal, heights):
+                        move_codes.append(encode_recycling_move(nbr_cells, source_cell_index,
+                                                                (j + tile_1_offset[1]) * width + i + tile_1_offset[0],
+                                                                rotation_code))
+        return move_codes
 
     def isInRecyclingPhase(self):
         # Returns whether or not the players have entered the recycling phase, meaning that only recycling moves
         # will be allowed from now on. This happens when all cards are placed on the board.
         return self.nbr_cards >= self.max_nbr_cards
 
+    def get_compact_position(self):
+        """ Return the position as a tuple of integers, which is a lot smaller than the board and its tiles and cards
+            to send to another process, and from which load_compact_position can rebuild the board:
+            (max number of cards, number of cards, number of moves, index of the recycled card in the cards or -1, cards)
+            cards being a tuple of (id, rotation code, x, y) for every card on the board, (x, y) being its bottom left
+            cell.
+        """
+        cards = []
+        card_indexes = dict()
+        # The bottom left cell of a card is the first of its cells found going up the rows and then right.
+        for y in range(self.DIMENSIONS_X_Y[1]):
+            for x in range(self.DIMENSIONS_X_Y[0]):
+                card = self.get_card((x, y))
+                if card is not None and id(card) not in card_indexes:
+                    card_indexes[id(card)] = len(cards)
+                    cards.append((card.id, card.rotationCode, x, y))
+        recycled_card_index = card_indexes.get(id(self.recycled_card), -1)
+        return self.max_nbr_cards, self.nbr_cards, self.nbr_moves, recycled_card_index, tuple(cards)
+
+    def load_compact_position(self, compact_position):
+        """ Place the cards of the position returned by get_compact_position on this board, which must be empty. """
+        self.max_nbr_cards, self.nbr_cards, self.nbr_moves, recycled_card_index, cards = compact_position
+        for card_index, (card_id, rotation_code, x, y) in enumerate(cards):
+            card = Card(rotation_code)
+            card.id = card_id
+            position_first_tile, position_second_tile = card.get_tile_positions((x, y))
+            self.set_tile(position_first_tile, card.activeSide.tile1, card)
+            self.set_tile(position_second_tile, card.activeSide.tile2, card)
+            if card_index == recycled_card_index:
+                self.recycled_card = card
+        self.init_card_hashes()
+
+    def get_cell_states(self):
+        """ Return the state of every cell (see position_encoding), the id of the card of every cell (NO_CARD_ID if
+            empty), and the cell index of the 1st tile of the card recycled last (NO_RECYCLED_CELL if none).
+        """
+        cell_states = [EMPTY_CELL_STATE] * self.bitboard.nbr_cells
+        card_ids = [NO_CARD_ID] * self.bitboard.nbr_cells
+        recycled_cell_index = NO_RECYCLED_CELL
+        for cell_index, card in enumerate(self.cell_cards):
+            if card is None:
+                continue
+            x, y = self.bitboard.cell_position(cell_index)
+            tile_index = 0 if self.board[y][x] is card.activeSide.tile1 else 1
+            cell_states[cell_index] = encode_cell_state(card.rotationCode, tile_index)
+            # The ids only identify the cards when debugging, so they are kept on 16 bits.
+            card_ids[cell_index] = card.id % NO_CARD_ID
+            if tile_index == 0 and card is self.recycled_card:
+                recycled_cell_index = cell_index
+        return cell_states, card_ids, recycled_cell_index
+
+    def load_cell_states(self, cell_states, card_ids, recycled_cell_index):
+        """ Place the cards of the given cells (see get_cell_states) on this board, which must be empty. The cards are
+            given new ids if card_ids is None.
+        """
+        for cell_index, cell_state in enumerate(cell_states):
+            if cell_state == EMPTY_CELL_STATE:
+                continue
+            rotation_code, tile_index = decode_cell_state(cell_state)
+            if tile_index != 0:
+                continue
+            rotation_code, tile_1_offset, tile_2_offset, is_horizontal = self.ROTATION_TEMPLATES[rotation_code - 1]
+            x, y = self.bitboard.cell_position(cell_index)
+            position_second_tile = (x - tile_1_offset[0] + tile_2_offset[0], y - tile_1_offset[1] + tile_2_offset[1])
+            if not self.bitboard.is_in_bounds(position_second_tile[0], position_second_tile[1]) or \
+                    cell_states[self.bitboard.cell_index(position_second_tile[0], position_second_tile[1])] != \
+                    encode_cell_state(rotation_code, 1):
+                raise InvalidPositionEncodingException("The card of cell %d has no 2nd tile." % cell_index)
+            card = Card(rotation_code)
+            if card_ids is None:
+                Card.id_count += 1
+            else:
+                card.id = card_ids[cell_index]
+            self.set_tile((x, y), card.activeSide.tile1, card)
+            self.set_tile(position_second_tile, card.activeSide.tile2, card)
+            if cell_index == recycled_cell_index:
+                self.recycled_card = card
+        self.init_card_hashes()
+
+    def get_position_blob(self):
+        """ Return the position as bytes of the same size for all the positions (see position_encoding), from which
+            load_position_blob can rebuild the board, card ids included.
+        """
+        cell_states, card_ids, recycled_cell_index = self.get_cell_states()
+        return encode_position_blob(self.max_nbr_cards, self.nbr_cards, self.nbr_moves, recycled_cell_index,
+                                    cell_states, card_ids)
+
+    def load_position_blob(self, blob):
+        """ Place the cards of the position returned by get_position_blob on this board, which must be empty. """
+        self.max_nbr_cards, self.nbr_cards, self.nbr_moves, recycled_cell_index, cell_states, card_ids = \
+            decode_position_blob(self.bitboard.nbr_cells, blob)
+        self.load_cell_states(cell_states, card_ids, recycled_cell_index)
+
+    def get_position_text(self):
+        """ Return the position as a short text (see position_encoding) from which load_position_text can rebuild the
+            board, except for the ids of the cards. Two boards have the same text if the game goes on the same way from
+            them.
+        """
+        cell_states, card_ids, recycled_cell_index = self.get_cell_states()
+        return encode_position_text(self.max_nbr_cards, self.nbr_moves, recycled_cell_index, cell_states)
+
+    def load_position_text(self, text):
+        """ Place the cards of the position returned by get_position_text on this board, which must be empty. """
+        self.max_nbr_cards, self.nbr_moves, recycled_cell_index, cell_states = \
+            decode_position_text(self.bitboard.nbr_cells, text)
+        self.nbr_cards = sum(1 for cell_state in cell_states
+                             if cell_state != EMPTY_CELL_STATE and decode_cell_state(cell_state)[1] == 0)
+        self.load_cell_states(cell_states, None, recycled_cell_index)
+
     def __str__(self):
         output_str = '\n'
         row_index = 0
         for row in self.board:
             current_row_str = "%2d" % (row_index + 1) + ' '
-            for colVal in row:
+            for x, colVal in enumerate(row):
                 current_row_str += '|' + str(colVal)
+                if isinstance(colVal, Tile):
+                    # Note: We assume there is no more than 99 different ids
+                    current_row_str += "%-2d" % self.get_card((x, row_index)).id
             current_row_str += '|\n'
             output_str = current_row_str + output_str
             row_index += 1
@@ -1021,6 +1537,7 @@ def game_loop():
 # MAIN - uncomment to play without the GUI
 #set_up_game()
 #game_loop()
+#game_info.board.close()
 
 
 
@@ -0,0 +1,212 @@
+import time
+from search import *
+
+# Number of moves left before the game ends in a draw from which Board.ai_move solves the game instead of searching it
+# with the heuristic. The recycling phase has a few hundred moves per position, so only the last ones can be solved:
+# 3 moves take well under a second, while 4 can take several seconds.
+ENDGAME_SOLVER_NBR_MOVES = 3
+DEFAULT_ENDGAME_TRANSPOSITION_TABLE_SIZE_MB = 4
+
+# Results of a game for the player to move.
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+class EndgameSolver:
+    """ Finds the result of the game (WIN, DRAW or LOSS for the player to move) when both players play perfectly during
+        the moves left before the game ends in a draw (see MAX_NBR_MOVES), with a negamax search with alpha-beta
+        pruning over these 3 values only.
+        Whether a move wins or loses the game is found with Board.check_move_win_conditions, without playing it, so
+        only the moves that neither win nor lose are searched further, and a position is left as soon as a winning move
+        is found. The last move of the game is never played: it is a draw unless it wins or loses.
+        Since the moves depend on the cards (and not only on the tiles), the keys of the positions in the transposition
+        table include the cells of every card and of the card recycled last (see Board.cards_hash).
+        Like AlphaBetaSearch, the solver can be given a deadline, a maximum number of nodes, a cancel_event and a
+        progress_callback. If the search is interrupted, solve plays the best move it found so far (see solve).
+        The results of the root moves that cannot beat the best one are only upper bounds, unless exact_root_scores is
+        True (see AlphaBetaSearch).
+    """
+    def __init__(self, board, current_player, transposition_table_size_mb=DEFAULT_ENDGAME_TRANSPOSITION_TABLE_SIZE_MB,
+                 deadline=None, node_limit=None, cancel_event=None, progress_callback=None, exact_root_scores=False):
+        self.board = board
+        self.current_player = current_player
+        self.deadline = deadline
+        self.node_limit = node_limit
+        self.cancel_event = cancel_event
+        self.progress_callback = progress_callback
+        self.exact_root_scores = exact_root_scores
+        # Every node of the solver generates and checks all the moves of its position, so the limits are checked on
+        # every node rather than every NBR_NODES_BETWEEN_TIME_CHECKS nodes.
+        self.has_checks = deadline is not None or node_limit is not None or cancel_event is not None \
+            or progress_callback is not None
+        # Number of moves left of the current search, given to the progress callback.
+        self.nbr_moves_left = 0
+        # Whether the last search was interrupted before every root move was solved.
+        self.is_interrupted = False
+        self.transposition_table = TranspositionTable(transposition_table_size_mb) \
+            if transposition_table_size_mb > 0 else None
+        self.type_items = {1: current_player.typeItem, -1: board.get_other_type_item(current_player.typeItem)}
+        self.player_key = board.zobrist_keys.get_player_key(current_player.typeItem)
+        self.nbr_nodes = 0
+        # Number of moves whose result was found without playing them.
+        self.nbr_leaves = 0
+        # (result, move) of every root move searched, and (number of nodes, number of leaves, seconds) of their search.
+        self.root_scores = []
+        self.root_move_stats = []
+
+    def get_position_key(self, color):
+        board = self.board
+        key = board.zobrist_hash ^ board.cards_hash ^ board.recycled_card_hash ^ self.player_key
+        if color < 0:
+            key ^= board.zobrist_keys.other_player_to_move_key
+        return key
+
+    def solve(self, nbr_moves_left):
+        """ Return the best move for the current player, nbr_moves_left moves (of either player, including this one)
+            before the game ends in a draw, along with the result it leads to.
+            If the limits of the search are exceeded before every move is solved, return the best move solved so far if
+            it does not lose, or else the first move not solved yet, along with its result (None if it is not solved).
+        """
+        self.root_scores = []
+        self.root_move_stats = []
+        self.nbr_moves_left = nbr_moves_left
+        self.is_interrupted = False
+        moves = self.generate_moves(self.board.isInRecyclingPhase())
+        best_move = None
+        best_result = LOSS
+        alpha = LOSS
+        for move in moves:
+            nbr_nodes = self.nbr_nodes
+            nbr_leaves = self.nbr_leaves
+            start = time.perf_counter()
+            try:
+                result = self.get_move_result(move, nbr_moves_left, LOSS if self.exact_root_scores else alpha, WIN, 1)
+            except SearchInterruptedException:
+                self.is_interrupted = True
+                if best_move is None or best_result == LOSS:
+                    return move, None
+                return best_move, best_result
+            self.root_scores.append((result, move))
+            self.root_move_stats.append((self.nbr_nodes - nbr_nodes, self.nbr_leaves - nbr_leaves,
+                                         time.perf_counter() - start))
+            # Only a strictly better move replaces the best one, so the first of equally good moves is chosen.
+            if best_move is None or result > best_result:
+                best_move = move
+                best_result = result
+                alpha = max(alpha, result)
+                if result == WIN:
+                    break
+        return best_move, best_result
+
+    def get_move_result(self, move, nbr_moves_left, alpha, beta, color):
+        """ Return the result of the move for the player of the given color, playing it only if needed. """
+        if self.board.check_move_win_conditions(move, self.type_items[color]):
+            self.nbr_leaves += 1
+            return WIN
+        if self.board.check_move_win_conditions(move, self.type_items[-color]):
+            self.nbr_leaves += 1
+            return LOSS
+        if nbr_moves_left <= 1:
+            self.nbr_leaves += 1
+            return DRAW
+        is_recycling = self.board.isInRecyclingPhase()
+        self.make_move(move, is_recycling)
+        try:
+            return -self.negamax(nbr_moves_left - 1, -beta, -alpha, -color)
+        finally:
+            self.unmake_move(move, is_recycling)
+
+    def check_limits(self):
+        if self.node_limit is not None and self.nbr_nodes > self.node_limit:
+            raise SearchInterruptedException("The search reached its limit of " + str(self.node_limit) + " nodes.")
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchInterruptedException("The search ran out of time.")
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchInterruptedException("The search was cancelled.")
+        if self.progress_callback is not None and self.nbr_nodes % NBR_NODES_BETWEEN_PROGRESS_REPORTS == 0:
+            self.progress_callback(self.nbr_moves_left, self.nbr_nodes)
+
+    def negamax(self, nbr_moves_left, alpha, beta, color):
+        self.nbr_nodes += 1
+        if self.has_checks:
+            self.check_limits()
+        original_alpha = alpha
+        tt_move_index = None
+        if self.transposition_table is not None:
+            key = self.get_position_key(color)
+            entry = self.transposition_table.probe(key)
+            if entry is not None:
+                entry_nbr_moves_left, bound, entry_result, tt_move_index = entry
+                # With more or less moves left, the result may be different.
+                if entry_nbr_moves_left == nbr_moves_left and (bound == EXACT_SCORE
+                                                               or (bound == LOWER_BOUND and entry_result >= beta)
+                                                               or (bound == UPPER_BOUND and entry_result <= alpha)):
+                    return int(entry_result)
+
+        is_recycling = self.board.isInRecyclingPhase()
+        moves = self.generate_moves(is_recycling)
+        type_item = self.type_items[color]
+        other_type_item = self.type_items[-color]
+        # The moves winning the game are looked for first, since they end the search of the position.
+        best_result = None
+        best_move_index = None
+        move_indexes = []
+        for move_index, move in enumerate(moves):
+            if self.board.check_move_win_conditions(move, type_item):
+                self.nbr_leaves += 1
+                best_result = WIN
+                best_move_index = move_index
+                break
+            if self.board.check_move_win_conditions(move, other_type_item):
+                self.nbr_leaves += 1
+            else:
+                move_indexes.append(move_index)
+        if best_result is None:
+            if not move_indexes:
+                # Every move makes the other player win (or there is no move at all).
+                best_result = LOSS
+            elif nbr_moves_left <= 1:
+                self.nbr_leaves += 1
+                best_result = DRAW
+                best_move_index = move_indexes[0]
+            else:
+                if tt_move_index in move_indexes:
+                    move_indexes.remove(tt_move_index)
+                    move_indexes.insert(0, tt_move_index)
+                best_result = LOSS
+                for move_index in move_indexes:
+                    move = moves[move_index]
+                    self.make_move(move, is_recycling)
+                    try:
+                        result = -self.negamax(nbr_moves_left - 1, -beta, -alpha, -color)
+                    finally:
+                        self.unmake_move(move, is_recycling)
+                    if best_move_index is None or result > best_result:
+                        best_result = result
+                        best_move_index = move_index
+                        if result > alpha:
+                            alpha = result
+                            if alpha >= beta:
+                                break
+
+        if self.transposition_table is not None:
+            if best_result <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_result >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT_SCORE
+            self.transposition_table.store(key, nbr_moves_left, bound, best_result, best_move_index)
+        return best_result
+
+    def generate_moves(self, is_recycling):
+        if is_recycling:
+            return self.board.generate_valid_recycling_moves()
+        return self.board.generate_valid_regular_moves()
+
+    def make_move(self, move, is_recycling):
+        self.board.make(move)
+
+    def unmake_move(self, move, is_recycling):
+        self.board.unmake()
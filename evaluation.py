@@ -0,0 +1,117 @@
+from windows import *
+
+
+class IncrementalEvaluator:
+    """ Keeps, for every window of 4 aligned cells of the board, the number of red, white, filled and empty tiles it
+        holds. The counts are updated every time a tile is placed on the board or removed from it, which only affects
+        the (at most 16) windows containing its cell. Scoring a position then only requires reading the counts of the
+        windows around the inserted tiles instead of walking through the cells of the board.
+        The scores are the same as the ones of Board.calculate_heuristic_inserted_tiles and
+        Board.calculate_heuristic_blocking.
+    """
+    def __init__(self, bitboard):
+        self.bitboard = bitboard
+        self.windows = get_window_table(bitboard.width, bitboard.height)
+        self.window_cells = self.windows.window_cells
+        self.cell_windows = self.windows.cell_windows
+        self.cell_direction_windows = self.windows.cell_direction_windows
+
+        self.red_counts = [0] * self.windows.nbr_windows
+        self.white_counts = [0] * self.windows.nbr_windows
+        self.filled_counts = [0] * self.windows.nbr_windows
+        self.empty_counts = [0] * self.windows.nbr_windows
+
+    def add_tile(self, cell_index, is_red, is_filled):
+        color_counts = self.red_counts if is_red else self.white_counts
+        dot_counts = self.filled_counts if is_filled else self.empty_counts
+        for window_index in self.cell_windows[cell_index]:
+            color_counts[window_index] += 1
+            dot_counts[window_index] += 1
+
+    def remove_tile(self, cell_index, is_red, is_filled):
+        color_counts = self.red_counts if is_red else self.white_counts
+        dot_counts = self.filled_counts if is_filled else self.empty_counts
+        for window_index in self.cell_windows[cell_index]:
+            color_counts[window_index] -= 1
+            dot_counts[window_index] -= 1
+
+    def get_counts(self, is_color, value_bit):
+        """ Return the counts of the windows for the tiles having (matching) and not having (opposite)
+            the given value of color (is_color) or dot state.
+        """
+        if is_color:
+            return (self.red_counts, self.white_counts) if value_bit else (self.white_counts, self.red_counts)
+        return (self.filled_counts, self.empty_counts) if value_bit else (self.empty_counts, self.filled_counts)
+
+    def get_inserted_tiles(self, inserted_tiles_pos):
+        """ Return (cell index, is red, is filled) of the inserted tiles that are on the board. """
+        bitboard = self.bitboard
+        inserted_tiles = []
+        for tile_pos in inserted_tiles_pos:
+            cell_index = bitboard.cell_index(tile_pos[0], tile_pos[1])
+            if (bitboard.occupied >> cell_index) & 1:
+                inserted_tiles.append((cell_index, (bitboard.red >> cell_index) & 1, (bitboard.filled >> cell_index) & 1))
+        return inserted_tiles
+
+    def calculate_heuristic_inserted_tiles(self, inserted_tiles, is_color):
+        nbr_2_matching = 0
+        nbr_3_matching = 0
+        nbr_4_matching = 0
+        for cell_index, is_red, is_filled in inserted_tiles:
+            matching_counts, opposite_counts = self.get_counts(is_color, is_red if is_color else is_filled)
+            for direction_windows in self.cell_direction_windows[cell_index]:
+                max_nbr_matching_tiles = 0
+                for window_index in direction_windows:
+                    # A single tile of the other type in the window prevents it from ever being a winning line.
+                    if opposite_counts[window_index] == 0 and matching_counts[window_index] > max_nbr_matching_tiles:
+                        max_nbr_matching_tiles = matching_counts[window_index]
+                if max_nbr_matching_tiles == 2:
+                    nbr_2_matching += 1
+                elif max_nbr_matching_tiles == 3:
+                    nbr_3_matching += 1
+                elif max_nbr_matching_tiles == 4:
+                    nbr_4_matching += 1
+        return nbr_2_matching + 10 * nbr_3_matching + 100000 * nbr_4_matching
+
+    def calculate_heuristic_blocking(self, inserted_tiles, is_color):
+        nbr_1_blocking = 0
+        nbr_2_blocking = 0
+        nbr_3_blocking = 0
+        value_index = 1 if is_color else 2
+        # The same tile can only be subtracted once from the counts of a window.
+        unique_inserted_tiles = list(dict.fromkeys(inserted_tiles))
+        for cell_index, is_red, is_filled in inserted_tiles:
+            blocking_value = is_red if is_color else is_filled
+            blocked_counts, blocking_counts = self.get_counts(is_color, not blocking_value)
+            for direction_windows in self.cell_direction_windows[cell_index]:
+                max_nbr_blocked_tiles = 0
+                for window_index in direction_windows:
+                    # The inserted tiles are not counted as blocked or blocking tiles.
+                    nbr_blocked_tiles = blocked_counts[window_index]
+                    nbr_blocking_tiles = blocking_counts[window_index]
+                    window_cells = self.window_cells[window_index]
+                    for inserted_tile in unique_inserted_tiles:
+                        if inserted_tile[0] in window_cells:
+                            if inserted_tile[value_index] == blocking_value:
+                                nbr_blocking_tiles -= 1
+                            else:
+                                nbr_blocked_tiles -= 1
+                    if nbr_blocking_tiles == 0 and nbr_blocked_tiles > max_nbr_blocked_tiles:
+                        max_nbr_blocked_tiles = nbr_blocked_tiles
+                if max_nbr_blocked_tiles == 1:
+                    nbr_1_blocking += 1
+                elif max_nbr_blocked_tiles == 2:
+                    nbr_2_blocking += 1
+                elif max_nbr_blocked_tiles == 3:
+                    nbr_3_blocking += 1
+        return nbr_1_blocking + 10 * nbr_2_blocking + 10000 * nbr_3_blocking
+
+    def heuristic(self, inserted_tiles_pos, is_color_player):
+        """ Same as Board.heuristic_regular_moves, for the player playing colors if is_color_player
+            or dots otherwise.
+        """
+        inserted_tiles = self.get_inserted_tiles(inserted_tiles_pos)
+        return self.calculate_heuristic_inserted_tiles(inserted_tiles, is_color_player) \
+            - 0.8 * self.calculate_heuristic_inserted_tiles(inserted_tiles, not is_color_player) \
+            + 10 * self.calculate_heuristic_blocking(inserted_tiles, not is_color_player) \
+            - 0.5 * self.calculate_heuristic_blocking(inserted_tiles, is_color_player)
@@ -3,3 +3,18 @@ class OutOfBoundsException(Exception):
 
     def __init__(self, message):
         self.message = message
+
+class SearchInterruptedException(Exception):
+
+    def __init__(self, message):
+        self.message = message
+
+class InvalidOpeningBookException(Exception):
+
+    def __init__(self, message):
+        self.message = message
+
+class InvalidPositionEncodingException(Exception):
+
+    def __init__(self, message):
+        self.message = message
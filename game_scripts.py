@@ -0,0 +1,101 @@
+import argparse
+import os
+from board import *
+
+
+def is_move_line(line):
+    """ Return whether the line of a script is a move as a player would enter it (see Board.read_input). """
+    args = line.split()
+    return (len(args) == 4 and args[0] == "0") or len(args) == 7
+
+
+def read_move_scripts(path):
+    """ Return the scripts of moves of the file, each being the list of its moves. A script is a run of
+        consecutive moves: the blank lines, comments and answers to the questions of set_up_game end it.
+    """
+    scripts = []
+    script = []
+    with open(path) as script_file:
+        for line in script_file:
+            if is_move_line(line):
+                script.append(line.strip())
+            elif script:
+                scripts.append(script)
+                script = []
+    if script:
+        scripts.append(script)
+    return scripts
+
+
+def replay_script(moves, board=None, position_callback=None):
+    """ Play the moves of the script on the board (a new one by default), up to the first move that is rejected or that
+        ends the game, and return the board. The moves are parsed by Board.parse_move and played by Board.play_move,
+        so nothing is printed. position_callback, if given, is called with the board and the number of moves played
+        after every move.
+    """
+    if board is None:
+        board = Board(NBR_CARDS, 0, None)
+    for move_index, line in enumerate(moves):
+        move = board.parse_move(line)
+        if isinstance(move, MoveRejection):
+            break
+        inserted_tiles_pos = board.play_move(move)
+        if position_callback is not None:
+            position_callback(board, move_index + 1)
+        if board.nbr_cards >= 4 and (board.check_win_conditions(inserted_tiles_pos, Tile.Color) is not None
+                                     or board.check_win_conditions(inserted_tiles_pos, Tile.DotState) is not None):
+            break
+    return board
+
+
+def load_script_positions(path):
+    """ Return (name, board) of the position at the end of every script of the file, named after the file and the index
+        of the script in it.
+    """
+    file_name = os.path.basename(path)
+    return [("%s:%d" % (file_name, script_index), replay_script(moves))
+            for script_index, moves in enumerate(read_move_scripts(path))]
+
+
+def load_script_position_blobs(path):
+    """ Return (name, bytes of the position) (see Board.get_position_blob) of the position after every move of every
+        script of the file, named after the file, the index of the script in it and the number of moves played. Only one
+        board is kept per script, so thousands of positions take little memory and can be sent to other processes.
+    """
+    positions = []
+    file_name = os.path.basename(path)
+    for script_index, moves in enumerate(read_move_scripts(path)):
+        def add_position(board, nbr_moves_played, name="%s:%d" % (file_name, script_index)):
+            positions.append(("%s:%d" % (name, nbr_moves_played), board.get_position_blob()))
+        replay_script(moves, position_callback=add_position)
+    return positions
+
+
+def load_position_blob(blob):
+    """ Return a new board with the position returned by Board.get_position_blob. """
+    board = Board(NBR_CARDS, 0, None)
+    board.load_position_blob(blob)
+    return board
+
+
+def load_position_text(text):
+    """ Return a new board with the position returned by Board.get_position_text. """
+    board = Board(NBR_CARDS, 0, None)
+    board.load_position_text(text)
+    return board
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay the scripts of moves of the files (like recycle.txt) without "
+                                                 "printing them, and print the text of the position at the end of "
+                                                 "every script (see Board.get_position_text).")
+    parser.add_argument("paths", nargs="+", help="files of move scripts")
+    parser.add_argument("--every-move", action="store_true", help="print the position after every move too")
+    arguments = parser.parse_args()
+    for path in arguments.paths:
+        if arguments.every_move:
+            for name, blob in load_script_position_blobs(path):
+                print(name, load_position_blob(blob).get_position_text())
+        else:
+            for name, board in load_script_positions(path):
+                print(name, board.get_position_text())
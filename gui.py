@@ -1,17 +1,66 @@
-import sys, math
+import sys, math, threading
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import Qt
 import board
 
 
+class AIMoveThread(QtCore.QThread):
+    """ Plays the move of the AI (see Board.ai_move) in another thread than the one of the window, which keeps
+        responding during the search. progress is emitted with the depth searched and the number of nodes searched so
+        far, and move_played with the positions of the tiles placed once the move is played.
+        Cancelling the search makes the AI play the best move it found so far.
+    """
+    progress = QtCore.pyqtSignal(int, int)
+    move_played = QtCore.pyqtSignal(object)
+
+    def __init__(self, game_info):
+        super().__init__()
+        self.game_info = game_info
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        inserted_tiles_pos = self.game_info.board.ai_move(self.game_info.tracing, self.game_info.current_player,
+                                                          cancel_event=self.cancel_event,
+                                                          progress_callback=self.progress.emit)
+        self.move_played.emit(inserted_tiles_pos)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+# Thread playing the move of the AI, while it searches.
+ai_move_thread = None
+
+
 def play_next_move():
-    if boardWidget.winningPlayer is not None:
+    global ai_move_thread
+    if boardWidget.winningPlayer is not None or ai_move_thread is not None:
         return
 
     if game_info.ai_player != None and game_info.current_player == game_info.ai_player:
-        inserted_tiles_pos = game_info.board.ai_move(game_info.tracing, game_info.current_player)
+        ai_move_thread = AIMoveThread(game_info)
+        ai_move_thread.progress.connect(boardWidget.show_search_progress)
+        ai_move_thread.move_played.connect(end_ai_move)
+        boardWidget.start_ai_move()
+        ai_move_thread.start()
     else:
-        inserted_tiles_pos = boardWidget.ask_for_input_qt(game_info.current_player.name)
+        end_move(boardWidget.ask_for_input_qt(game_info.current_player.name))
+
+
+def end_ai_move(inserted_tiles_pos):
+    global ai_move_thread
+    ai_move_thread.wait()
+    ai_move_thread = None
+    boardWidget.end_ai_move()
+    end_move(inserted_tiles_pos)
+
+
+def cancel_ai_move():
+    if ai_move_thread is not None:
+        ai_move_thread.cancel()
+
+
+def end_move(inserted_tiles_pos):
     if len(inserted_tiles_pos) == 2:
         boardWidget.cardsPos.add(tuple(inserted_tiles_pos))
         boardWidget.lastCardPos = tuple(inserted_tiles_pos)
@@ -58,6 +107,8 @@ class BoardWidget(QtWidgets.QWidget):
         self.lastCardPos = None
         self.winning_tiles_pos = None
         self.winningPlayer = None
+        # Cells drawn while the AI searches, since it plays and undoes moves on the board (see start_ai_move).
+        self.displayed_cells = None
         self.setGeometry(300, 100, 900, 900)
         self.setWindowTitle("Double Card")
 
@@ -70,6 +121,14 @@ class BoardWidget(QtWidgets.QWidget):
         self.compute_next_move_btn.move(700, 615)
         self.compute_next_move_btn.setShortcut(QtCore.Qt.Key_Space)
         self.compute_next_move_btn.clicked.connect(play_next_move)
+
+        self.cancel_ai_move_btn = QtWidgets.QPushButton("Play best move found", self)
+        self.cancel_ai_move_btn.move(700, 650)
+        self.cancel_ai_move_btn.clicked.connect(cancel_ai_move)
+        self.cancel_ai_move_btn.setVisible(False)
+
+        self.search_progress_label = QtWidgets.QLabel("", self)
+        self.search_progress_label.setGeometry(700, 685, 190, 20)
         self.update_buttons()
 
         self.show()
@@ -83,6 +142,22 @@ class BoardWidget(QtWidgets.QWidget):
             inserted_tiles_pos = self.board.read_input(input_str)
         return inserted_tiles_pos
 
+    def start_ai_move(self):
+        # The board is drawn as it is now until the AI plays its move.
+        self.displayed_cells = [row[:] for row in self.board.board]
+        self.compute_next_move_btn.setEnabled(False)
+        self.cancel_ai_move_btn.setVisible(True)
+        self.search_progress_label.setText("Searching...")
+
+    def show_search_progress(self, depth, nbr_nodes):
+        self.search_progress_label.setText("Depth " + str(depth) + ", " + str(nbr_nodes) + " nodes")
+
+    def end_ai_move(self):
+        self.displayed_cells = None
+        self.compute_next_move_btn.setEnabled(True)
+        self.cancel_ai_move_btn.setVisible(False)
+        self.search_progress_label.setText("")
+
     def update_buttons(self):
         self.compute_next_move_btn.setText(("dots" if game_info.current_player.typeItem == board.Tile.DotState else "colors") + " move")
 
@@ -136,9 +211,10 @@ class BoardWidget(QtWidgets.QWidget):
             painter.drawLine(x_init_pos + x_curr_offset, y_init_pos, x_init_pos + x_curr_offset, y_init_pos + board_y_dim)
             painter.drawText(x_init_pos + x_curr_offset + x_increment / 2.5, board_y_dim + y_increment / 1.75, self.board.convert_num_to_letter(i))
 
+        cells = self.displayed_cells if self.displayed_cells is not None else self.board.board
         for i in range(0, self.board.DIMENSIONS_X_Y[0]):
             for j in range(0, self.board.DIMENSIONS_X_Y[1]):
-                tile_to_be_drawn = self.board.board[j][i]
+                tile_to_be_drawn = cells[j][i]
                 if isinstance(tile_to_be_drawn, board.Tile):
                     x_pos = x_init_pos + x_increment * (i + 1)
                     y_pos = y_init_pos + y_increment * (self.board.DIMENSIONS_X_Y[1] - j - 1)
@@ -300,5 +376,10 @@ app = QtWidgets.QApplication(sys.argv)
 boardWidget = BoardWidget(game_info.board)
 boardWidget.show()
 app.exec_()
+# The search has to end before the thread playing the move of the AI is destroyed.
+if ai_move_thread is not None:
+    ai_move_thread.cancel()
+    ai_move_thread.wait()
+game_info.board.close()
 
 
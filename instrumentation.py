@@ -0,0 +1,117 @@
+import cProfile
+import pstats
+import time
+from search import *
+
+# Phases of the search whose time is measured by InstrumentedAlphaBetaSearch. The legality of the moves is checked
+# while they are generated (see Board.placement_is_valid), so it is part of the generation.
+SEARCH_PHASES = ("generation", "ordering", "evaluation", "make_unmake")
+
+
+class SearchStats:
+    """ What an instrumented move of the AI cost (see Board.ai_move): the search that chose it, the depth searched,
+        the numbers of nodes, leaves, cutoffs and transposition table hits, the nanoseconds spent in each
+        of the SEARCH_PHASES and in the whole move. The time of the phases is only measured by the serial search,
+        it stays at 0 for the searches of the worker processes, the opening book and the endgame solver.
+    """
+    def __init__(self):
+        self.search_name = None
+        self.depth = None
+        self.nbr_nodes = 0
+        self.nbr_leaves = 0
+        self.nbr_cutoffs = 0
+        self.nbr_tt_hits = 0
+        self.nbr_generated_moves = 0
+        self.phase_ns = {phase: 0 for phase in SEARCH_PHASES}
+        self.total_ns = 0
+
+    def add_search(self, ai_search):
+        """ Add the counts of a search. Only AlphaBetaSearch counts its cutoffs and transposition table hits. """
+        self.nbr_nodes += ai_search.nbr_nodes
+        self.nbr_leaves += ai_search.nbr_leaves
+        self.nbr_cutoffs += getattr(ai_search, 'nbr_cutoffs', 0)
+        self.nbr_tt_hits += getattr(ai_search, 'nbr_tt_hits', 0)
+
+    def get_other_ns(self):
+        """ Return the nanoseconds of the move spent outside of the phases measured. """
+        return max(self.total_ns - sum(self.phase_ns.values()), 0)
+
+    def get_nodes_per_second(self):
+        return self.nbr_nodes * 1e9 / self.total_ns if self.total_ns > 0 else 0.0
+
+    def as_dict(self):
+        return {"search": self.search_name, "depth": self.depth, "nodes": self.nbr_nodes, "leaves": self.nbr_leaves,
+                "cutoffs": self.nbr_cutoffs, "tt_hits": self.nbr_tt_hits, "generated_moves": self.nbr_generated_moves,
+                "phase_ns": dict(self.phase_ns), "other_ns": self.get_other_ns(), "total_ns": self.total_ns}
+
+    def __str__(self):
+        lines = ["%s search, depth %s: %d nodes, %d leaves, %d cutoffs, %d TT hits, %.0f nodes/s" %
+                 (self.search_name, self.depth, self.nbr_nodes, self.nbr_leaves, self.nbr_cutoffs, self.nbr_tt_hits,
+                  self.get_nodes_per_second())]
+        for phase, phase_ns in list(self.phase_ns.items()) + [("other", self.get_other_ns())]:
+            lines.append("%-11s %9.2f ms  %5.1f%%" % (phase, phase_ns / 1e6,
+                                                      100 * phase_ns / self.total_ns if self.total_ns > 0 else 0.0))
+        lines.append("%-11s %9.2f ms" % ("total", self.total_ns / 1e6))
+        return "\n".join(lines)
+
+
+class InstrumentedAlphaBetaSearch(AlphaBetaSearch):
+    """ AlphaBetaSearch measuring the time spent in each of the SEARCH_PHASES, added to its SearchStats.
+        The measures are taken by overriding the methods of the phases, so that AlphaBetaSearch itself does not
+        measure anything: the AI only pays for them when it is given a SearchStats.
+    """
+    def __init__(self, board, current_player, deadline=None, node_limit=None, transposition_table=None,
+                 move_orderer=None, batch_evaluation=False, stats=None, cancel_event=None, progress_callback=None,
+                 exact_root_scores=False):
+        AlphaBetaSearch.__init__(self, board, current_player, deadline, node_limit, transposition_table, move_orderer,
+                                 batch_evaluation, cancel_event, progress_callback, exact_root_scores)
+        self.stats = stats if stats is not None else SearchStats()
+        self.phase_ns = self.stats.phase_ns
+
+    def generate_moves(self, is_recycling):
+        start = time.perf_counter_ns()
+        moves = AlphaBetaSearch.generate_moves(self, is_recycling)
+        self.phase_ns["generation"] += time.perf_counter_ns() - start
+        self.stats.nbr_generated_moves += len(moves)
+        return moves
+
+    def order_moves(self, moves, ply, is_recycling, color, tt_move_index):
+        start = time.perf_counter_ns()
+        move_indexes = AlphaBetaSearch.order_moves(self, moves, ply, is_recycling, color, tt_move_index)
+        self.phase_ns["ordering"] += time.perf_counter_ns() - start
+        return move_indexes
+
+    def evaluate(self, inserted_tiles_pos, last_move_is_recycling):
+        start = time.perf_counter_ns()
+        score = AlphaBetaSearch.evaluate(self, inserted_tiles_pos, last_move_is_recycling)
+        self.phase_ns["evaluation"] += time.perf_counter_ns() - start
+        return score
+
+    def evaluate_moves(self, moves, inserted_tiles_pos, is_recycling):
+        start = time.perf_counter_ns()
+        scores = AlphaBetaSearch.evaluate_moves(self, moves, inserted_tiles_pos, is_recycling)
+        self.phase_ns["evaluation"] += time.perf_counter_ns() - start
+        return scores
+
+    def make_move(self, move, is_recycling):
+        start = time.perf_counter_ns()
+        inserted_tiles_pos = AlphaBetaSearch.make_move(self, move, is_recycling)
+        self.phase_ns["make_unmake"] += time.perf_counter_ns() - start
+        return inserted_tiles_pos
+
+    def unmake_move(self, move, is_recycling):
+        start = time.perf_counter_ns()
+        AlphaBetaSearch.unmake_move(self, move, is_recycling)
+        self.phase_ns["make_unmake"] += time.perf_counter_ns() - start
+
+
+def profile_ai_move(board, current_player, path=None, sort_key='cumulative', **ai_move_arguments):
+    """ Play the move of the AI (see Board.ai_move, which is given the other arguments) under cProfile, and write the
+        profile to path (in the format of pstats, which tools like snakeviz read) if given.
+        Return the positions of the tiles placed by the move, and the profile as a pstats.Stats sorted by sort_key.
+    """
+    profile = cProfile.Profile()
+    inserted_tiles_pos = profile.runcall(board.ai_move, None, current_player, **ai_move_arguments)
+    if path is not None:
+        profile.dump_stats(path)
+    return inserted_tiles_pos, pstats.Stats(profile).sort_stats(sort_key)
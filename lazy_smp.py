@@ -0,0 +1,101 @@
+import random
+import time
+from search import *
+from move_ordering import *
+from parallel_search import load_board
+
+
+class LazySMPWorkerSearch(AlphaBetaSearch):
+    """ Search done by one of the workers of a LazySMPSearch, which also stops as soon as another worker tells it to
+        through their shared transposition table.
+    """
+    def check_limits(self):
+        if self.transposition_table.is_stop_requested():
+            raise SearchInterruptedException("Another worker completed the search.")
+        AlphaBetaSearch.check_limits(self)
+
+
+def search_lazy_smp_worker(board_class, player_class, compact_position, max_depth, time_limit, node_limit,
+                           transposition_table_name, worker_index, exact_root_scores=False):
+    """ Search the position in a worker process, with iterative deepening, for at most time_limit seconds
+        (if not None). Worker 0 searches the moves in the order they are generated and every depth from 1, the
+        others search them in a random order and every other worker starts 1 ply deeper, so that they do not all search
+        the same positions at the same time. What they find is shared through the transposition table.
+        Return (index of the best move, its score, depth of the deepest completed search, (index, score) of the root
+        moves in the last search, number of nodes, number of leaves).
+    """
+    board = load_board(board_class, compact_position)
+    transposition_table = SharedTranspositionTable(name=transposition_table_name)
+    try:
+        # The search only checks its limits regularly when it has a deadline, which it needs to see the stop flag.
+        deadline = time.perf_counter() + time_limit if time_limit is not None else INFINITY
+        ai_search = LazySMPWorkerSearch(board, player_class(), deadline, node_limit, transposition_table,
+                                        MoveOrderer(board), exact_root_scores=exact_root_scores)
+        moves = ai_search.generate_moves(board.isInRecyclingPhase())
+        root_moves = list(moves)
+        if worker_index > 0:
+            random.Random(worker_index).shuffle(root_moves)
+        best_move, best_score, completed_depth = ai_search.iterative_deepening(max_depth, root_moves,
+                                                                               min(1 + worker_index % 2, max_depth))
+        if completed_depth == max_depth:
+            # The other workers cannot complete a deeper search anymore.
+            transposition_table.request_stop()
+        move_indexes = {id(move): move_index for move_index, move in enumerate(moves)}
+        root_scores = [(move_indexes[id(move)], score) for score, move in ai_search.root_scores]
+        return move_indexes[id(best_move)], best_score, completed_depth, root_scores, \
+            ai_search.nbr_nodes, ai_search.nbr_leaves
+    finally:
+        transposition_table.close()
+
+
+class LazySMPSearch:
+    """ Same search as AlphaBetaSearch.iterative_deepening, done by several worker processes at once.
+        All the workers search the whole position (see search_lazy_smp_worker) and share a transposition table stored
+        in shared memory, so each one benefits from the positions the others already searched. Unlike ParallelRootSearch,
+        this also keeps every worker busy when most of the search tree is under a few root moves.
+        The result is the one of the worker that completed the deepest search (the first worker among equally deep ones).
+        Since the workers share their results while searching, it is not always the move the serial search would choose.
+        Like for AlphaBetaSearch, exact_root_scores makes the scores of all the root moves exact.
+    """
+    def __init__(self, board, current_player, deadline, node_limit, process_pool, nbr_workers,
+                 transposition_table_size_mb=DEFAULT_TRANSPOSITION_TABLE_SIZE_MB, exact_root_scores=False):
+        self.board = board
+        self.current_player = current_player
+        self.deadline = deadline
+        self.node_limit = node_limit
+        self.process_pool = process_pool
+        self.nbr_workers = nbr_workers
+        self.transposition_table_size_mb = transposition_table_size_mb
+        self.exact_root_scores = exact_root_scores
+        self.nbr_nodes = 0
+        self.nbr_leaves = 0
+        self.root_scores = []
+        # The root moves are searched by the workers, which do not report what each one cost.
+        self.root_move_stats = None
+
+    def iterative_deepening(self, max_depth):
+        """ Return the best move of the deepest completed search, its score and the depth of that search. """
+        moves = self.board.generate_valid_recycling_moves() if self.board.isInRecyclingPhase() \
+            else self.board.generate_valid_regular_moves()
+        compact_position = self.board.get_compact_position()
+        time_limit = max(self.deadline - time.perf_counter(), 0) if self.deadline is not None else None
+        # A new table is used for every move, so that no process has to remember to free it at the end of the game.
+        transposition_table = SharedTranspositionTable(self.transposition_table_size_mb)
+        try:
+            futures = [self.process_pool.submit(search_lazy_smp_worker, type(self.board), type(self.current_player),
+                                                compact_position, max_depth, time_limit, self.node_limit,
+                                                transposition_table.get_name(), worker_index, self.exact_root_scores)
+                       for worker_index in range(self.nbr_workers)]
+            results = [future.result() for future in futures]
+        finally:
+            transposition_table.close()
+            transposition_table.unlink()
+        best_result = None
+        for result in results:
+            if best_result is None or result[2] > best_result[2]:
+                best_result = result
+            self.nbr_nodes += result[4]
+            self.nbr_leaves += result[5]
+        best_move_index, best_score, completed_depth, root_scores, nbr_nodes, nbr_leaves = best_result
+        self.root_scores = [(score, moves[move_index]) for move_index, score in root_scores]
+        return moves[best_move_index], best_score, completed_depth
@@ -0,0 +1,28 @@
+from array import array
+
+NBR_ROTATION_CODES = 8
+# Type codes of the arrays holding the codes of the moves. The regular moves of a board of up to 8192 cells fit in
+# 16 bits, the recycling moves of the 8 x 12 board need 17 bits.
+REGULAR_MOVE_CODES_TYPECODE = 'H'
+RECYCLING_MOVE_CODES_TYPECODE = 'I'
+
+# A move is encoded as an integer from the cell of the first tile it places and its rotation code:
+#     cell_index * NBR_ROTATION_CODES + rotation_code - 1
+# The code of a recycling move also holds the cell of the first tile of the card it moves (the source cell), which
+# identifies the card:
+#     ((source_cell_index + 1) * nbr_cells + cell_index) * NBR_ROTATION_CODES + rotation_code - 1
+# so the codes of the regular moves are the ones under nbr_cells * NBR_ROTATION_CODES. The code of a move modulo
+# nbr_cells * NBR_ROTATION_CODES only depends on where it places a card and with which rotation code.
+
+
+def encode_regular_move(cell_index, rotation_code):
+    return cell_index * NBR_ROTATION_CODES + rotation_code - 1
+
+
+def encode_recycling_move(nbr_cells, source_cell_index, cell_index, rotation_code):
+    return ((source_cell_index + 1) * nbr_cells + cell_index) * NBR_ROTATION_CODES + rotation_code - 1
+
+
+def create_move_codes(is_recycling):
+    """ Return an empty array to hold the codes of regular or recycling moves. """
+    return array(RECYCLING_MOVE_CODES_TYPECODE if is_recycling else REGULAR_MOVE_CODES_TYPECODE)
@@ -0,0 +1,111 @@
+from move_encoding import *
+
+# Categories of moves, in the order they are searched.
+TRANSPOSITION_TABLE_MOVE = 0
+WINNING_MOVE = 1
+BLOCKING_MOVE = 2
+KILLER_MOVE = 3
+QUIET_MOVE = 4
+# Moves completing a line of the other player without completing one of the player to move lose the game.
+LOSING_MOVE = 5
+
+
+class MoveOrderer:
+    """ Sorts the moves of the positions searched by AlphaBetaSearch so that the ones most likely to cause a cutoff
+        are searched first:
+        - the best move stored in the transposition table for the position
+        - the moves winning the game, then the ones taking a cell the other player needs to win on their next move
+          (both found with Board.check_move_win_conditions, which does not need to play the moves)
+        - the killer moves of the ply: the last moves that caused a cutoff in another position at the same distance
+          from the root
+        - the other moves, by their history score: the sum of depth * depth over all the cutoffs caused by moves
+          placing a card on the same cell with the same rotation code
+        - the moves giving the game to the other player
+        It also counts how often the first move searched caused the cutoff, which tells how good the ordering is.
+    """
+    NBR_KILLERS_PER_PLY = 2
+
+    def __init__(self, board):
+        self.board = board
+        self.nbr_rotation_codes = len(board.ROTATION_TEMPLATES)
+        self.nbr_history_keys = board.bitboard.nbr_cells * self.nbr_rotation_codes
+        self.history = [0] * self.nbr_history_keys
+        self.killers = []
+        self.nbr_cutoffs = 0
+        self.nbr_first_move_cutoffs = 0
+
+    def get_first_move_cutoff_rate(self):
+        """ Return the fraction of the cutoffs that were caused by the first move searched. """
+        return self.nbr_first_move_cutoffs / self.nbr_cutoffs if self.nbr_cutoffs > 0 else 0.0
+
+    def get_move_key(self, move, is_recycling):
+        """ Return the code of the move (see move_encoding). The key modulo self.nbr_history_keys only depends on the
+            cell of the first tile placed by the move and on its rotation code.
+        """
+        bitboard = self.board.bitboard
+        cell_index = bitboard.cell_index(move.position_first_tile[0], move.position_first_tile[1])
+        if is_recycling:
+            # Recycling moves placing different cards on the same cells are different moves.
+            return encode_recycling_move(bitboard.nbr_cells, bitboard.cell_index(move.position_card_1st_tile[0],
+                                                                                 move.position_card_1st_tile[1]),
+                                         cell_index, move.new_rot_code)
+        return encode_regular_move(cell_index, move.rotation_code)
+
+    def get_killers(self, ply):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        return self.killers[ply]
+
+    def order_moves(self, moves, ply, is_recycling, type_item, other_type_item, first_move_index=None):
+        """ Return the indexes of the moves in the order they should be searched, type_item being the type of item
+            (Tile.Color or Tile.DotState) of the player to move. The move of index first_move_index, if given,
+            is always searched first.
+        """
+        board = self.board
+        killers = self.get_killers(ply)
+        history = self.history
+        move_categories = []
+        # Cells of the moves that would make the other player win: the player to move should take them first.
+        threatened_cells = set()
+        for move in moves:
+            # The player who plays the move wins even if it also completes a line of the other player.
+            if board.check_move_win_conditions(move, type_item):
+                category = WINNING_MOVE
+            elif board.check_move_win_conditions(move, other_type_item):
+                category = LOSING_MOVE
+                threatened_cells.update((move.position_first_tile, move.position_second_tile))
+            else:
+                category = QUIET_MOVE
+            move_categories.append(category)
+
+        sort_keys = []
+        for move_index, move in enumerate(moves):
+            category = move_categories[move_index]
+            move_key = self.get_move_key(move, is_recycling)
+            if move_index == first_move_index:
+                category = TRANSPOSITION_TABLE_MOVE
+            elif category == QUIET_MOVE:
+                if threatened_cells and (move.position_first_tile in threatened_cells
+                                         or move.position_second_tile in threatened_cells):
+                    category = BLOCKING_MOVE
+                elif move_key in killers:
+                    category = KILLER_MOVE
+            # The index keeps the moves of the same category and history score in the order they were generated.
+            sort_keys.append((category, -history[move_key % self.nbr_history_keys], move_index))
+        sort_keys.sort()
+        return [move_index for category, history_score, move_index in sort_keys]
+
+    def record_cutoff(self, move, ply, depth, is_recycling, nbr_moves_searched):
+        """ To be called when the move caused a cutoff after nbr_moves_searched moves (itself included) were searched
+            in a position at the given ply (distance from the root), searched depth plies deep.
+        """
+        self.nbr_cutoffs += 1
+        if nbr_moves_searched == 1:
+            self.nbr_first_move_cutoffs += 1
+        move_key = self.get_move_key(move, is_recycling)
+        killers = self.get_killers(ply)
+        if move_key not in killers:
+            killers.insert(0, move_key)
+            del killers[self.NBR_KILLERS_PER_PLY:]
+        # Deeper cutoffs save more nodes, so they weigh more.
+        self.history[move_key % self.nbr_history_keys] += depth * depth
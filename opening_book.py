@@ -0,0 +1,241 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from exceptions import *
+from parallel_search import *
+from batch_eval import *
+
+# The book is looked for next to the modules of the game.
+DEFAULT_OPENING_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+# By default, the book holds the positions of the first 2 moves of the game, searched 4 plies deep.
+DEFAULT_BOOK_NBR_MOVES = 2
+DEFAULT_BOOK_SEARCH_DEPTH = 4
+
+OPENING_BOOK_MAGIC = b'DCOB'
+# Version 2 adds the cards of the position to its key (see get_canonical_position_key).
+OPENING_BOOK_VERSION = 2
+# Header: magic, version, largest number of moves played in the positions of the book, number of records.
+OPENING_BOOK_HEADER = struct.Struct('<4sHHI')
+# Record: key of the position, score of its best move, and that move (rotation code and position of its 1st tile),
+# along with the depth it was searched to. The records are sorted by key.
+OPENING_BOOK_RECORD = struct.Struct('<QdBBBB')
+
+
+def get_mirrored_rotation_codes(board_class):
+    """ Return the rotation code of each card (by rotation code - 1) once the board is mirrored left to right: the
+        tiles of a card lying horizontally swap sides while the ones of a card standing up do not move.
+    """
+    mirrored_rotation_codes = []
+    for rotation_code, tile_1_offset, tile_2_offset, is_horizontal in board_class.ROTATION_TEMPLATES:
+        mirrored_offset = (tile_1_offset[0] - tile_2_offset[0], tile_2_offset[1] - tile_1_offset[1])
+        for other_rotation_code, other_tile_1_offset, other_tile_2_offset, other_is_horizontal \
+                in board_class.ROTATION_TEMPLATES:
+            if board_class.ROTATION_TILE_FACES[other_rotation_code - 1] == \
+                    board_class.ROTATION_TILE_FACES[rotation_code - 1] and \
+                    (other_tile_2_offset[0] - other_tile_1_offset[0],
+                     other_tile_2_offset[1] - other_tile_1_offset[1]) == mirrored_offset:
+                mirrored_rotation_codes.append(other_rotation_code)
+                break
+    return mirrored_rotation_codes
+
+
+def mirror_move(rotation_code, x, width, mirrored_rotation_codes):
+    """ Return the rotation code of a card and the column of its 1st tile once the board is mirrored left to right. """
+    return mirrored_rotation_codes[rotation_code - 1], width - 1 - x
+
+
+def get_mirrored_hash(board):
+    """ Return the Zobrist hash and the hashes of the cards (see Board.cards_hash) the board would have once mirrored
+        left to right, XORed together.
+    """
+    bitboard = board.bitboard
+    zobrist_hash = 0
+    card_cell_indexes = dict()
+    for cell_index in range(bitboard.nbr_cells):
+        if (bitboard.occupied >> cell_index) & 1:
+            x, y = bitboard.cell_position(cell_index)
+            mirrored_cell_index = bitboard.cell_index(bitboard.width - 1 - x, y)
+            zobrist_hash ^= board.zobrist_keys.get_tile_key(mirrored_cell_index, (bitboard.red >> cell_index) & 1,
+                                                            (bitboard.filled >> cell_index) & 1)
+            card_cell_indexes.setdefault(id(board.cell_cards[cell_index]), []).append(mirrored_cell_index)
+    for card_object_id, cell_indexes in card_cell_indexes.items():
+        zobrist_hash ^= board.zobrist_keys.get_card_key(cell_indexes[0], cell_indexes[1])
+        if card_object_id == id(board.recycled_card):
+            zobrist_hash ^= board.zobrist_keys.get_recycled_card_key(cell_indexes[0], cell_indexes[1])
+    return zobrist_hash
+
+
+def get_canonical_position_key(board, type_item):
+    """ Return the key of the position for the player of the given type of item to move, which is the same for the
+        position and its mirror image, and whether that key is the one of the mirror image.
+        Like the keys of the transposition tables (see AlphaBetaSearch.get_position_key), it includes the cards of the
+        position and not only its tiles.
+    """
+    player_key = board.zobrist_keys.get_player_key(type_item)
+    key = board.zobrist_hash ^ board.cards_hash ^ board.recycled_card_hash ^ player_key
+    mirrored_key = get_mirrored_hash(board) ^ player_key
+    if mirrored_key < key:
+        return mirrored_key, True
+    return key, False
+
+
+class OpeningBook:
+    """ Best moves of the positions of the first moves of the game, in a file built by build_opening_book.
+        The file is memory-mapped and its sorted records are binary searched where they are, so opening the book
+        neither reads nor parses it. The moves are stored for the canonical position (see get_canonical_position_key)
+        and mirrored back when needed.
+    """
+    def __init__(self, path=DEFAULT_OPENING_BOOK_PATH):
+        self.file = open(path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            self.file.close()
+            raise InvalidOpeningBookException(path + " is not an opening book.")
+        if len(self.buffer) < OPENING_BOOK_HEADER.size:
+            self.close()
+            raise InvalidOpeningBookException(path + " is not an opening book.")
+        magic, version, self.max_nbr_moves, self.nbr_records = OPENING_BOOK_HEADER.unpack_from(self.buffer, 0)
+        if magic != OPENING_BOOK_MAGIC or version != OPENING_BOOK_VERSION or \
+                len(self.buffer) != OPENING_BOOK_HEADER.size + self.nbr_records * OPENING_BOOK_RECORD.size:
+            self.close()
+            raise InvalidOpeningBookException(path + " is not an opening book of version "
+                                              + str(OPENING_BOOK_VERSION) + ".")
+        self.mirrored_rotation_codes = None
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def find_record(self, key):
+        """ Return (score, rotation code, x, y, depth) of the record of the key, None if it is not in the book. """
+        low = 0
+        high = self.nbr_records
+        while low < high:
+            middle = (low + high) // 2
+            record_key = struct.unpack_from('<Q', self.buffer,
+                                            OPENING_BOOK_HEADER.size + middle * OPENING_BOOK_RECORD.size)[0]
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return OPENING_BOOK_RECORD.unpack_from(self.buffer,
+                                                       OPENING_BOOK_HEADER.size + middle * OPENING_BOOK_RECORD.size)[1:]
+        return None
+
+    def get_move(self, board, current_player, depth):
+        """ Return the move of the book for current_player (one of the moves generated by the board) and its score,
+            or (None, None) if the position is not in the book or was searched less than depth plies deep for it.
+        """
+        if board.nbr_moves > self.max_nbr_moves or board.isInRecyclingPhase():
+            return None, None
+        key, is_mirrored = get_canonical_position_key(board, current_player.typeItem)
+        record = self.find_record(key)
+        if record is None:
+            return None, None
+        score, rotation_code, x, y, record_depth = record
+        if record_depth < depth:
+            return None, None
+        if is_mirrored:
+            if self.mirrored_rotation_codes is None:
+                self.mirrored_rotation_codes = get_mirrored_rotation_codes(type(board))
+            rotation_code, x = mirror_move(rotation_code, x, board.bitboard.width, self.mirrored_rotation_codes)
+        # Different positions can have the same key, in which case the move of the book may not even be valid.
+        for move in board.generate_valid_regular_moves():
+            if move.rotation_code == rotation_code and move.position_first_tile == (x, y):
+                return move, score
+        return None, None
+
+
+def search_book_position(board_class, player_class, compact_position, depth, transposition_table_size_mb):
+    """ Search the position in a worker process, like Board.ai_move does, and return
+        (score, rotation code, x, y) of its best move.
+    """
+    board = load_board(board_class, compact_position)
+    ai_search = AlphaBetaSearch(board, player_class(), transposition_table=TranspositionTable(transposition_table_size_mb),
+                                move_orderer=MoveOrderer(board), batch_evaluation=is_batch_evaluation_available())
+    move, score = ai_search.search(depth)
+    return score, move.rotation_code, move.position_first_tile[0], move.position_first_tile[1]
+
+
+def build_opening_book(path, max_nbr_moves=DEFAULT_BOOK_NBR_MOVES, depth=DEFAULT_BOOK_SEARCH_DEPTH,
+                       nbr_workers=os.cpu_count(), transposition_table_size_mb=DEFAULT_TRANSPOSITION_TABLE_SIZE_MB):
+    """ Search every position the AI can face in its first moves and write their best moves to the book at path.
+        Those are the positions with at most max_nbr_moves moves played in which the AI is to move, whichever player
+        it plays and whoever moved first, the AI having played the moves of the book and the other player any move.
+        Return the number of positions in the book.
+    """
+    from board import Board, DotPlayer, ColorPlayer, NBR_CARDS
+    mirrored_rotation_codes = get_mirrored_rotation_codes(Board)
+    # Positions to expand at the current number of moves: (compact position, player class of the AI, whether its key
+    # is the one of its mirror image), by canonical key of the position for the player to move and whether the AI is
+    # to move. Only the first position found of the positions having the same key is kept.
+    positions = dict()
+    for player_class in (DotPlayer, ColorPlayer):
+        for is_ai_to_move in (True, False):
+            board = Board(NBR_CARDS, 0)
+            type_item = player_class().typeItem if is_ai_to_move else board.get_other_type_item(player_class().typeItem)
+            key, is_mirrored = get_canonical_position_key(board, type_item)
+            positions[key, is_ai_to_move] = (board.get_compact_position(), player_class, is_mirrored)
+    # Best move of each position in which the AI is to move, for the board of positions (and not its mirror image).
+    book_moves = dict()
+    records = dict()
+    with create_process_pool(nbr_workers) as process_pool:
+        for nbr_moves in range(max_nbr_moves + 1):
+            searched_keys = [key for key, is_ai_to_move in positions if is_ai_to_move]
+            futures = [process_pool.submit(search_book_position, Board, positions[key, True][1], positions[key, True][0],
+                                           depth, transposition_table_size_mb)
+                       for key in searched_keys]
+            for key, future in zip(searched_keys, futures):
+                book_moves[key] = score, rotation_code, x, y = future.result()
+                # The book holds the moves of the canonical positions.
+                if positions[key, True][2]:
+                    rotation_code, x = mirror_move(rotation_code, x, Board.DIMENSIONS_X_Y[0], mirrored_rotation_codes)
+                records[key] = score, rotation_code, x, y
+            if nbr_moves == max_nbr_moves:
+                break
+
+            next_positions = dict()
+            for (key, is_ai_to_move), (compact_position, player_class, is_mirrored) in positions.items():
+                board = load_board(Board, compact_position)
+                if is_ai_to_move:
+                    score, rotation_code, x, y = book_moves[key]
+                    moves = [move for move in board.generate_valid_regular_moves()
+                             if move.rotation_code == rotation_code and move.position_first_tile == (x, y)]
+                else:
+                    moves = board.generate_valid_regular_moves()
+                next_type_item = board.get_other_type_item(player_class().typeItem) if is_ai_to_move \
+                    else player_class().typeItem
+                for move in moves:
+                    board.make(move)
+                    next_key, is_next_mirrored = get_canonical_position_key(board, next_type_item)
+                    if (next_key, not is_ai_to_move) not in next_positions:
+                        next_positions[next_key, not is_ai_to_move] = (board.get_compact_position(), player_class,
+                                                                       is_next_mirrored)
+                    board.unmake()
+            positions = next_positions
+
+    with open(path, 'wb') as book_file:
+        book_file.write(OPENING_BOOK_HEADER.pack(OPENING_BOOK_MAGIC, OPENING_BOOK_VERSION, max_nbr_moves, len(records)))
+        for key in sorted(records):
+            score, rotation_code, x, y = records[key]
+            book_file.write(OPENING_BOOK_RECORD.pack(key, score, rotation_code, x, y, depth))
+    return len(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the opening book used by the AI for its first moves.")
+    parser.add_argument("--output", default=DEFAULT_OPENING_BOOK_PATH, help="path of the book")
+    parser.add_argument("--moves", type=int, default=DEFAULT_BOOK_NBR_MOVES,
+                        help="largest number of moves played in the positions of the book")
+    parser.add_argument("--depth", type=int, default=DEFAULT_BOOK_SEARCH_DEPTH,
+                        help="number of plies searched in every position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    arguments = parser.parse_args()
+    start = time.perf_counter()
+    nbr_positions = build_opening_book(arguments.output, arguments.moves, arguments.depth, arguments.workers)
+    print("%d positions written to %s in %.1f s" % (nbr_positions, arguments.output, time.perf_counter() - start))
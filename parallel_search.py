@@ -0,0 +1,145 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from search import *
+from move_ordering import *
+
+# Every worker gets a few groups of root moves, so that the ones ending early can help the others.
+NBR_TASKS_PER_WORKER = 2
+# Each task searches with its own transposition table, so they are smaller than the one of the serial search.
+DEFAULT_WORKER_TRANSPOSITION_TABLE_SIZE_MB = 4
+
+
+def create_process_pool(nbr_workers):
+    return ProcessPoolExecutor(max_workers=nbr_workers)
+
+
+def load_board(board_class, compact_position):
+    board = board_class(compact_position[0])
+    board.load_compact_position(compact_position)
+    return board
+
+
+def search_root_moves(board_class, player_class, compact_position, depth, move_indexes, transposition_table_size_mb,
+                      exact_root_scores=False):
+    """ Search the root moves of the given indexes (in the list of moves generated from the position) in a worker
+        process. The board and player classes are sent by reference, so this module does not depend on the board.
+        Return (index, score) of the best of these moves, the (index, score) of all the moves searched (the ones
+        that could not beat the best one only having an upper bound of their score, unless exact_root_scores is True),
+        and the numbers of nodes and leaves searched.
+    """
+    board = load_board(board_class, compact_position)
+    transposition_table = TranspositionTable(transposition_table_size_mb) if transposition_table_size_mb > 0 else None
+    ai_search = AlphaBetaSearch(board, player_class(), transposition_table=transposition_table,
+                                move_orderer=MoveOrderer(board), exact_root_scores=exact_root_scores)
+    moves = ai_search.generate_moves(board.isInRecyclingPhase())
+    root_moves = [moves[move_index] for move_index in move_indexes]
+    best_move, best_score = ai_search.search(depth, root_moves)
+    move_indexes_by_id = {id(move): move_index for move_index, move in zip(move_indexes, root_moves)}
+    root_scores = [(move_indexes_by_id[id(move)], score) for score, move in ai_search.root_scores]
+    return (move_indexes_by_id[id(best_move)], best_score), root_scores, ai_search.nbr_nodes, ai_search.nbr_leaves
+
+
+class ParallelRootSearch:
+    """ Same search as AlphaBetaSearch.search, with the root moves split between the worker processes of a pool.
+        The workers are sent the compact position of the board (see Board.get_compact_position) and the indexes of
+        the root moves they have to search, rather than the board itself.
+        Each group of root moves is searched with an alpha-beta search, which gives the exact score of the best move
+        of the group. The best move overall is the best of these, the one generated first among equally good ones,
+        which is the move the serial search chooses. Like for AlphaBetaSearch, exact_root_scores makes the scores of all
+        the root moves exact.
+    """
+    def __init__(self, board, current_player, process_pool, nbr_workers,
+                 transposition_table_size_mb=DEFAULT_WORKER_TRANSPOSITION_TABLE_SIZE_MB, exact_root_scores=False):
+        self.board = board
+        self.current_player = current_player
+        self.process_pool = process_pool
+        self.nbr_workers = nbr_workers
+        self.transposition_table_size_mb = transposition_table_size_mb
+        self.exact_root_scores = exact_root_scores
+        self.nbr_nodes = 0
+        self.nbr_leaves = 0
+        self.root_scores = []
+        # The root moves are searched by the workers, which do not report what each one cost.
+        self.root_move_stats = None
+
+    def search(self, depth):
+        """ Return the best move for the current player, searching depth plies ahead, along with its score. """
+        moves = self.board.generate_valid_recycling_moves() if self.board.isInRecyclingPhase() \
+            else self.board.generate_valid_regular_moves()
+        compact_position = self.board.get_compact_position()
+        nbr_tasks = min(len(moves), self.nbr_workers * NBR_TASKS_PER_WORKER)
+        # The moves are dealt out like cards, so that every task gets some of the first (best ordered) moves.
+        futures = [self.process_pool.submit(search_root_moves, type(self.board), type(self.current_player),
+                                            compact_position, depth, list(range(task_index, len(moves), nbr_tasks)),
+                                            self.transposition_table_size_mb, self.exact_root_scores)
+                   for task_index in range(nbr_tasks)]
+        best_move_index = None
+        best_score = -INFINITY
+        scores = dict()
+        for future in futures:
+            (task_best_move_index, task_best_score), task_root_scores, nbr_nodes, nbr_leaves = future.result()
+            if best_move_index is None or task_best_score > best_score or \
+                    (task_best_score == best_score and task_best_move_index < best_move_index):
+                best_move_index = task_best_move_index
+                best_score = task_best_score
+            scores.update(task_root_scores)
+            self.nbr_nodes += nbr_nodes
+            self.nbr_leaves += nbr_leaves
+        self.root_scores = [(scores[move_index], move) for move_index, move in enumerate(moves)]
+        return moves[best_move_index], best_score
+
+
+def benchmark(nbr_positions, depth, max_nbr_workers, seed):
+    """ Search random positions of the regular phase with 1 worker, then 2, 4, ... up to max_nbr_workers, and print
+        the time taken and the speedup compared to the serial search.
+    """
+    from board import Board, ColorPlayer, DotPlayer, NBR_CARDS
+    generator = random.Random(seed)
+    boards = []
+    for position_index in range(nbr_positions):
+        board = Board(NBR_CARDS)
+        for move_index in range(generator.randrange(2, NBR_CARDS - 2)):
+            move = generator.choice(board.generate_valid_regular_moves())
+            board.play_move(move)
+        boards.append(board)
+    players = [ColorPlayer(), DotPlayer()]
+
+    start = time.perf_counter()
+    serial_moves = []
+    for position_index, board in enumerate(boards):
+        ai_search = AlphaBetaSearch(board, players[position_index % 2],
+                                    transposition_table=TranspositionTable(DEFAULT_WORKER_TRANSPOSITION_TABLE_SIZE_MB),
+                                    move_orderer=MoveOrderer(board))
+        serial_moves.append(ai_search.search(depth)[0])
+    serial_time = time.perf_counter() - start
+    print("workers  seconds  speedup  same moves")
+    print("%7s  %7.2f  %7.2f  %s" % ("serial", serial_time, 1.0, True))
+
+    worker_counts = [nbr_workers for nbr_workers in (2 ** i for i in range(max_nbr_workers.bit_length()))
+                     if nbr_workers < max_nbr_workers] + [max_nbr_workers]
+    for nbr_workers in worker_counts:
+        with create_process_pool(nbr_workers) as process_pool:
+            # The workers are started before the clock, like they are during a game.
+            list(process_pool.map(abs, range(nbr_workers)))
+            start = time.perf_counter()
+            same_moves = True
+            for position_index, board in enumerate(boards):
+                move, score = ParallelRootSearch(board, players[position_index % 2], process_pool, nbr_workers).search(depth)
+                serial_move = serial_moves[position_index]
+                same_moves = same_moves and (move.position_first_tile, move.position_second_tile, move.rotation_code) \
+                    == (serial_move.position_first_tile, serial_move.position_second_tile, serial_move.rotation_code)
+            parallel_time = time.perf_counter() - start
+        print("%7d  %7.2f  %7.2f  %s" % (nbr_workers, parallel_time, serial_time / parallel_time, same_moves))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the speedup of the parallel root search over the serial one.")
+    parser.add_argument("--positions", type=int, default=8, help="number of random positions searched")
+    parser.add_argument("--depth", type=int, default=3, help="number of plies searched")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(), help="largest number of workers tried")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random positions")
+    arguments = parser.parse_args()
+    benchmark(arguments.positions, arguments.depth, arguments.max_workers, arguments.seed)
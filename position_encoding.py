@@ -0,0 +1,111 @@
+import struct
+from exceptions import *
+
+# Every cell is encoded by an integer telling whether it is empty (0) or, if it has a tile, the rotation code of the card
+# the tile belongs to and whether it is the 1st or 2nd tile of the card:
+#     (rotation_code - 1) * 2 + tile_index + 1
+# which is enough to find the cells of every card again, since the rotation code of a card gives where its other tile is.
+NBR_CELL_STATES = 17
+EMPTY_CELL_STATE = 0
+# Cell index of the recycled card when no card was recycled on the last move.
+NO_RECYCLED_CELL = -1
+# Card id of the empty cells in the binary encoding.
+NO_CARD_ID = 0xFFFF
+
+# The binary encoding of a position is made of a header (maximum number of cards, number of cards, number of moves and
+# cell index of the 1st tile of the card recycled last, or NO_RECYCLED_CELL), the states of the cells and the ids of the
+# cards of the cells, so it has the same size for all the positions of a board.
+POSITION_HEADER_FORMAT = '<BBHh'
+position_structs = dict()
+
+# The text encoding of a position is its cells, followed by the number of moves, the cell index of the 1st tile of the
+# card recycled last (or NO_RECYCLED_TEXT) and the maximum number of cards, separated by POSITION_TEXT_SEPARATOR. The
+# cell states are written as letters (a for 1, b for 2, ...), and the runs of empty cells as their length, so that the
+# empty rows at the top of the board take a couple of characters. The card ids are not part of it.
+POSITION_TEXT_SEPARATOR = '/'
+NO_RECYCLED_TEXT = '-'
+FIRST_CELL_STATE_LETTER = 'a'
+
+
+def encode_cell_state(rotation_code, tile_index):
+    return (rotation_code - 1) * 2 + tile_index + 1
+
+
+def decode_cell_state(cell_state):
+    """ Return (rotation code, tile index) of the tile of a cell that is not empty. """
+    return (cell_state - 1) // 2 + 1, (cell_state - 1) % 2
+
+
+def get_position_struct(nbr_cells):
+    position_struct = position_structs.get(nbr_cells)
+    if position_struct is None:
+        position_struct = struct.Struct(POSITION_HEADER_FORMAT + '%dB%dH' % (nbr_cells, nbr_cells))
+        position_structs[nbr_cells] = position_struct
+    return position_struct
+
+
+def encode_position_blob(max_nbr_cards, nbr_cards, nbr_moves, recycled_cell_index, cell_states, card_ids):
+    """ Return the binary encoding of a position, card_ids being NO_CARD_ID for the empty cells. """
+    return get_position_struct(len(cell_states)).pack(max_nbr_cards, nbr_cards, nbr_moves, recycled_cell_index,
+                                                      *cell_states, *card_ids)
+
+
+def decode_position_blob(nbr_cells, blob):
+    """ Return (maximum number of cards, number of cards, number of moves, recycled cell index, cell states, card ids)
+        of the binary encoding of a position of a board of nbr_cells cells.
+    """
+    position_struct = get_position_struct(nbr_cells)
+    if len(blob) != position_struct.size:
+        raise InvalidPositionEncodingException("A position of %d cells takes %d bytes, not %d."
+                                               % (nbr_cells, position_struct.size, len(blob)))
+    values = position_struct.unpack(blob)
+    return values[0], values[1], values[2], values[3], values[4:4 + nbr_cells], values[4 + nbr_cells:]
+
+
+def encode_position_text(max_nbr_cards, nbr_moves, recycled_cell_index, cell_states):
+    parts = []
+    nbr_empty_cells = 0
+    for cell_state in cell_states:
+        if cell_state == EMPTY_CELL_STATE:
+            nbr_empty_cells += 1
+            continue
+        if nbr_empty_cells > 0:
+            parts.append(str(nbr_empty_cells))
+            nbr_empty_cells = 0
+        parts.append(chr(ord(FIRST_CELL_STATE_LETTER) + cell_state - 1))
+    if nbr_empty_cells > 0:
+        parts.append(str(nbr_empty_cells))
+    recycled_text = NO_RECYCLED_TEXT if recycled_cell_index == NO_RECYCLED_CELL else str(recycled_cell_index)
+    return POSITION_TEXT_SEPARATOR.join(("".join(parts), str(nbr_moves), recycled_text, str(max_nbr_cards)))
+
+
+def decode_position_text(nbr_cells, text):
+    """ Return (maximum number of cards, number of moves, recycled cell index, cell states) of the text encoding of a
+        position of a board of nbr_cells cells.
+    """
+    fields = text.strip().split(POSITION_TEXT_SEPARATOR)
+    if len(fields) != 4:
+        raise InvalidPositionEncodingException("%s is not a position." % text)
+    cells_text, nbr_moves_text, recycled_text, max_nbr_cards_text = fields
+    cell_states = []
+    run_length = ""
+    for character in cells_text:
+        if character.isdigit():
+            run_length += character
+            continue
+        if run_length:
+            cell_states.extend([EMPTY_CELL_STATE] * int(run_length))
+            run_length = ""
+        cell_state = ord(character) - ord(FIRST_CELL_STATE_LETTER) + 1
+        if not 0 < cell_state < NBR_CELL_STATES:
+            raise InvalidPositionEncodingException("%s is not the state of a cell." % character)
+        cell_states.append(cell_state)
+    if run_length:
+        cell_states.extend([EMPTY_CELL_STATE] * int(run_length))
+    if len(cell_states) != nbr_cells:
+        raise InvalidPositionEncodingException("%s has %d cells instead of %d." % (text, len(cell_states), nbr_cells))
+    try:
+        recycled_cell_index = NO_RECYCLED_CELL if recycled_text == NO_RECYCLED_TEXT else int(recycled_text)
+        return int(max_nbr_cards_text), int(nbr_moves_text), recycled_cell_index, cell_states
+    except ValueError:
+        raise InvalidPositionEncodingException("%s is not a position." % text)
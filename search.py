@@ -0,0 +1,288 @@
+import time
+from exceptions import *
+from transposition import *
+
+# Number of plies searched by the AI when no depth is given to Board.ai_move.
+# The recycling phase generates a lot more moves than the regular phase, so we search it less deeply by default.
+DEFAULT_SEARCH_DEPTH = 2
+DEFAULT_RECYCLING_SEARCH_DEPTH = 1
+
+INFINITY = float('inf')
+# Score of a position in which the player to move has no valid move left.
+NO_MOVE_SCORE = -1000000
+
+# Reading the clock on every node would slow the search down, so the deadline is only checked every so many nodes.
+NBR_NODES_BETWEEN_TIME_CHECKS = 16
+# Number of nodes between the calls to the progress callback of a search, a multiple of NBR_NODES_BETWEEN_TIME_CHECKS.
+NBR_NODES_BETWEEN_PROGRESS_REPORTS = 1024
+
+# Number of leaves of a position searched one by one before the others are scored in a batch (see AlphaBetaSearch).
+NBR_LEAVES_SEARCHED_BEFORE_BATCH = 8
+
+
+def allocate_move_time(time_budget_ms, nbr_moves_played, max_nbr_moves):
+    """ Split the time the AI has left for the game evenly over the moves it still has to play
+        before the game ends in a draw. Return the number of milliseconds it can spend on its current move.
+    """
+    nbr_moves_left = max(max_nbr_moves - nbr_moves_played, 1)
+    # The players alternate, so the AI plays every other remaining move (including the current one).
+    nbr_ai_moves_left = (nbr_moves_left + 1) // 2
+    return time_budget_ms / nbr_ai_moves_left
+
+
+class AlphaBetaSearch:
+    """ Negamax search with alpha-beta pruning.
+        The heuristic of the board is always computed from the point of view of the player the search is done for
+        (the current player at the root), so it is negated on the plies where the other player is to move.
+        Like in findMinimax, the tiles of all the moves played from the root are the ones given to the heuristic.
+        The search can be given a deadline (time.perf_counter() value) and/or a maximum number of nodes, in which
+        case it raises a SearchInterruptedException as soon as one of them is exceeded. It is also raised shortly
+        after cancel_event (a threading.Event), if given, is set from another thread.
+        If it is given a progress_callback, it is called with the depth being searched and the number of nodes searched
+        so far every NBR_NODES_BETWEEN_PROGRESS_REPORTS nodes, and every time iterative_deepening completes a depth.
+        If it is given a transposition table, the positions reached through different move orders are only searched
+        once. Since the score of a position depends on the tiles placed since the root, they are part of its key, and so
+        are the cards of the board and the card recycled last, on which its recycling moves depend.
+        If it is given a move orderer (see MoveOrderer), the moves of every position below the root are searched in the
+        order it gives. The moves of the root are always searched in the order they are given, so that the same move is
+        chosen among equally good ones whatever the ordering.
+        If batch_evaluation is True, the leaves of a position searched 1 ply deep that are left once its first
+        NBR_LEAVES_SEARCHED_BEFORE_BATCH leaves did not cause a cutoff are scored all at once by the board (see
+        Board.evaluate_moves) instead of being played one by one. They are still counted and cut off like the other
+        nodes, so the search gives the same scores and moves.
+        If exact_root_scores is True, every root move is searched with the full window, so that the scores of the root
+        moves (see root_scores) are their minimax scores rather than bounds, which the traces of the AI need. It does
+        not change the move chosen, but prunes a lot less.
+        The moves are played with Board.make and undone with Board.unmake, so the card recycled on a move cannot be
+        recycled on the next one, like in the game, and the search can go on past the start of the recycling phase.
+    """
+    def __init__(self, board, current_player, deadline=None, node_limit=None, transposition_table=None,
+                 move_orderer=None, batch_evaluation=False, cancel_event=None, progress_callback=None,
+                 exact_root_scores=False):
+        self.board = board
+        self.current_player = current_player
+        self.deadline = deadline
+        self.node_limit = node_limit
+        self.cancel_event = cancel_event
+        self.progress_callback = progress_callback
+        # Whether the limits have to be checked every NBR_NODES_BETWEEN_TIME_CHECKS nodes.
+        self.has_periodic_checks = deadline is not None or cancel_event is not None or progress_callback is not None
+        self.transposition_table = transposition_table
+        self.move_orderer = move_orderer
+        self.batch_evaluation = batch_evaluation
+        self.exact_root_scores = exact_root_scores
+        # Type of item (Tile.Color or Tile.DotState) of the player to move, when color is 1 and -1.
+        self.type_items = {1: current_player.typeItem, -1: board.get_other_type_item(current_player.typeItem)}
+        # Depth of the current search, to know how far from the root the positions searched are.
+        self.root_depth = 0
+        # The scores depend on the player the search is done for, so it is part of the key of the positions too.
+        self.player_key = board.zobrist_keys.get_player_key(current_player.typeItem)
+        # Counted over all the searches done with this object, since the limits apply to all of them.
+        self.nbr_nodes = 0
+        self.nbr_leaves = 0
+        # Number of positions whose search was ended by a move beating beta, or by the score stored for them in the
+        # transposition table.
+        self.nbr_cutoffs = 0
+        self.nbr_tt_hits = 0
+        # (score, move) of every root move, in the order they were searched. Unless exact_root_scores is True, the moves
+        # that cannot beat the best one are pruned, so their score is only an upper bound of their real score.
+        self.root_scores = []
+        # (number of nodes, number of leaves, seconds) of the search of every root move, in the same order.
+        self.root_move_stats = []
+        # Best move found so far by the current search, used if it is interrupted before completing.
+        self.best_move = None
+        self.best_score = -INFINITY
+
+    def search(self, depth, root_moves=None):
+        """ Return the best move for the current player, searching depth plies ahead, along with its score. """
+        self.root_scores = []
+        self.root_move_stats = []
+        self.best_score = -INFINITY
+        self.best_move = None
+        self.root_depth = depth
+        is_recycling = self.board.isInRecyclingPhase()
+        if root_moves is None:
+            root_moves = self.generate_moves(is_recycling)
+        for move in root_moves:
+            self.check_limits()
+            nbr_nodes = self.nbr_nodes
+            nbr_leaves = self.nbr_leaves
+            start = time.perf_counter()
+            inserted_tiles_pos = self.make_move(move, is_recycling)
+            alpha = -INFINITY if self.exact_root_scores else self.best_score
+            try:
+                score = -self.negamax(depth - 1, -INFINITY, -alpha, -1, inserted_tiles_pos,
+                                      self.get_inserted_tiles_key(0, inserted_tiles_pos), is_recycling)
+            finally:
+                self.unmake_move(move, is_recycling)
+            self.root_scores.append((score, move))
+            self.root_move_stats.append((self.nbr_nodes - nbr_nodes, self.nbr_leaves - nbr_leaves,
+                                         time.perf_counter() - start))
+            # Only a strictly better move replaces the best one, so the first of equally good moves is chosen.
+            if self.best_move is None or score > self.best_score:
+                self.best_score = score
+                self.best_move = move
+        return self.best_move, self.best_score
+
+    def iterative_deepening(self, max_depth, root_moves=None, first_depth=1):
+        """ Search first_depth plies deep, then one more ply, etc. until max_depth is reached or the limits of the search
+            are exceeded. The root moves, if given, are searched in their order (the list is reordered in place).
+            Return the best move of the deepest completed search, its score and the depth of that search.
+        """
+        if root_moves is None:
+            root_moves = self.generate_moves(self.board.isInRecyclingPhase())
+        best_move = None
+        best_score = -INFINITY
+        completed_depth = 0
+        for depth in range(first_depth, max_depth + 1):
+            try:
+                best_move, best_score = self.search(depth, root_moves)
+            except SearchInterruptedException:
+                # If not even the 1 ply search could complete, the best move it found so far is all we have.
+                if best_move is None:
+                    best_move = self.best_move if self.best_move is not None else root_moves[0]
+                    best_score = self.best_score
+                break
+            completed_depth = depth
+            if self.progress_callback is not None:
+                self.progress_callback(depth, self.nbr_nodes)
+            # Searching the best move of the previous iteration first makes the next one prune a lot more.
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+        return best_move, best_score, completed_depth
+
+    def check_limits(self):
+        if self.node_limit is not None and self.nbr_nodes >= self.node_limit:
+            raise SearchInterruptedException("The search reached its limit of " + str(self.node_limit) + " nodes.")
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchInterruptedException("The search ran out of time.")
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchInterruptedException("The search was cancelled.")
+        if self.progress_callback is not None and self.nbr_nodes % NBR_NODES_BETWEEN_PROGRESS_REPORTS == 0:
+            self.progress_callback(self.root_depth, self.nbr_nodes)
+
+    def count_node(self):
+        self.nbr_nodes += 1
+        if (self.node_limit is not None and self.nbr_nodes > self.node_limit) or \
+                (self.has_periodic_checks and self.nbr_nodes % NBR_NODES_BETWEEN_TIME_CHECKS == 0):
+            self.check_limits()
+
+    def negamax(self, depth, alpha, beta, color, inserted_tiles_pos, inserted_tiles_key, last_move_is_recycling):
+        self.count_node()
+        if depth <= 0:
+            self.nbr_leaves += 1
+            return color * self.evaluate(inserted_tiles_pos, last_move_is_recycling)
+
+        original_alpha = alpha
+        tt_move_index = None
+        if self.transposition_table is not None:
+            key = self.get_position_key(color, inserted_tiles_key)
+            entry = self.transposition_table.probe(key)
+            if entry is not None:
+                entry_depth, bound, entry_score, tt_move_index = entry
+                if entry_depth >= depth and (bound == EXACT_SCORE
+                                             or (bound == LOWER_BOUND and entry_score >= beta)
+                                             or (bound == UPPER_BOUND and entry_score <= alpha)):
+                    self.nbr_tt_hits += 1
+                    return entry_score
+
+        is_recycling = self.board.isInRecyclingPhase()
+        moves = self.generate_moves(is_recycling)
+        if tt_move_index is not None and tt_move_index >= len(moves):
+            tt_move_index = None
+        ply = self.root_depth - depth
+        move_indexes = self.order_moves(moves, ply, is_recycling, color, tt_move_index)
+        leaf_scores = None
+        best_score = -INFINITY
+        best_move_index = None
+        for nbr_moves_searched, move_index in enumerate(move_indexes, 1):
+            move = moves[move_index]
+            if leaf_scores is None and depth == 1 and self.batch_evaluation \
+                    and nbr_moves_searched > NBR_LEAVES_SEARCHED_BEFORE_BATCH:
+                # Scoring leaves that a cutoff would have skipped is wasted, so only the leaves left once the first
+                # ones did not cause a cutoff are scored together.
+                batch_move_indexes = move_indexes[nbr_moves_searched - 1:]
+                leaf_scores = dict(zip(batch_move_indexes, self.evaluate_moves(
+                    [moves[i] for i in batch_move_indexes], inserted_tiles_pos, is_recycling)))
+            if leaf_scores is not None:
+                # Same as searching the leaf, without playing the move.
+                self.count_node()
+                self.nbr_leaves += 1
+                score = color * leaf_scores[move_index]
+            else:
+                move_tiles_pos = self.make_move(move, is_recycling)
+                try:
+                    score = -self.negamax(depth - 1, -beta, -alpha, -color, inserted_tiles_pos + move_tiles_pos,
+                                          self.get_inserted_tiles_key(inserted_tiles_key, move_tiles_pos),
+                                          is_recycling)
+                finally:
+                    self.unmake_move(move, is_recycling)
+            if score > best_score:
+                best_score = score
+                best_move_index = move_index
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.nbr_cutoffs += 1
+                        if self.move_orderer is not None:
+                            self.move_orderer.record_cutoff(move, ply, depth, is_recycling, nbr_moves_searched)
+                        break
+        if best_score == -INFINITY:
+            best_score = NO_MOVE_SCORE
+
+        if self.transposition_table is not None:
+            if best_score <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_score >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT_SCORE
+            self.transposition_table.store(key, depth, bound, best_score, best_move_index)
+        return best_score
+
+    def get_inserted_tiles_key(self, inserted_tiles_key, move_tiles_pos):
+        # The keys of the cells are added rather than XORed, so that a cell on which 2 tiles were placed
+        # does not cancel out.
+        keys = self.board.zobrist_keys
+        for tile_pos in move_tiles_pos:
+            inserted_tiles_key += keys.inserted_tile_keys[self.board.bitboard.cell_index(tile_pos[0], tile_pos[1])]
+        return inserted_tiles_key & ZobristKeys.KEY_MASK
+
+    def get_position_key(self, color, inserted_tiles_key):
+        board = self.board
+        key = board.zobrist_hash ^ board.cards_hash ^ board.recycled_card_hash ^ self.player_key ^ inserted_tiles_key
+        if color < 0:
+            key ^= board.zobrist_keys.other_player_to_move_key
+        return key
+
+    def evaluate(self, inserted_tiles_pos, last_move_is_recycling):
+        if last_move_is_recycling:
+            return self.board.heuristic_recycling_moves(inserted_tiles_pos, self.current_player)
+        return self.board.heuristic_regular_moves(inserted_tiles_pos, self.current_player)
+
+    def evaluate_moves(self, moves, inserted_tiles_pos, is_recycling):
+        return self.board.evaluate_moves(moves, inserted_tiles_pos, is_recycling, self.current_player)
+
+    def order_moves(self, moves, ply, is_recycling, color, tt_move_index):
+        """ Return the indexes of the moves in the order they are searched. """
+        if self.move_orderer is not None:
+            return self.move_orderer.order_moves(moves, ply, is_recycling, self.type_items[color],
+                                                 self.type_items[-color], tt_move_index)
+        move_indexes = range(len(moves))
+        # The best move found the last time this position was searched is likely to be the best one again.
+        if tt_move_index is not None:
+            move_indexes = [tt_move_index] + [i for i in move_indexes if i != tt_move_index]
+        return move_indexes
+
+    def generate_moves(self, is_recycling):
+        if is_recycling:
+            return self.board.generate_valid_recycling_moves()
+        return self.board.generate_valid_regular_moves()
+
+    def make_move(self, move, is_recycling):
+        """ Play the move on the board and return the positions of the tiles it placed. """
+        self.board.make(move)
+        return [move.position_first_tile, move.position_second_tile]
+
+    def unmake_move(self, move, is_recycling):
+        self.board.unmake()
@@ -1,15 +1,178 @@
+import argparse
+import json
+import threading
+
+LEGACY_TRACE_PATH = "tracemm.txt"
+STRUCTURED_TRACE_PATH = "trace.jsonl"
+# The records are written to the file by a background thread, at least every so many seconds, or as soon as that many
+# records are waiting, so that the search never waits for the disk.
+TRACE_FLUSH_INTERVAL = 0.5
+TRACE_FLUSH_NBR_RECORDS = 4096
+
+
+def format_score(score):
+    # The endgame solver has no score for the move it plays when it is interrupted before solving it.
+    return "{0:1}".format(score) if score is not None else "None"
+
+
+def format_level3(numOfNodes, level3):
+    return str(numOfNodes) + "\n" + format_score(level3) + "\n" + "\n"
+
+
+def format_level2(level2_scores):
+    return "".join(format_score(score) + "\n" for score in level2_scores) + "\n" + "\n"
+
 
 class TraceFile:
     def __init__(self):
-        self.file = open("tracemm.txt","w")
+        self.file = open(LEGACY_TRACE_PATH, "w")
 
     def addLevel3(self, numOfNodes, level3):
-        self.file.write(str(numOfNodes) + "\n" + "{0:1}".format(level3) + "\n" + "\n")
+        self.file.write(format_level3(numOfNodes, level3))
 
     def addLevel2(self, level2):
-        for val in level2:
-            self.file.write("{0:1}".format(val[0]) + "\n")
+        self.file.write(format_level2(val[0] for val in level2))
+        self.file.close()
+        self.file = open(LEGACY_TRACE_PATH, "a")
+
+    def add_search(self, search_trace):
+        self.addLevel3(search_trace.nbr_leaves, search_trace.score)
+        self.addLevel2(search_trace.root_scores)
 
-        self.file.write("\n" + "\n")
+    def close(self):
         self.file.close()
-        self.file = open("tracemm.txt", "a")
+
+
+class SearchTrace:
+    """ What the AI found when choosing a move (see Board.ai_move): the search that chose it (alphabeta, parallel,
+        lazy-smp, book or endgame), the number of moves played before it, the player it was chosen for, the depth
+        searched, the move (in the notation of the players) and its score, the numbers of nodes and leaves searched,
+        and the seconds it took.
+        root_scores holds the (score, move) of every root move searched, whose scores are exact (see Board.ai_move),
+        and root_move_stats their (nbr_nodes, nbr_leaves, seconds), or None when the search does not measure its root
+        moves one by one.
+    """
+    def __init__(self, search_name, nbr_moves, player_name, depth, move_notation, score, nbr_nodes, nbr_leaves,
+                 seconds, root_scores, root_move_notations, root_move_stats=None):
+        self.search_name = search_name
+        self.nbr_moves = nbr_moves
+        self.player_name = player_name
+        self.depth = depth
+        self.move_notation = move_notation
+        self.score = score
+        self.nbr_nodes = nbr_nodes
+        self.nbr_leaves = nbr_leaves
+        self.seconds = seconds
+        self.root_scores = root_scores
+        self.root_move_notations = root_move_notations
+        self.root_move_stats = root_move_stats
+
+
+class StructuredTraceFile:
+    """ Trace of the searches of the AI written as JSON lines: a "search" record for every move chosen by the AI,
+        followed by a "root" record for every root move it searched (see SearchTrace).
+        The records are only formatted by the thread of the search, and written to the file in large blocks by
+        a background thread, so that tracing barely slows the search down. The file has to be closed at the end of the
+        game to write the last records (see close). It can be converted to the format of TraceFile with
+        convert_to_legacy_trace.
+        Like TraceFile, it can also be given the scores of findMinimax through addLevel3 and addLevel2, in which case
+        the records have no move notations nor times.
+    """
+    def __init__(self, path=STRUCTURED_TRACE_PATH):
+        self.file = open(path, "w")
+        self.records = []
+        self.condition = threading.Condition()
+        self.is_closed = False
+        self.level3 = None
+        self.flush_thread = threading.Thread(target=self.flush_records, name="trace-flush", daemon=True)
+        self.flush_thread.start()
+
+    def write_records(self, records):
+        with self.condition:
+            if self.is_closed:
+                raise ValueError("The trace file is closed.")
+            self.records.extend(records)
+            if len(self.records) >= TRACE_FLUSH_NBR_RECORDS:
+                self.condition.notify()
+
+    def flush_records(self):
+        while True:
+            with self.condition:
+                if not self.records and not self.is_closed:
+                    self.condition.wait(TRACE_FLUSH_INTERVAL)
+                records = self.records
+                self.records = []
+                is_closed = self.is_closed
+            if records:
+                self.file.write("".join(records))
+                self.file.flush()
+            if is_closed:
+                return
+
+    def add_search(self, search_trace):
+        records = [json.dumps({"type": "search", "search": search_trace.search_name,
+                               "nbr_moves": search_trace.nbr_moves, "player": search_trace.player_name,
+                               "depth": search_trace.depth, "move": search_trace.move_notation,
+                               "score": search_trace.score, "nodes": search_trace.nbr_nodes,
+                               "leaves": search_trace.nbr_leaves, "seconds": search_trace.seconds}) + "\n"]
+        root_move_stats = search_trace.root_move_stats
+        if root_move_stats is None or len(root_move_stats) != len(search_trace.root_scores):
+            root_move_stats = [(None, None, None)] * len(search_trace.root_scores)
+        for (score, move), move_notation, (nbr_nodes, nbr_leaves, seconds) in zip(
+                search_trace.root_scores, search_trace.root_move_notations, root_move_stats):
+            records.append(json.dumps({"type": "root", "move": move_notation, "score": score, "nodes": nbr_nodes,
+                                       "leaves": nbr_leaves, "seconds": seconds}) + "\n")
+        self.write_records(records)
+
+    def addLevel3(self, numOfNodes, level3):
+        # findMinimax gives its scores in 2 calls, which only make a complete record once both are known.
+        self.level3 = (numOfNodes, level3)
+
+    def addLevel2(self, level2):
+        numOfNodes, level3 = self.level3
+        self.add_search(SearchTrace("minimax", None, None, None, None, level3, None, numOfNodes, None,
+                                    level2, [None] * len(level2)))
+
+    def close(self):
+        with self.condition:
+            if self.is_closed:
+                return
+            self.is_closed = True
+            self.condition.notify()
+        self.flush_thread.join()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+def convert_to_legacy_trace(structured_trace_path=STRUCTURED_TRACE_PATH, legacy_trace_path=LEGACY_TRACE_PATH):
+    """ Write the trace of a StructuredTraceFile in the format of TraceFile: for every search, its number of leaves and
+        its score, then the score of each of its root moves. The file is read one line at a time.
+    """
+    with open(structured_trace_path) as structured_trace, open(legacy_trace_path, "w") as legacy_trace:
+        level2_scores = None
+        for line in structured_trace:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["type"] == "search":
+                if level2_scores is not None:
+                    legacy_trace.write(format_level2(level2_scores))
+                legacy_trace.write(format_level3(record["leaves"], record["score"]))
+                level2_scores = []
+            else:
+                level2_scores.append(record["score"])
+        if level2_scores is not None:
+            legacy_trace.write(format_level2(level2_scores))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a trace written as JSON lines to the format of tracemm.txt.")
+    parser.add_argument("input", nargs="?", default=STRUCTURED_TRACE_PATH, help="trace written as JSON lines")
+    parser.add_argument("output", nargs="?", default=LEGACY_TRACE_PATH, help="trace in the format of tracemm.txt")
+    arguments = parser.parse_args()
+    convert_to_legacy_trace(arguments.input, arguments.output)
@@ -0,0 +1,233 @@
+import argparse
+import collections
+import fnmatch
+import json
+import os
+import sys
+import time
+from board import *
+
+# Number of cores used by default, each worker process replaying its own files.
+DEFAULT_NBR_WORKERS = os.cpu_count()
+# Number of files sent to each worker process ahead of the results read, which bounds the memory taken by the results
+# waiting to be read whatever the number of files.
+NBR_PENDING_FILES_PER_WORKER = 2
+DEFAULT_TRANSCRIPT_PATTERN = "*"
+
+# What happened in a game of a transcript.
+GAME_WON = "win"
+GAME_DRAWN = "draw"
+# The transcript ends before the game does.
+GAME_UNFINISHED = "unfinished"
+# A move of the transcript is not valid, or is played after the end of the game.
+GAME_INVALID = "invalid"
+
+# The players, by the name used in the results and by the answers to set_up_game.
+PLAYERS = {'dots': DotPlayer, 'colors': ColorPlayer}
+DEFAULT_FIRST_PLAYER = 'dots'
+
+
+class TranscriptResult:
+    """ Result of a game of a transcript: the file, the index of the game in the file and the line of its first move,
+        the player who moved first, the status of the game (GAME_WON, GAME_DRAWN, GAME_UNFINISHED or GAME_INVALID),
+        the winner (None if no one won), the number of valid moves played, and why the game is invalid (the line
+        number and message of the move rejected) if it is.
+    """
+    def __init__(self, path, game_index, line_number, first_player, status, winner=None, nbr_moves=0,
+                 error_line_number=None, error=None):
+        self.path = path
+        self.game_index = game_index
+        self.line_number = line_number
+        self.first_player = first_player
+        self.status = status
+        self.winner = winner
+        self.nbr_moves = nbr_moves
+        self.error_line_number = error_line_number
+        self.error = error
+
+    def as_dict(self):
+        return {"file": self.path, "game": self.game_index, "line": self.line_number, "first": self.first_player,
+                "status": self.status, "winner": self.winner, "moves": self.nbr_moves,
+                "error_line": self.error_line_number, "error": self.error}
+
+
+class TranscriptGame:
+    """ Replays a game of a transcript one move at a time, following the rules of game_loop: a move is only played if
+        Board.parse_move accepts it, the player who completes a line with a move wins (the current player first, if
+        the move completes a line of both players), and the game is a draw after MAX_NBR_MOVES moves.
+    """
+    def __init__(self, path, game_index, line_number, first_player):
+        self.board = Board(NBR_CARDS, 0, None)
+        self.result = TranscriptResult(path, game_index, line_number, first_player, None)
+        self.current_player = first_player
+        self.other_player = 'colors' if first_player == 'dots' else 'dots'
+        self.type_items = {name: player_class().typeItem for name, player_class in PLAYERS.items()}
+
+    def play(self, line, line_number):
+        result = self.result
+        if result.status == GAME_INVALID:
+            return
+        if result.status is not None:
+            self.set_invalid(line_number, "A move is played after the end of the game.")
+            return
+        move = self.board.parse_move(line)
+        if isinstance(move, MoveRejection):
+            self.set_invalid(line_number, self.board.get_rejection_message(move, line.split()))
+            return
+        inserted_tiles_pos = self.board.play_move(move)
+        result.nbr_moves += 1
+        if self.board.nbr_cards >= 4:
+            for player in (self.current_player, self.other_player):
+                if self.board.check_win_conditions(inserted_tiles_pos, self.type_items[player]) is not None:
+                    result.status = GAME_WON
+                    result.winner = player
+                    return
+        if result.nbr_moves >= MAX_NBR_MOVES:
+            result.status = GAME_DRAWN
+        self.current_player, self.other_player = self.other_player, self.current_player
+
+    def set_invalid(self, line_number, error):
+        self.result.status = GAME_INVALID
+        self.result.winner = None
+        self.result.error_line_number = line_number
+        self.result.error = error
+
+    def finish(self):
+        if self.result.status is None:
+            self.result.status = GAME_UNFINISHED
+        return self.result
+
+
+def get_first_player(setup_answers, default_first_player):
+    """ Return the player who moves first according to the answers to the questions of set_up_game given before the
+        moves of a game (N to play without the AI, then C or D), or the default one if they do not tell.
+    """
+    answers = [answer.lower() for answer in setup_answers]
+    if len(answers) >= 2 and answers[-2] == 'n' and answers[-1] in ('c', 'd'):
+        return 'colors' if answers[-1] == 'c' else 'dots'
+    return default_first_player
+
+
+def replay_transcript_file(path, default_first_player=DEFAULT_FIRST_PLAYER):
+    """ Yield the TranscriptResult of every game of the file, which is read one line at a time. The games are runs of
+        moves separated by blank lines or comments (starting with #). The lines of a single word before the moves of a
+        game are taken as answers to set_up_game (see get_first_player).
+    """
+    game = None
+    game_index = 0
+    setup_answers = []
+    with open(path) as transcript_file:
+        for line_number, line in enumerate(transcript_file, 1):
+            args = line.split()
+            if not args or args[0].startswith('#'):
+                if game is not None:
+                    yield game.finish()
+                    game = None
+                setup_answers = []
+            elif game is None and len(args) == 1:
+                setup_answers.append(args[0])
+            else:
+                if game is None:
+                    game = TranscriptGame(path, game_index, line_number,
+                                          get_first_player(setup_answers, default_first_player))
+                    game_index += 1
+                game.play(line, line_number)
+    if game is not None:
+        yield game.finish()
+
+
+def get_transcript_file_results(path, default_first_player=DEFAULT_FIRST_PLAYER):
+    """ Return the TranscriptResult of every game of the file, replayed in a worker process. A file that cannot be
+        read gives a single invalid result.
+    """
+    try:
+        return list(replay_transcript_file(path, default_first_player))
+    except (OSError, UnicodeDecodeError) as exception:
+        return [TranscriptResult(path, None, None, None, GAME_INVALID, error=str(exception))]
+
+
+def find_transcript_paths(paths, pattern=DEFAULT_TRANSCRIPT_PATTERN):
+    """ Yield the files given and the files of the directories given (recursively) whose name matches the pattern,
+        without listing all the files of the archive at once.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, directory_names, file_names in os.walk(path):
+            directory_names.sort()
+            for file_name in sorted(file_names):
+                if fnmatch.fnmatch(file_name, pattern):
+                    yield os.path.join(directory, file_name)
+
+
+def replay_transcripts(paths, nbr_workers=DEFAULT_NBR_WORKERS, default_first_player=DEFAULT_FIRST_PLAYER):
+    """ Yield the TranscriptResult of every game of the files, in the order of the files, replayed in nbr_workers worker
+        processes. paths can be a generator: only NBR_PENDING_FILES_PER_WORKER files per worker are taken from it ahead
+        of the results yielded.
+    """
+    with create_process_pool(nbr_workers) as process_pool:
+        pending_results = collections.deque()
+        for path in paths:
+            pending_results.append(process_pool.submit(get_transcript_file_results, path, default_first_player))
+            if len(pending_results) >= nbr_workers * NBR_PENDING_FILES_PER_WORKER:
+                yield from pending_results.popleft().result()
+        while pending_results:
+            yield from pending_results.popleft().result()
+
+
+class TranscriptReport:
+    """ Counts of the results of the games replayed, added one at a time so that they do not have to be kept. """
+    def __init__(self):
+        self.nbr_games = 0
+        self.nbr_moves = 0
+        self.nbr_statuses = {status: 0 for status in (GAME_WON, GAME_DRAWN, GAME_UNFINISHED, GAME_INVALID)}
+        self.nbr_wins = {player: 0 for player in PLAYERS}
+        self.duration = 0.0
+
+    def add_result(self, result):
+        self.nbr_games += 1
+        self.nbr_moves += result.nbr_moves
+        self.nbr_statuses[result.status] += 1
+        if result.winner is not None:
+            self.nbr_wins[result.winner] += 1
+
+    def get_games_per_second(self):
+        return self.nbr_games / self.duration if self.duration > 0 else 0.0
+
+    def __str__(self):
+        lines = ["%d games (%d moves) in %.2f s: %.1f games/s" % (self.nbr_games, self.nbr_moves, self.duration,
+                                                                  self.get_games_per_second())]
+        for status, nbr_games in self.nbr_statuses.items():
+            lines.append("%-11s  %6d" % (status, nbr_games))
+        for player, nbr_wins in self.nbr_wins.items():
+            lines.append("%-11s  %6d" % (player + " wins", nbr_wins))
+        return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay transcripts of games (moves as entered by the players, like "
+                                                 "recycle.txt), check that every move is valid and write the result "
+                                                 "of every game as a line of JSON. The command fails if a game is "
+                                                 "invalid.")
+    parser.add_argument("paths", nargs="+", help="transcript files, or directories searched for them")
+    parser.add_argument("--pattern", default=DEFAULT_TRANSCRIPT_PATTERN,
+                        help="pattern of the names of the files of the directories (all files by default)")
+    parser.add_argument("--first", choices=sorted(PLAYERS), default=DEFAULT_FIRST_PLAYER,
+                        help="player moving first when the transcript does not tell")
+    parser.add_argument("--workers", type=int, default=DEFAULT_NBR_WORKERS, help="number of worker processes")
+    parser.add_argument("--output", default=None, help="file the results are written to (standard output by default)")
+    arguments = parser.parse_args()
+
+    report = TranscriptReport()
+    start = time.perf_counter()
+    output = open(arguments.output, 'w') if arguments.output is not None else sys.stdout
+    for result in replay_transcripts(find_transcript_paths(arguments.paths, arguments.pattern), arguments.workers,
+                                     arguments.first):
+        report.add_result(result)
+        output.write(json.dumps(result.as_dict()) + "\n")
+    if output is not sys.stdout:
+        output.close()
+    report.duration = time.perf_counter() - start
+    print(report, file=sys.stderr)
+    sys.exit(1 if report.nbr_statuses[GAME_INVALID] > 0 else 0)
@@ -0,0 +1,217 @@
+import random
+from array import array
+from multiprocessing import shared_memory
+
+# Kind of score stored in a transposition table entry (alpha-beta only gives bounds of the score of pruned nodes).
+EXACT_SCORE = 1
+LOWER_BOUND = 2
+UPPER_BOUND = 3
+
+DEFAULT_TRANSPOSITION_TABLE_SIZE_MB = 16
+
+# The keys are generated from a fixed seed so that every process (and every run) uses the same ones.
+ZOBRIST_SEED = 472
+
+
+class ZobristKeys:
+    """ Random 64 bits keys used to hash positions: the hash of a position is the XOR of the keys of the tile faces
+        on each of its cells, so it can be updated every time a tile is placed on the board or removed from it.
+        There are 4 possible tile faces: red or white, with a filled or an empty dot.
+        The recycling moves depend on the cards and not only on the tiles, so there are also keys for the cells of every
+        card and of the card recycled last (see Board.cards_hash).
+    """
+    NBR_TILE_FACES = 4
+    KEY_MASK = (1 << 64) - 1
+
+    def __init__(self, nbr_cells):
+        generator = random.Random(ZOBRIST_SEED)
+        self.tile_keys = [generator.getrandbits(64) for i in range(nbr_cells * self.NBR_TILE_FACES)]
+        # Keys of the cells holding a tile placed during the search (see AlphaBetaSearch), and of the player to move.
+        self.inserted_tile_keys = [generator.getrandbits(64) for i in range(nbr_cells)]
+        self.other_player_to_move_key = generator.getrandbits(64)
+        # Drawn after the other keys, so that these do not change.
+        self.card_keys = [generator.getrandbits(64) for i in range(nbr_cells)]
+        self.recycled_card_keys = [generator.getrandbits(64) for i in range(nbr_cells)]
+
+    def get_tile_key(self, cell_index, is_red, is_filled):
+        return self.tile_keys[cell_index * self.NBR_TILE_FACES + 2 * is_red + is_filled]
+
+    def get_card_key(self, cell_index_1, cell_index_2):
+        # The keys of the cells are added, so that the key does not depend on their order.
+        return (self.card_keys[cell_index_1] + self.card_keys[cell_index_2]) & self.KEY_MASK
+
+    def get_recycled_card_key(self, cell_index_1, cell_index_2):
+        return (self.recycled_card_keys[cell_index_1] + self.recycled_card_keys[cell_index_2]) & self.KEY_MASK
+
+    def get_player_key(self, type_item):
+        # Seeding with the name of the type of item (rather than its hash) keeps the key the same in every process.
+        return random.Random(str(ZOBRIST_SEED) + type_item.__name__).getrandbits(64)
+
+
+class TranspositionTable:
+    """ Fixed size hash table of the positions already searched, indexed by their Zobrist hash.
+        Every bucket holds 2 entries: the first one is only replaced by a search at least as deep (or by any search
+        once it comes from a previous move), and the second one is always replaced. This way, the deep and costly
+        results are kept while the most recent ones are still available.
+        The entries are stored in preallocated arrays, so the table never grows past its initial size.
+    """
+    ENTRIES_PER_BUCKET = 2
+    # key (8 bytes) + score (8 bytes) + depth, bound type, generation and best move packed together (4 bytes)
+    BYTES_PER_ENTRY = 20
+
+    DEPTH_BITS = 8
+    BOUND_BITS = 2
+    GENERATION_BITS = 6
+    MOVE_BITS = 16
+    NO_MOVE = (1 << MOVE_BITS) - 1
+
+    def __init__(self, size_mb=DEFAULT_TRANSPOSITION_TABLE_SIZE_MB):
+        self.nbr_buckets = max(int(size_mb * 1024 * 1024) // (self.BYTES_PER_ENTRY * self.ENTRIES_PER_BUCKET), 1)
+        nbr_entries = self.nbr_buckets * self.ENTRIES_PER_BUCKET
+        self.keys = array('Q', bytes(8 * nbr_entries))
+        self.scores = array('d', bytes(8 * nbr_entries))
+        self.infos = array('I', bytes(4 * nbr_entries))
+        self.generation = 0
+        self.nbr_probes = 0
+        self.nbr_hits = 0
+
+    def new_search(self):
+        """ To be called before every new move, so that the entries of the previous ones can be replaced. """
+        self.generation = (self.generation + 1) % (1 << self.GENERATION_BITS)
+
+    def clear(self):
+        self.infos = array('I', bytes(4 * len(self.infos)))
+
+    def probe(self, key):
+        """ Return (depth, bound type, score, best move index) of the entry of the position, or None.
+            The best move index is the index of the best move in the list of moves generated from the position.
+        """
+        self.nbr_probes += 1
+        entry_index = (key % self.nbr_buckets) * self.ENTRIES_PER_BUCKET
+        for i in range(entry_index, entry_index + self.ENTRIES_PER_BUCKET):
+            info = self.infos[i]
+            if info != 0 and self.keys[i] == key:
+                self.nbr_hits += 1
+                depth, bound, generation, move_index = self.unpack_info(info)
+                return depth, bound, self.scores[i], move_index
+        return None
+
+    def store(self, key, depth, bound, score, move_index):
+        entry_index = (key % self.nbr_buckets) * self.ENTRIES_PER_BUCKET
+        info = self.infos[entry_index]
+        if info == 0 or self.keys[entry_index] == key:
+            replace_depth_preferred = True
+        else:
+            stored_depth, stored_bound, stored_generation, stored_move_index = self.unpack_info(info)
+            replace_depth_preferred = depth >= stored_depth or stored_generation != self.generation
+        if not replace_depth_preferred:
+            entry_index += 1
+        if move_index is None or move_index >= self.NO_MOVE:
+            move_index = self.NO_MOVE
+        self.keys[entry_index] = key
+        self.scores[entry_index] = score
+        self.infos[entry_index] = self.pack_info(min(depth, (1 << self.DEPTH_BITS) - 1), bound, move_index)
+
+    def pack_info(self, depth, bound, move_index):
+        # The bound type is never 0, so an entry whose info is 0 is empty.
+        return ((((move_index << self.GENERATION_BITS) | self.generation) << self.BOUND_BITS | bound)
+                << self.DEPTH_BITS) | depth
+
+    def unpack_info(self, info):
+        """ Return (depth, bound type, generation, best move index), the best move index being None if unknown. """
+        depth = info & ((1 << self.DEPTH_BITS) - 1)
+        info >>= self.DEPTH_BITS
+        bound = info & ((1 << self.BOUND_BITS) - 1)
+        info >>= self.BOUND_BITS
+        generation = info & ((1 << self.GENERATION_BITS) - 1)
+        move_index = info >> self.GENERATION_BITS
+        return depth, bound, generation, (None if move_index == self.NO_MOVE else move_index)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """ Transposition table stored in a block of shared memory, so that the searches of several processes can use it
+        at the same time (see LazySMPSearch). The process creating it gives its size, the others attach to it by name.
+        Every entry is made of 3 words of 8 bytes: check, score and info (the same as in TranspositionTable), check
+        being the XOR of the key, the bits of the score and the info. The processes do not lock the entries: if one
+        reads an entry while another one writes it, the words do not match anymore and the entry is ignored.
+        The first words of the block are not entries: they hold a flag telling the searches sharing the table to stop
+        and the number of buckets of the table.
+    """
+    WORDS_PER_ENTRY = 3
+    BYTES_PER_ENTRY = WORDS_PER_ENTRY * 8
+    NBR_HEADER_WORDS = 2
+    STOP_WORD = 0
+    NBR_BUCKETS_WORD = 1
+
+    def __init__(self, size_mb=DEFAULT_TRANSPOSITION_TABLE_SIZE_MB, name=None, generation=1):
+        if name is None:
+            nbr_buckets = max(int(size_mb * 1024 * 1024) // (self.BYTES_PER_ENTRY * self.ENTRIES_PER_BUCKET), 1)
+            size = (self.NBR_HEADER_WORDS + nbr_buckets * self.ENTRIES_PER_BUCKET * self.WORDS_PER_ENTRY) * 8
+            # New blocks of shared memory are filled with zeros, so all the entries are empty.
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+        # The same bytes, seen as unsigned integers (for the keys and infos) and as floats (for the scores).
+        # Some systems round the size of the block up, so only the words of the buckets are used.
+        self.words = self.shared_memory.buf.cast('Q')
+        self.scores = self.shared_memory.buf.cast('d')
+        if name is None:
+            self.words[self.NBR_BUCKETS_WORD] = nbr_buckets
+        self.nbr_buckets = self.words[self.NBR_BUCKETS_WORD]
+        self.generation = generation
+        self.nbr_probes = 0
+        self.nbr_hits = 0
+
+    def get_name(self):
+        return self.shared_memory.name
+
+    def clear(self):
+        for i in range(self.NBR_HEADER_WORDS, len(self.words)):
+            self.words[i] = 0
+
+    def close(self):
+        """ Detach from the shared memory. The process which created the table has to call unlink afterwards. """
+        self.words.release()
+        self.scores.release()
+        self.shared_memory.close()
+
+    def unlink(self):
+        self.shared_memory.unlink()
+
+    def request_stop(self):
+        self.words[self.STOP_WORD] = 1
+
+    def is_stop_requested(self):
+        return self.words[self.STOP_WORD] != 0
+
+    def probe(self, key):
+        self.nbr_probes += 1
+        words = self.words
+        entry_word_index = self.NBR_HEADER_WORDS + (key % self.nbr_buckets) * self.ENTRIES_PER_BUCKET * self.WORDS_PER_ENTRY
+        for i in range(entry_word_index, entry_word_index + self.ENTRIES_PER_BUCKET * self.WORDS_PER_ENTRY,
+                       self.WORDS_PER_ENTRY):
+            info = words[i + 2]
+            score_bits = words[i + 1]
+            if info != 0 and words[i] ^ score_bits ^ info == key:
+                self.nbr_hits += 1
+                depth, bound, generation, move_index = self.unpack_info(info)
+                return depth, bound, self.scores[i + 1], move_index
+        return None
+
+    def store(self, key, depth, bound, score, move_index):
+        words = self.words
+        entry_word_index = self.NBR_HEADER_WORDS + (key % self.nbr_buckets) * self.ENTRIES_PER_BUCKET * self.WORDS_PER_ENTRY
+        info = words[entry_word_index + 2]
+        if info == 0 or words[entry_word_index] ^ words[entry_word_index + 1] ^ info == key:
+            replace_depth_preferred = True
+        else:
+            stored_depth, stored_bound, stored_generation, stored_move_index = self.unpack_info(info)
+            replace_depth_preferred = depth >= stored_depth or stored_generation != self.generation
+        if not replace_depth_preferred:
+            entry_word_index += self.WORDS_PER_ENTRY
+        if move_index is None or move_index >= self.NO_MOVE:
+            move_index = self.NO_MOVE
+        info = self.pack_info(min(depth, (1 << self.DEPTH_BITS) - 1), bound, move_index)
+        self.scores[entry_word_index + 1] = score
+        words[entry_word_index + 2] = info
+        words[entry_word_index] = key ^ words[entry_word_index + 1] ^ info
@@ -0,0 +1,62 @@
+from enum import Enum
+
+
+class MoveRejection(Enum):
+    """ Reasons why a move is not valid. The board never prints them while checking moves (the AI checks thousands
+        of them per move): they are only turned into messages for the players by Board.read_input.
+    """
+    no_move = 1
+    wrong_nbr_regular_arguments = 2
+    wrong_nbr_recycling_arguments = 3
+    no_card_left = 4
+    not_recycling_phase = 5
+    rotation_code_not_integer = 6
+    rotation_code_out_of_range = 7
+    invalid_position = 8
+    invalid_tile_1_position = 9
+    invalid_tile_2_position = 10
+    no_card_on_tiles = 11
+    tiles_of_different_cards = 12
+    card_covered = 13
+    card_recycled_last_turn = 14
+    same_rotation_and_position = 15
+    out_of_bounds = 16
+    cell_occupied = 17
+    hanging_over_empty_cell = 18
+
+
+# Messages shown to the players, formatted with the arguments they entered (see Board.get_rejection_message).
+REJECTION_MESSAGES = {
+    MoveRejection.no_move: "Enter a move.",
+    MoveRejection.wrong_nbr_regular_arguments:
+        "Input error: Regular moves should have 4 arguments (not {nbr_args}):\n"
+        "0 orientationCode xCoord yCoord\n"
+        "Example: 0 5 A 2",
+    MoveRejection.wrong_nbr_recycling_arguments:
+        "Input error: Swap moves should have 7 arguments (not {nbr_args}):\n"
+        "xCoordTile1 yCoordTile1 xCoordTile2 yCoordTile2 newOrientationCode newCoordX newCoordY\n"
+        "Example: F 2 F 3 3 A 2",
+    MoveRejection.no_card_left:
+        "Error: Cannot insert more than {max_nbr_cards} cards on the board.\nPlease do a recycling move instead.",
+    MoveRejection.not_recycling_phase:
+        "Error: Cannot do a recycling move until {max_nbr_cards} cards are on the board.\n"
+        "Please do a normal move instead.",
+    MoveRejection.rotation_code_not_integer:
+        "The {rotation_code_argument} argument should be an integer and {rotation_code} is not.",
+    MoveRejection.rotation_code_out_of_range:
+        "Valid rotation codes range from 1 to {nbr_rotation_codes}, thus {rotation_code} is out of range.",
+    MoveRejection.invalid_position: "{position} does not represent a valid position.",
+    MoveRejection.invalid_tile_1_position: "{tile_1_position} does not represent a valid position.",
+    MoveRejection.invalid_tile_2_position: "{tile_2_position} does not represent a valid position.",
+    MoveRejection.no_card_on_tiles: "1 or both tile do not have a card on them.",
+    MoveRejection.tiles_of_different_cards:
+        "The 2 tiles selected do not come from the same card. Choose 2 tiles from the same card.",
+    MoveRejection.card_covered:
+        "You cannot move this card, it would leave the board in an illegal state. Please choose another card.",
+    MoveRejection.card_recycled_last_turn:
+        "You cannot move the card that was moved/played last turn. Please choose another card.",
+    MoveRejection.same_rotation_and_position: "You cannot keep the same rotation and position.",
+    MoveRejection.out_of_bounds: "Error: One square is not on a board tile.",
+    MoveRejection.cell_occupied: "Error: The card would be placed on top of another card's segment(s).",
+    MoveRejection.hanging_over_empty_cell: "Error: The card would hang over an empty cell, which is not allowed.",
+}
@@ -0,0 +1,48 @@
+class WindowTable:
+    """ Static table of all the windows of 4 aligned cells (vertical, horizontal and both diagonals) that fit in a
+        board of the given size, i.e. of all the lines in which a player can win.
+        Cells are identified by their index (y * width + x), like in the bitboard. For every window, the table holds
+        its cell indexes, positions and bit mask, and for every cell the windows containing it, in each direction.
+        The windows of a cell in one direction are sorted by the position of their first cell.
+    """
+    # Directions in which the windows are aligned: up, right, up-right and down-right.
+    DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+    WINDOW_SIZE = 4
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.window_cells = []
+        self.window_positions = []
+        self.window_masks = []
+        self.cell_windows = [[] for i in range(width * height)]
+        self.cell_direction_windows = [[[] for offset in self.DIRECTIONS] for i in range(width * height)]
+        for direction_index, offset in enumerate(self.DIRECTIONS):
+            for y in range(height):
+                for x in range(width):
+                    end_x = x + (self.WINDOW_SIZE - 1) * offset[0]
+                    end_y = y + (self.WINDOW_SIZE - 1) * offset[1]
+                    if not (0 <= end_x < width and 0 <= end_y < height):
+                        continue
+                    window_index = len(self.window_cells)
+                    positions = [(x + i * offset[0], y + i * offset[1]) for i in range(self.WINDOW_SIZE)]
+                    cells = tuple(position[1] * width + position[0] for position in positions)
+                    mask = 0
+                    for cell in cells:
+                        mask |= 1 << cell
+                        self.cell_windows[cell].append(window_index)
+                        self.cell_direction_windows[cell][direction_index].append(window_index)
+                    self.window_cells.append(cells)
+                    self.window_positions.append(positions)
+                    self.window_masks.append(mask)
+        self.nbr_windows = len(self.window_cells)
+
+
+# The tables never change, so they are only built once for each size of board.
+window_tables = dict()
+
+
+def get_window_table(width, height):
+    if (width, height) not in window_tables:
+        window_tables[(width, height)] = WindowTable(width, height)
+    return window_tables[(width, height)]